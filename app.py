@@ -1,407 +1,1443 @@
 """
 Simple Flask app for Neo4j visualization with graph algorithms.
 """
-from flask import Flask, render_template, request, jsonify
-from neo4j_connection import get_driver, DATABASE
+from collections import OrderedDict
+import base64
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+import requests
+from flask import Flask, Response, g, render_template, request, jsonify
+from neo4j.graph import Node, Path, Relationship
+from neo4j_connection import get_session, pool_stats
+from query_executor import query_executor, Read
+from materialize import materializer, PROPERTIES as MATERIALIZED_PROPERTIES
+from graph_analytics import degree, pagerank, betweenness, label_propagation, top_k, shortest_paths, reachable
+from snapshot_cache import snapshot_cache
+from schema_cache import schema_cache
+from chat_cache import chat_cache, CHAT_CACHE_THRESHOLD, CHAT_EMBED_MODEL
+from ollama_client import ollama, OLLAMA_KEEP_ALIVE
+from graph_layout import layout_cache, wants_layout, with_layout
+from graph_summary import summarize, summary_store, containers, SUMMARY_MAX_NODES, SUMMARY_MODES
+from query_cache import query_cache, cache_key, READ_ONLY_QUERY_TYPES
+from search_index import search_index
+from profiling import RequestTimer, metrics, slow_queries, finish_request, recorded_stream, simplify_plan
+from export import (
+    EXPORT_FORMATS, EXPORT_FETCH_SIZE, EXPORT_BATCH_ROWS, check_format, check_schema, export_query,
+    export_analysis, primed
+)
+from serializer import (
+    serialize_node, serialize_edge, resolve_projection, negotiate_format, dumps, encode
+)
 
 app = Flask(__name__)
 
+# Streaming /query: records are emitted in NDJSON batches as they arrive
+STREAM_BATCH_SIZE = 500
+STREAM_SEEN_LIMIT = 200000
+
+# Hard ceilings for /query; clients may lower them but never raise them
+QUERY_MAX_RECORDS = int(os.getenv('QUERY_MAX_RECORDS', '10000'))
+QUERY_MAX_BYTES = int(os.getenv('QUERY_MAX_BYTES', str(50 * 1024 * 1024)))
+DEFAULT_PAGE_SIZE = 500
+
+# /expand: hops per request, relationships followed per node per hop and new nodes per request
+EXPAND_MAX_DEPTH = 3
+EXPAND_FANOUT = int(os.getenv('EXPAND_FANOUT', '50'))
+EXPAND_MAX_NODES = int(os.getenv('EXPAND_MAX_NODES', '2000'))
+EXPAND_PATTERNS = {'out': '-[r]->', 'in': '<-[r]-', 'both': '-[r]-'}
+
+# /search: default and largest number of ranked symbols returned
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 1000
+
+# /paths and /impact: hops searched and nodes returned per request (lowerable, never raised)
+PATHS_MAX_DEPTH = int(os.getenv('PATHS_MAX_DEPTH', '10'))
+IMPACT_DEPTH = 3
+IMPACT_MAX_DEPTH = int(os.getenv('IMPACT_MAX_DEPTH', '6'))
+TRAVERSAL_MAX_NODES = int(os.getenv('TRAVERSAL_MAX_NODES', '2000'))
+
+
+@app.before_request
+def start_timer():
+    g.timer = RequestTimer()
+
+
+@app.after_request
+def record_timing(response):
+    """Feed the request's timings to /metrics and the slow-query log."""
+    timer = g.get('timer')
+    if timer is not None and response.is_streamed:
+        # The body is produced after this hook returns, so record the request when it has been sent
+        response.response = recorded_stream(response.response, request.endpoint or 'unknown', timer,
+                                            response.status_code)
+    elif timer is not None:
+        finish_request(request.endpoint or 'unknown', timer, response.status_code,
+                       response.content_length)
+        response.headers['Server-Timing'] = timer.server_timing()
+    return response
+
 
 @app.route('/')
 def index():
+    # Start loading the chat model while the user is still looking at the page
+    ollama.start_warmup()
     return render_template('index.html')
 
 
-def extract_graph_data(result):
-    """Extract nodes and edges from a Neo4j result."""
+def extract_graph_data(result, keys=None):
+    """
+    Extract nodes and edges from a Neo4j result, keeping only keys if given.
+    
+    Values are dispatched on their neo4j.graph type. Nodes and relationships
+    inside lists and maps (collect(n), {node: n}) are found too, and each
+    relationship is kept once however many records or paths contain it.
+    """
     nodes = {}
-    edges = []
+    edges = {}
+    
+    def add_node(node):
+        if node.element_id not in nodes:
+            nodes[node.element_id] = serialize_node(node, keys)
+    
+    def add_relationship(rel):
+        if rel.element_id not in edges:
+            edges[rel.element_id] = serialize_edge(rel, keys)
+            add_node(rel.start_node)
+            add_node(rel.end_node)
+    
+    def add_path(path):
+        for node in path.nodes:
+            add_node(node)
+        for rel in path.relationships:
+            add_relationship(rel)
+    
+    def visit_list(values):
+        for value in values:
+            visit(value)
+    
+    def visit_map(values):
+        visit_list(values.values())
+    
+    def handler_for(value_type):
+        if issubclass(value_type, Node):
+            return add_node
+        if issubclass(value_type, Relationship):
+            return add_relationship
+        if issubclass(value_type, Path):
+            return add_path
+        if issubclass(value_type, (list, tuple)):
+            return visit_list
+        if issubclass(value_type, dict):
+            return visit_map
+        return None
+    
+    # Relationship classes are created per result, so the type -> handler
+    # table lives for one call; it saves an ABC isinstance check per value
+    handlers = {}
+    
+    def visit(value):
+        value_type = type(value)
+        handler = handlers.get(value_type, False)
+        if handler is False:
+            handler = handlers[value_type] = handler_for(value_type)
+        if handler is not None:
+            handler(value)
     
     for record in result:
+        for value in record:
+            visit(value)
+    
+    return nodes, list(edges.values())
+
+
+class BoundedIdSet:
+    """Remembers at most max_size ids; the oldest are forgotten first."""
+    
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+    
+    def add(self, key):
+        """Add key and return True if it was not already present."""
+        if key in self._ids:
+            return False
+        self._ids[key] = None
+        if len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+        return True
+
+
+def graph_entities(value):
+    """Yield the nodes and relationships contained in one result value, including in lists and maps."""
+    if isinstance(value, Node):
+        yield value
+    elif isinstance(value, Relationship):
+        yield value.start_node
+        yield value.end_node
+        yield value
+    elif isinstance(value, Path):
+        yield from value.nodes
+        yield from value.relationships
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from graph_entities(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from graph_entities(item)
+
+
+class GraphBatcher:
+    """Collects de-duplicated nodes/edges from records into NDJSON batches."""
+    
+    def __init__(self, batch_size=STREAM_BATCH_SIZE, max_seen=STREAM_SEEN_LIMIT, keys=None):
+        self.batch_size = batch_size
+        self.keys = keys
+        self.seen = BoundedIdSet(max_seen)
+        self.nodes = []
+        self.edges = []
+        self.node_count = 0
+        self.edge_count = 0
+    
+    def add(self, record):
+        """Add a record; return an NDJSON line once a batch is full, else None."""
         for value in record.values():
-            # Handle nodes
-            if hasattr(value, 'labels'):
-                node_id = value.element_id
-                if node_id not in nodes:
-                    props = dict(value)
-                    nodes[node_id] = {
-                        'id': node_id,
-                        'label': props.get('name', props.get('title', str(list(value.labels)[0]))),
-                        'labels': list(value.labels),
-                        'properties': props
-                    }
-            
-            # Handle relationships
-            elif hasattr(value, 'type'):
-                edges.append({
-                    'from': value.start_node.element_id,
-                    'to': value.end_node.element_id,
-                    'label': value.type,
-                    'properties': dict(value)
-                })
+            for entity in graph_entities(value):
+                is_node = isinstance(entity, Node)
+                if not self.seen.add((is_node, entity.element_id)):
+                    continue
                 
-                for node in [value.start_node, value.end_node]:
-                    node_id = node.element_id
-                    if node_id not in nodes:
-                        props = dict(node)
-                        nodes[node_id] = {
-                            'id': node_id,
-                            'label': props.get('name', props.get('title', 'Node')),
-                            'labels': list(node.labels),
-                            'properties': props
-                        }
-            
-            # Handle paths
-            elif hasattr(value, 'nodes'):
-                for node in value.nodes:
-                    node_id = node.element_id
-                    if node_id not in nodes:
-                        props = dict(node)
-                        nodes[node_id] = {
-                            'id': node_id,
-                            'label': props.get('name', props.get('title', 'Node')),
-                            'labels': list(node.labels),
-                            'properties': props
-                        }
-                for rel in value.relationships:
-                    edges.append({
-                        'from': rel.start_node.element_id,
-                        'to': rel.end_node.element_id,
-                        'label': rel.type,
-                        'properties': dict(rel)
-                    })
+                if is_node:
+                    self.nodes.append(serialize_node(entity, self.keys))
+                else:
+                    self.edges.append(serialize_edge(entity, self.keys, with_id=True))
+        
+        if len(self.nodes) + len(self.edges) >= self.batch_size:
+            return self.flush()
+        return None
+    
+    def flush(self):
+        """Return the pending batch as an NDJSON line, or None if it is empty."""
+        if not self.nodes and not self.edges:
+            return None
+        line = dumps({'nodes': self.nodes, 'edges': self.edges}) + b'\n'
+        self.node_count += len(self.nodes)
+        self.edge_count += len(self.edges)
+        self.nodes = []
+        self.edges = []
+        return line
+    
+    def done(self, meta=None):
+        """Final NDJSON line with totals (and meta, if given)."""
+        done = {'done': True, 'nodeCount': self.node_count, 'edgeCount': self.edge_count}
+        if meta is not None:
+            done['meta'] = meta
+        return dumps(done) + b'\n'
+
+
+def stream_graph_data(result, batch_size=STREAM_BATCH_SIZE, max_seen=STREAM_SEEN_LIMIT,
+                      finish=None, keys=None, timer=None):
+    """
+    Yield NDJSON batches of nodes/edges while a Neo4j result is consumed.
+    
+    The last line reports totals, plus whatever finish() returns as 'meta'.
+    With a timer, time spent waiting for records and building batches goes
+    to its fetch and extract phases (not the time the client takes to read).
+    """
+    batcher = GraphBatcher(batch_size, max_seen, keys)
+    clock = time.perf_counter
+    fetched = extracted = 0.0
+    mark = clock()
+    for record in result:
+        now = clock()
+        fetched += now - mark
+        line = batcher.add(record)
+        mark = clock()
+        extracted += mark - now
+        if line:
+            yield line
+            mark = clock()
+    
+    line = batcher.flush()
+    if line:
+        yield line
+    if timer is not None:
+        timer.add('fetch', fetched)
+        timer.add('extract', extracted)
+    yield batcher.done(finish() if finish else None)
+
+
+def estimate_size(record):
+    """Rough size in bytes of the graph data carried by a record."""
+    size = 0
+    for value in record.values():
+        entities = list(graph_entities(value)) or [{'value': value}]
+        for entity in entities:
+            size += 64
+            for key, prop in dict(entity).items():
+                size += len(key) + len(str(prop))
+    return size
+
+
+def start_budget(meta):
+    meta['records'] = 0
+    meta['estimatedBytes'] = 0
+    meta['truncated'] = None
+
+
+def admit_record(record, meta, max_records, max_bytes):
+    """Count record against the ceilings; False (and why, in meta) once one is hit."""
+    if meta['records'] >= max_records:
+        meta['truncated'] = 'maxRecords'
+        return False
+    size = estimate_size(record)
+    if meta['estimatedBytes'] + size > max_bytes:
+        meta['truncated'] = 'maxBytes'
+        return False
+    meta['records'] += 1
+    meta['estimatedBytes'] += size
+    return True
+
+
+def capped_records(result, meta, max_records, max_bytes):
+    """Iterate a result, stopping early once a record or byte ceiling is hit."""
+    start_budget(meta)
+    for record in result:
+        if not admit_record(record, meta, max_records, max_bytes):
+            return
+        yield record
+
+
+def plan_db_hits(plan):
+    """Total db hits of a PROFILE plan tree."""
+    return plan.get('dbHits', 0) + sum(plan_db_hits(child) for child in plan.get('children', []))
+
+
+def record_summary(summary, meta):
+    """Add a result summary to meta, invalidating the query cache after writes."""
+    # Writes make every cached read potentially stale
+    if summary.query_type not in READ_ONLY_QUERY_TYPES:
+        query_cache.invalidate()
     
+    meta['queryType'] = summary.query_type
+    meta['resultAvailableAfter'] = summary.result_available_after
+    meta['resultConsumedAfter'] = summary.result_consumed_after
+    if summary.profile:
+        meta['dbHits'] = plan_db_hits(summary.profile)
+        meta['plan'] = simplify_plan(summary.profile)
+    return meta
+
+
+def summarize_result(result, meta):
+    """Discard any unread records and add the server summary to meta."""
+    return record_summary(result.consume(), meta)
+
+
+def paginate_query(cypher):
+    """Wrap a query so the server only returns one page of its records."""
+    return f"CALL {{\n{cypher.strip().rstrip(';')}\n}}\nRETURN * SKIP $_page_skip LIMIT $_page_limit"
+
+
+def profiled(cypher):
+    """Prefix a query with PROFILE unless it already asks for a plan."""
+    if re.match(r'\s*(PROFILE|EXPLAIN)\b', cypher, re.IGNORECASE):
+        return cypher
+    return 'PROFILE ' + cypher
+
+
+def query_fingerprint(cypher):
+    return hashlib.sha1(cypher.strip().encode()).hexdigest()[:16]
+
+
+def encode_cursor(cypher, skip):
+    """Opaque cursor pointing at the record after skip for this query."""
+    payload = json.dumps({'q': query_fingerprint(cypher), 'skip': skip})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, cypher):
+    """Return the skip offset stored in a cursor, validating it belongs to cypher."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        skip = int(payload['skip'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+    if payload.get('q') != query_fingerprint(cypher) or skip < 0:
+        raise ValueError('Cursor does not belong to this query')
+    return skip
+
+
+def number_param(params, key, default, kind=int):
+    """
+    params[key] converted with kind, or default if it is missing or null.
+    
+    Raises ValueError for values that are not numbers (lists, objects, text),
+    so a malformed request body is answered with a 400.
+    """
+    value = params.get(key)
+    if value is None:
+        return default
+    if isinstance(value, (list, dict)):
+        raise ValueError(f'{key} must be a number')
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{key} must be a number') from None
+
+
+def plan_query(params, accept=''):
+    """
+    Work out what to run for a /query request body.
+    
+    Returns a dict with the Cypher actually sent (wrapped for paging), its
+    parameters, the ceilings, projection, encoding and the cache key. Raises
+    ValueError for an empty query, an unknown projection or a cursor that
+    does not match the query.
+    """
+    cypher = params.get('query', '')
+    query_params = params.get('params') or {}
+    
+    if not cypher.strip():
+        raise ValueError('Empty query')
+    
+    keys = resolve_projection(params.get('projection'))
+    fmt = negotiate_format(params.get('format'), accept)
+    summary_mode = params.get('summarize') or None
+    if summary_mode is not None and summary_mode not in SUMMARY_MODES:
+        raise ValueError(f'Unknown summary mode: {summary_mode}')
+    max_nodes = number_param(params, 'maxNodes', SUMMARY_MAX_NODES)
+    
+    max_records = min(number_param(params, 'maxRecords', QUERY_MAX_RECORDS), QUERY_MAX_RECORDS)
+    max_bytes = min(number_param(params, 'maxBytes', QUERY_MAX_BYTES), QUERY_MAX_BYTES)
+    
+    skip = 0
+    run_cypher = cypher
+    run_params = {}
+    paged = bool(params.get('pageSize') or params.get('cursor'))
+    if paged:
+        skip = decode_cursor(params['cursor'], cypher) if params.get('cursor') else 0
+        
+        # One extra record tells us whether another page exists
+        max_records = min(number_param(params, 'pageSize', 0) or DEFAULT_PAGE_SIZE, max_records)
+        run_cypher = paginate_query(cypher)
+        run_params = {'_page_skip': skip, '_page_limit': max_records + 1}
+    
+    profile = bool(params.get('profile'))
+    if profile:
+        run_cypher = profiled(run_cypher)
+    
+    return {
+        'cypher': cypher,
+        'run_cypher': run_cypher,
+        'run_params': {**query_params, **run_params},
+        'skip': skip,
+        'max_records': max_records,
+        'max_bytes': max_bytes,
+        'batch_size': number_param(params, 'batchSize', STREAM_BATCH_SIZE),
+        'stream': bool(params.get('stream')),
+        'keys': keys,
+        'format': fmt,
+        'layout': params.get('layout', False),
+        'summarize': summary_mode,
+        'max_nodes': max_nodes,
+        'profile': profile,
+        'cache_key': cache_key(cypher, query_params, {
+            'skip': skip,
+            'paged': paged,
+            'maxRecords': max_records,
+            'maxBytes': max_bytes,
+            'keys': keys,
+            'format': fmt,
+            'layout': params.get('layout', False),
+            'summarize': summary_mode,
+            'maxNodes': max_nodes,
+            'profile': profile
+        })
+    }
+
+
+def finish_meta(plan, meta):
+    """Add a continuation cursor to meta when the result was cut short."""
+    if meta['truncated']:
+        meta['nextCursor'] = encode_cursor(plan['cypher'], plan['skip'] + meta['records'])
+    return meta
+
+
+def container_names(element_ids):
+    """Display names of container nodes for summary super-nodes."""
+    if not element_ids:
+        return {}
+    with get_session() as session:
+        result = session.run("""
+            UNWIND $ids AS id
+            MATCH (n)
+            WHERE elementId(n) = id
+            RETURN id, coalesce(n.name, n.path, n.title) AS name
+        """, {'ids': element_ids})
+        return {record['id']: record['name'] for record in result if record['name']}
+
+
+def summarize_graph(nodes, edges, mode, max_nodes):
+    """Collapse a result into a Summary, grouping by containment when the graph has it."""
+    # Community grouping only looks at the result itself; don't load or refresh the snapshot for it
+    snapshot = snapshot_cache.get() if mode in ('auto', 'containment') else None
+    
+    def container_of(label):
+        return snapshot_cache.memoize(('containers', label), lambda snap: containers(snap, label))
+    
+    summary = summarize(nodes, edges, mode, max_nodes, snapshot, container_of, container_names)
+    summary_store.put(summary)
+    return summary
+
+
+def finish_graph(nodes, edges, plan, meta):
+    """
+    Final node/edge lists for a /query response.
+    
+    Results above the plan's max_nodes are summarized when asked for (see
+    graph_summary), then x/y are attached if a layout was asked for.
+    """
+    nodes = list(nodes.values())
+    if plan['summarize'] and len(nodes) > plan['max_nodes']:
+        summary = summarize_graph(nodes, edges, plan['summarize'], plan['max_nodes'])
+        meta['summary'] = {
+            'summaryId': summary.id,
+            'mode': summary.mode,
+            'groups': len(summary.members),
+            'totalNodes': len(nodes),
+            'totalEdges': len(edges)
+        }
+        nodes, edges = summary.graph()
+    
+    if wants_layout(plan['layout'], len(nodes)):
+        nodes = with_layout(nodes, edges)
     return nodes, edges
 
 
+def phase_timings(timer, meta):
+    """Add the request's phase timings so far (ms) to meta."""
+    timer.add_server_timings(meta)
+    meta['timingsMs'] = {name: round(seconds * 1000, 1) for name, seconds in timer.phases.items()}
+    timer.details = {'records': meta.get('records'), 'truncated': meta.get('truncated')}
+    return meta
+
+
+def cacheable(meta, plan):
+    """Whether a /query response may be stored in the query cache."""
+    # Summaries live in a small LRU, so a cached copy could outlive its expand data
+    return (meta['queryType'] in READ_ONLY_QUERY_TYPES and 'summary' not in meta
+            and not plan['profile'])
+
+
+def query_body(nodes, edges, meta, fmt='json'):
+    """Serialize a /query response; returns (body, mimetype)."""
+    return encode({
+        'nodes': nodes,
+        'edges': edges,
+        'meta': meta,
+        'nextCursor': meta.get('nextCursor')
+    }, fmt)
+
+
+def encoded_response(payload, fmt='json', headers=None):
+    body, mimetype = encode(payload, fmt)
+    return Response(body, mimetype=mimetype, headers=headers)
+
+
 @app.route('/query', methods=['POST'])
 def query():
-    """Execute a Cypher query and return nodes/edges for visualization."""
-    cypher = request.json.get('query', '')
+    """
+    Execute a Cypher query and return nodes/edges for visualization.
     
-    if not cypher.strip():
-        return jsonify({'error': 'Empty query'}), 400
+    Results are capped at maxRecords/maxBytes. With pageSize or cursor the
+    query is wrapped server-side and one page is returned; whenever more
+    records remain, nextCursor continues from where this response stopped.
+    Read-only results are served from the query cache when possible.
+    With profile set the query runs under PROFILE and meta carries the plan
+    with db hits; phase timings are in meta.timingsMs and Server-Timing.
+    """
+    try:
+        plan = plan_query(request.json, request.headers.get('Accept', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    meta = {'skip': plan['skip']}
+    timer = g.timer
+    timer.query = plan['cypher']
+    
+    if plan['stream']:
+        def generate():
+            try:
+                with get_session() as session:
+                    with timer.phase('fetch'):
+                        result = session.run(plan['run_cypher'], plan['run_params'])
+                    
+                    def done():
+                        with timer.phase('fetch'):
+                            summarize_result(result, meta)
+                        return phase_timings(timer, finish_meta(plan, meta))
+                    
+                    records = capped_records(result, meta, plan['max_records'], plan['max_bytes'])
+                    yield from stream_graph_data(records, plan['batch_size'], finish=done,
+                                                 keys=plan['keys'], timer=timer)
+            except Exception as e:
+                yield dumps({'error': str(e)}) + b'\n'
+        
+        return Response(generate(), mimetype='application/x-ndjson')
+    
+    cached = query_cache.get(plan['cache_key'])
+    if cached is not None:
+        body, mimetype = cached
+        return Response(body, mimetype=mimetype, headers={'X-Query-Cache': 'HIT'})
+    generation = query_cache.generation
     
     try:
-        driver = get_driver()
-        with driver.session(database=DATABASE) as session:
-            result = session.run(cypher)
-            nodes, edges = extract_graph_data(result)
+        with timer.phase('fetch'), get_session() as session:
+            result = session.run(plan['run_cypher'], plan['run_params'])
+            records = list(capped_records(result, meta, plan['max_records'], plan['max_bytes']))
+            summarize_result(result, meta)
         
-        driver.close()
-        return jsonify({
-            'nodes': list(nodes.values()),
-            'edges': edges
-        })
+        with timer.phase('extract'):
+            nodes, edges = extract_graph_data(records, plan['keys'])
+        with timer.phase('finish'):
+            nodes, edges = finish_graph(nodes, edges, plan, meta)
+        meta = phase_timings(timer, finish_meta(plan, meta))
+        with timer.phase('encode'):
+            body, mimetype = query_body(nodes, edges, meta, plan['format'])
+        if cacheable(meta, plan):
+            query_cache.put(plan['cache_key'], (body, mimetype), len(body), generation)
+        return Response(body, mimetype=mimetype, headers={'X-Query-Cache': 'MISS'})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/analyze/degree', methods=['POST'])
-def analyze_degree():
-    """Calculate degree centrality for nodes."""
-    try:
-        driver = get_driver()
-        with driver.session(database=DATABASE) as session:
-            # Get nodes with their degree (in + out connections)
-            result = session.run("""
-                MATCH (n)
-                OPTIONAL MATCH (n)-[r]-()
-                WITH n, count(r) as degree
-                RETURN n, degree
-                ORDER BY degree DESC
-                LIMIT 100
-            """)
-            
-            nodes = {}
-            max_degree = 1
-            
-            for record in result:
-                node = record['n']
-                degree = record['degree']
-                node_id = node.element_id
-                props = dict(node)
-                
-                if degree > max_degree:
-                    max_degree = degree
-                
-                nodes[node_id] = {
-                    'id': node_id,
-                    'label': props.get('name', props.get('title', 'Node')),
-                    'labels': list(node.labels),
-                    'properties': props,
-                    'score': degree
-                }
-            
-            # Get edges between these nodes
-            node_ids = list(nodes.keys())
-            result = session.run("""
-                MATCH (n)-[r]->(m)
-                WHERE elementId(n) IN $ids AND elementId(m) IN $ids
-                RETURN r
-            """, {'ids': node_ids})
-            
-            edges = []
-            for record in result:
-                rel = record['r']
-                edges.append({
-                    'from': rel.start_node.element_id,
-                    'to': rel.end_node.element_id,
-                    'label': rel.type
-                })
+def fetch_nodes(snapshot, indices, keys=None):
+    """
+    Fetch nodes for the given dense snapshot ids, in the same order.
+    
+    Each id is looked up on its own (UNWIND + equality) so the planner seeks by
+    element id instead of filtering every node against the list; edges between
+    them come from the snapshot (GraphSnapshot.induced_edges), not Cypher.
+    """
+    element_ids = [snapshot.node_ids[i] for i in indices]
+    with get_session() as session:
+        result = session.run("""
+            UNWIND $ids AS id
+            MATCH (n)
+            WHERE elementId(n) = id
+            RETURN n
+        """, {'ids': element_ids})
+        found = {record['n'].element_id: serialize_node(record['n'], keys) for record in result}
+    
+    # Nodes deleted since the snapshot was taken are skipped
+    return [(i, found[element_id]) for i, element_id in zip(indices, element_ids)
+            if element_id in found]
+
+
+def degree_analysis(params):
+    """Degree centrality payload for /analyze/degree."""
+    limit = number_param(params, 'limit', 100)
+    keys = resolve_projection(params.get('projection'))
+    
+    def compute(snapshot):
+        scores = degree(snapshot)
+        ranked = top_k(scores, limit).tolist()
+        nodes = fetch_nodes(snapshot, ranked, keys)
+        
+        for i, node in nodes:
+            node['score'] = int(scores[i])
         
-        driver.close()
-        return jsonify({
-            'nodes': list(nodes.values()),
-            'edges': edges,
+        return {
+            'nodes': [node for _, node in nodes],
+            'edges': snapshot.induced_edges(ranked),
             'algorithm': 'degree',
-            'maxScore': max_degree
-        })
+            'maxScore': max(1, int(scores.max())) if len(scores) else 1
+        }
+    
+    return snapshot_cache.memoize(('degree', limit, keys), compute)
+
+
+def pagerank_analysis(params):
+    """PageRank payload for /analyze/pagerank."""
+    limit = number_param(params, 'limit', 100)
+    keys = resolve_projection(params.get('projection'))
+    damping = number_param(params, 'damping', 0.85, float)
+    max_iter = number_param(params, 'maxIterations', 100)
+    
+    def compute(snapshot):
+        scores = pagerank(snapshot, damping=damping, max_iter=max_iter)
+        ranked = top_k(scores, limit).tolist()
+        nodes = fetch_nodes(snapshot, ranked, keys)
+        
+        in_degree = snapshot.in_degree()
+        out_degree = snapshot.out_degree()
+        for i, node in nodes:
+            node['score'] = float('%.6g' % scores[i])
+            node['inDegree'] = int(in_degree[i])
+            node['outDegree'] = int(out_degree[i])
         
+        return {
+            'nodes': [node for _, node in nodes],
+            'edges': snapshot.induced_edges(ranked),
+            'algorithm': 'pagerank',
+            'maxScore': float('%.6g' % scores.max()) if len(scores) else 1
+        }
+    
+    return snapshot_cache.memoize(('pagerank', damping, max_iter, limit, keys), compute)
+
+
+def communities_analysis(params):
+    """Label propagation payload for /analyze/communities."""
+    limit = number_param(params, 'limit', 500)
+    keys = resolve_projection(params.get('projection'))
+    max_iter = number_param(params, 'maxIterations', 10)
+    
+    def compute(snapshot):
+        communities = label_propagation(snapshot, max_iter=max_iter)
+        
+        # Show members of the largest communities first (community 0 is the largest)
+        shown = np.argsort(communities, kind='stable')[:limit].tolist()
+        nodes = fetch_nodes(snapshot, shown, keys)
+        
+        for i, node in nodes:
+            node['community'] = int(communities[i])
+            node['score'] = int(communities[i])
+        
+        return {
+            'nodes': [node for _, node in nodes],
+            'edges': snapshot.induced_edges(shown),
+            'algorithm': 'communities',
+            'communityCount': int(communities.max()) + 1 if len(communities) else 0,
+            'maxScore': max((node['score'] for _, node in nodes), default=0)
+        }
+    
+    return snapshot_cache.memoize(('communities', max_iter, limit, keys), compute)
+
+
+def betweenness_analysis(params):
+    """Betweenness payload for /analyze/betweenness."""
+    limit = number_param(params, 'limit', 100)
+    keys = resolve_projection(params.get('projection'))
+    samples = number_param(params, 'samples', None) or None
+    
+    def compute(snapshot):
+        scores = betweenness(snapshot, samples=samples)
+        ranked = top_k(scores, limit).tolist()
+        nodes = fetch_nodes(snapshot, ranked, keys)
+        
+        for i, node in nodes:
+            node['score'] = round(float(scores[i]), 2)
+            node['connectedLabels'] = sorted({snapshot.node_labels[j]
+                                              for j in snapshot.neighbors(i).tolist()})
+        
+        return {
+            'nodes': [node for _, node in nodes],
+            'edges': snapshot.induced_edges(ranked),
+            'algorithm': 'betweenness',
+            'maxScore': max(1, round(float(scores.max()), 2)) if len(scores) else 1
+        }
+    
+    return snapshot_cache.memoize(('betweenness', samples, limit, keys), compute)
+
+
+ANALYSES = {
+    'degree': degree_analysis,
+    'pagerank': pagerank_analysis,
+    'communities': communities_analysis,
+    'betweenness': betweenness_analysis,
+}
+
+
+ANALYSIS_SOURCES = ('auto', 'materialized', 'live')
+
+EDGES_BETWEEN = """
+    UNWIND $ids AS id
+    MATCH (a)
+    WHERE elementId(a) = id
+    MATCH (a)-[r]->(b)
+    WHERE elementId(b) IN $ids
+    RETURN elementId(a) AS source, elementId(b) AS target, type(r) AS type
+"""
+
+
+def use_materialized(algorithm, params):
+    """
+    Whether to answer from scores written back by materialize.py.
+    
+    'auto' uses them when they exist, were computed at the graph's current
+    change marker and the request keeps the default tuning (the job runs with
+    defaults); 'live' always computes on the snapshot.
+    """
+    source = params.get('source', 'auto')
+    if source not in ANALYSIS_SOURCES:
+        raise ValueError(f'Unknown source: {source}')
+    if source == 'live' or algorithm not in MATERIALIZED_PROPERTIES:
+        return False
+    if source == 'materialized':
+        return True
+    if 'damping' in params or 'maxIterations' in params:
+        return False
+    try:
+        return bool(materializer.labels(algorithm)) and materializer.current(algorithm)
+    except Exception:
+        # No SHOW INDEXES privilege or an older server: fall back to the snapshot
+        return False
+
+
+def edges_between(element_ids):
+    """Edges among the given nodes: from the snapshot if one is loaded, otherwise one read."""
+    snapshot = snapshot_cache.peek()
+    if snapshot is not None:
+        return snapshot.induced_edges([snapshot.index[i] for i in element_ids if i in snapshot.index])
+    rows = query_executor.run([Read(EDGES_BETWEEN, {'ids': element_ids})])[0]
+    return [{'from': row['source'], 'to': row['target'], 'label': row['type']} for row in rows]
+
+
+def materialized_analysis(algorithm, params):
+    """Payload for /analyze/<algorithm> from materialized scores, in the same shape as the live one."""
+    limit = number_param(params, 'limit', 500 if algorithm == 'communities' else 100)
+    keys = resolve_projection(params.get('projection'))
+    if not materializer.labels(algorithm):
+        raise ValueError(f'{algorithm} scores have not been materialized; run materialize.py')
+    
+    # Community 0 is the largest, so communities are listed in ascending order
+    records = materializer.top(algorithm, limit, ascending=algorithm == 'communities')
+    nodes = []
+    for record in records:
+        node = serialize_node(record['n'], keys)
+        if algorithm == 'pagerank':
+            node['score'] = float('%.6g' % record['score'])
+            node['inDegree'] = record['inDegree']
+            node['outDegree'] = record['outDegree']
+        else:
+            node['score'] = int(record['score'])
+        if algorithm == 'communities':
+            node['community'] = node['score']
+        nodes.append(node)
+    
+    payload = {
+        'nodes': nodes,
+        'edges': edges_between([node['id'] for node in nodes]),
+        'algorithm': algorithm,
+        'source': 'materialized'
+    }
+    if algorithm == 'communities':
+        payload['communityCount'] = materializer.community_count()
+        payload['maxScore'] = max((node['score'] for node in nodes), default=0)
+    elif algorithm == 'degree':
+        payload['maxScore'] = max(1, nodes[0]['score']) if nodes else 1
+    else:
+        payload['maxScore'] = nodes[0]['score'] if nodes else 1
+    return payload
+
+
+def analysis_payload(algorithm, params):
+    """Run an analysis and lay out its nodes if the request asks for it."""
+    if use_materialized(algorithm, params):
+        payload = materialized_analysis(algorithm, params)
+    else:
+        payload = ANALYSES[algorithm](params)
+    if wants_layout(params.get('layout'), len(payload['nodes'])):
+        # Memoized payloads are shared, so the laid-out nodes are copies
+        payload = {**payload, 'nodes': with_layout(payload['nodes'], payload['edges'])}
+    return payload
+
+
+def run_analysis(algorithm):
+    """Run an analysis with the tuning parameters from the request body."""
+    try:
+        params = request.get_json(silent=True) or {}
+        fmt = negotiate_format(params.get('format'), request.headers.get('Accept', ''))
+        g.timer.query = f'{algorithm} {json.dumps(params, sort_keys=True)}'
+        with g.timer.phase('compute'):
+            payload = analysis_payload(algorithm, params)
+        with g.timer.phase('encode'):
+            body, mimetype = encode(payload, fmt)
+        return Response(body, mimetype=mimetype)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/analytics/materialize', methods=['GET'])
+def get_materialize_status():
+    """Get the state of the analytics write-back job and which scores are indexed."""
+    return jsonify(materializer.stats())
+
+
+@app.route('/analytics/materialize', methods=['POST'])
+def start_materialize():
+    """Start writing degree/pagerank/community scores back to Neo4j in the background."""
+    params = request.get_json(silent=True) or {}
+    algorithms = params.get('algorithms') or list(MATERIALIZED_PROPERTIES)
+    unknown = [algorithm for algorithm in algorithms if algorithm not in MATERIALIZED_PROPERTIES]
+    if unknown:
+        return jsonify({'error': f"Unknown algorithms: {', '.join(unknown)}"}), 400
+    if not materializer.start(tuple(algorithms)):
+        return jsonify({'started': False, 'error': 'A materialization run is already in progress'}), 409
+    return jsonify({'started': True, 'algorithms': algorithms}), 202
+
+
+@app.route('/analyze/degree', methods=['POST'])
+def analyze_degree():
+    """Calculate degree centrality for nodes."""
+    return run_analysis('degree')
+
+
 @app.route('/analyze/pagerank', methods=['POST'])
 def analyze_pagerank():
-    """Simulate PageRank using iterative degree calculation."""
+    """Calculate PageRank by power iteration over the whole graph."""
+    return run_analysis('pagerank')
+
+
+@app.route('/analyze/communities', methods=['POST'])
+def analyze_communities():
+    """Detect communities using label propagation over the whole graph."""
+    return run_analysis('communities')
+
+
+@app.route('/analyze/betweenness', methods=['POST'])
+def analyze_betweenness():
+    """Calculate betweenness centrality (Brandes, optionally sampled)."""
+    return run_analysis('betweenness')
+
+
+def plan_export(params):
+    """Format, fetch size, batch size and column types for an /export request; ValueError if unusable."""
+    fmt = params.get('format', 'parquet')
+    check_format(fmt)
+    return {
+        'format': fmt,
+        'fetch_size': max(1, number_param(params, 'fetchSize', EXPORT_FETCH_SIZE)),
+        'batch_rows': max(1, number_param(params, 'batchRows', EXPORT_BATCH_ROWS)),
+        'schema': check_schema(params['schema']) if params.get('schema') is not None else None
+    }
+
+
+def analysis_export_options(params):
+    """Tuning for an /export/analyze request, read as the /analyze routes read it."""
+    return {
+        'damping': number_param(params, 'damping', 0.85, float),
+        'max_iter': number_param(params, 'maxIterations', None),
+        'samples': number_param(params, 'samples', None) or None
+    }
+
+
+def export_response(chunks, fmt, name):
+    """Stream an export as a file download."""
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(chunks, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{name}.{extension}"'
+    })
+
+
+@app.route('/export/query', methods=['POST'])
+def export_query_results():
+    """
+    Export a Cypher query's records as Parquet, Arrow IPC or CSV.
+    
+    Records are fetched fetchSize at a time and written batchRows per row
+    group, so the export never holds the whole result in memory.
+    """
+    params = request.get_json(silent=True) or {}
+    cypher = params.get('query', '')
+    try:
+        if not cypher.strip():
+            raise ValueError('Empty query')
+        plan = plan_export(params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
-        driver = get_driver()
-        with driver.session(database=DATABASE) as session:
-            # Simple PageRank approximation: nodes with many incoming links from important nodes
-            result = session.run("""
+        chunks = primed(export_query(cypher, params.get('params'), plan['format'],
+                                     plan['fetch_size'], plan['batch_rows'], plan['schema']))
+        return export_response(chunks, plan['format'], 'query')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/export/analyze/<algorithm>', methods=['POST'])
+def export_analysis_results(algorithm):
+    """Export an analysis' scores for every node as Parquet, Arrow IPC or CSV."""
+    params = request.get_json(silent=True) or {}
+    try:
+        plan = plan_export(params)
+        chunks = primed(export_analysis(algorithm, plan['format'], plan['batch_rows'],
+                                        **analysis_export_options(params)))
+        return export_response(chunks, plan['format'], algorithm)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/query/validate', methods=['POST'])
+def validate_query():
+    """Check a Cypher query with EXPLAIN (planned, never executed)."""
+    cypher = (request.json or {}).get('query', '')
+    if not cypher.strip():
+        return jsonify({'valid': False, 'error': 'Empty query'}), 400
+    
+    try:
+        with get_session() as session:
+            summary = session.run('EXPLAIN ' + cypher).consume()
+        return jsonify({'valid': True, 'queryType': summary.query_type})
+    except Exception as e:
+        return jsonify({'valid': False, 'error': str(e)})
+
+
+@app.route('/node/<path:element_id>', methods=['GET'])
+def get_node(element_id):
+    """Get one node with all of its properties (for lazily loaded details)."""
+    try:
+        with get_session() as session:
+            record = session.run("""
                 MATCH (n)
-                OPTIONAL MATCH (n)<-[r]-(m)
-                WITH n, count(DISTINCT m) as inDegree
-                OPTIONAL MATCH (n)-[r2]->(o)
-                WITH n, inDegree, count(DISTINCT o) as outDegree
-                WITH n, inDegree, outDegree, 
-                     toFloat(inDegree) / (CASE WHEN outDegree = 0 THEN 1 ELSE outDegree END) as ratio
-                RETURN n, inDegree, outDegree, ratio
-                ORDER BY inDegree DESC
-                LIMIT 100
-            """)
-            
-            nodes = {}
-            max_score = 1
-            
-            for record in result:
-                node = record['n']
-                score = record['inDegree']
-                node_id = node.element_id
-                props = dict(node)
-                
-                if score > max_score:
-                    max_score = score
-                
-                nodes[node_id] = {
-                    'id': node_id,
-                    'label': props.get('name', props.get('title', 'Node')),
-                    'labels': list(node.labels),
-                    'properties': props,
-                    'score': score,
-                    'inDegree': record['inDegree'],
-                    'outDegree': record['outDegree']
-                }
-            
-            # Get edges
-            node_ids = list(nodes.keys())
-            result = session.run("""
-                MATCH (n)-[r]->(m)
-                WHERE elementId(n) IN $ids AND elementId(m) IN $ids
-                RETURN r
-            """, {'ids': node_ids})
-            
-            edges = []
-            for record in result:
-                rel = record['r']
-                edges.append({
-                    'from': rel.start_node.element_id,
-                    'to': rel.end_node.element_id,
-                    'label': rel.type
-                })
-        
-        driver.close()
-        return jsonify({
-            'nodes': list(nodes.values()),
-            'edges': edges,
-            'algorithm': 'pagerank',
-            'maxScore': max_score
-        })
+                WHERE elementId(n) = $id
+                RETURN n
+            """, {'id': element_id}).single()
         
+        if record is None:
+            return jsonify({'error': 'Node not found'}), 404
+        return encoded_response(serialize_node(record['n']))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/analyze/communities', methods=['POST'])
-def analyze_communities():
-    """Detect communities using label propagation simulation."""
-    try:
-        driver = get_driver()
-        with driver.session(database=DATABASE) as session:
-            # Get all nodes and their connections
-            result = session.run("""
-                MATCH (n)-[r]->(m)
-                RETURN n, r, m
-                LIMIT 500
-            """)
-            
-            nodes = {}
-            edges = []
-            adjacency = {}  # node_id -> [connected_node_ids]
-            
-            for record in result:
-                n = record['n']
-                m = record['m']
-                rel = record['r']
-                
-                for node in [n, m]:
-                    node_id = node.element_id
-                    if node_id not in nodes:
-                        props = dict(node)
-                        nodes[node_id] = {
-                            'id': node_id,
-                            'label': props.get('name', props.get('title', 'Node')),
-                            'labels': list(node.labels),
-                            'properties': props
-                        }
-                        adjacency[node_id] = []
-                
-                n_id = n.element_id
-                m_id = m.element_id
-                adjacency[n_id].append(m_id)
-                adjacency[m_id].append(n_id)
-                
-                edges.append({
-                    'from': rel.start_node.element_id,
-                    'to': rel.end_node.element_id,
-                    'label': rel.type
-                })
-            
-            # Simple community detection: assign communities based on node labels first
-            # then refine by connectivity
-            communities = {}
-            community_id = 0
-            
-            # Initial assignment by label
-            label_to_community = {}
-            for node_id, node in nodes.items():
-                primary_label = node['labels'][0] if node['labels'] else 'Unknown'
-                if primary_label not in label_to_community:
-                    label_to_community[primary_label] = community_id
-                    community_id += 1
-                communities[node_id] = label_to_community[primary_label]
+@app.route('/query/cache', methods=['GET'])
+def get_query_cache_stats():
+    """Get query result cache statistics."""
+    return jsonify(query_cache.stats())
+
+
+@app.route('/query/cache/invalidate', methods=['POST'])
+def invalidate_query_cache():
+    """Drop every cached query result."""
+    query_cache.invalidate()
+    return jsonify({'invalidated': True})
+
+
+def relationship_types(value):
+    """Relationship type names from a list or a comma-separated string."""
+    if isinstance(value, str):
+        return [t.strip() for t in value.split(',') if t.strip()]
+    return list(value or [])
+
+
+def plan_expand(params, accept=''):
+    """
+    Work out what to run for an /expand request body.
+    
+    ids are the nodes to expand from; known and knownEdges are the node and
+    relationship element ids already on screen, which are left out of the
+    response. depth, fanout and maxNodes may be lowered but not raised.
+    Raises ValueError for a missing ids list or an unknown direction.
+    """
+    ids = params.get('ids')
+    if not isinstance(ids, list) or not ids:
+        raise ValueError('ids must be a non-empty list of element ids')
+    
+    direction = params.get('direction', 'both')
+    if direction not in EXPAND_PATTERNS:
+        raise ValueError(f'Unknown direction: {direction}')
+    types = relationship_types(params.get('types'))
+    
+    return {
+        'ids': ids,
+        'known': set(params.get('known') or []) | set(ids),
+        'known_edges': set(params.get('knownEdges') or []),
+        'depth': max(1, min(number_param(params, 'depth', 1), EXPAND_MAX_DEPTH)),
+        'fanout': max(1, min(number_param(params, 'fanout', EXPAND_FANOUT), EXPAND_FANOUT)),
+        'max_nodes': max(1, min(number_param(params, 'maxNodes', EXPAND_MAX_NODES), EXPAND_MAX_NODES)),
+        'types': types,
+        'keys': resolve_projection(params.get('projection')),
+        'format': negotiate_format(params.get('format'), accept),
+        'cypher': f"""
+            UNWIND $frontier AS id
+            MATCH (n)
+            WHERE elementId(n) = id
+            CALL {{
+                WITH n
+                MATCH (n){EXPAND_PATTERNS[direction]}(m)
+                WHERE size($types) = 0 OR type(r) IN $types
+                RETURN r, m
+                LIMIT $limit
+            }}
+            RETURN id, r, m
+        """
+    }
+
+
+def hop_params(plan, frontier):
+    # One relationship past the fan-out cap shows which nodes were cut short
+    return {'frontier': frontier, 'types': plan['types'], 'limit': plan['fanout'] + 1}
+
+
+class ExpandDelta:
+    """New nodes and edges found by one /expand request, hop by hop."""
+    
+    def __init__(self, plan):
+        self.plan = plan
+        self.nodes = {}
+        self.edges = {}
+        self.capped = []
+        self.truncated = False
+        self.hops = 0
+    
+    def add_hop(self, records):
+        """Add one hop's (id, r, m) records and return the next frontier."""
+        self.hops += 1
+        followed = {}
+        frontier = []
+        for record in records:
+            source = record['id']
+            followed[source] = followed.get(source, 0) + 1
+            if followed[source] > self.plan['fanout']:
+                self.capped.append(source)
+                continue
             
-            # Label propagation refinement (3 iterations)
-            for _ in range(3):
-                new_communities = {}
-                for node_id in nodes:
-                    if node_id in adjacency and adjacency[node_id]:
-                        # Get most common community among neighbors
-                        neighbor_communities = [communities.get(n, 0) for n in adjacency[node_id]]
-                        if neighbor_communities:
-                            new_communities[node_id] = max(set(neighbor_communities), 
-                                                          key=neighbor_communities.count)
-                        else:
-                            new_communities[node_id] = communities[node_id]
-                    else:
-                        new_communities[node_id] = communities[node_id]
-                communities = new_communities
+            neighbour = record['m']
+            node_id = neighbour.element_id
+            if node_id not in self.plan['known'] and node_id not in self.nodes:
+                if len(self.nodes) >= self.plan['max_nodes']:
+                    self.truncated = True
+                    continue
+                self.nodes[node_id] = serialize_node(neighbour, self.plan['keys'])
+                frontier.append(node_id)
             
-            # Add community to nodes
-            for node_id in nodes:
-                nodes[node_id]['community'] = communities.get(node_id, 0)
-                nodes[node_id]['score'] = communities.get(node_id, 0)
-        
-        driver.close()
-        return jsonify({
-            'nodes': list(nodes.values()),
-            'edges': edges,
-            'algorithm': 'communities',
-            'maxScore': max(communities.values()) if communities else 0
-        })
-        
+            rel = record['r']
+            if rel.element_id not in self.plan['known_edges']:
+                self.edges[rel.element_id] = serialize_edge(rel, self.plan['keys'], with_id=True)
+        return frontier
+    
+    def payload(self):
+        return {
+            'nodes': list(self.nodes.values()),
+            'edges': list(self.edges.values()),
+            'meta': {
+                'hops': self.hops,
+                'capped': self.capped,
+                'truncated': self.truncated
+            }
+        }
+
+
+@app.route('/expand', methods=['POST'])
+def expand():
+    """
+    Get the neighbourhood of on-screen nodes as a delta.
+    
+    Follows up to depth hops from ids (optionally only relationships of the
+    given types), at most fanout relationships per node per hop, and returns
+    only nodes and edges the client does not already have.
+    """
+    try:
+        plan = plan_expand(request.get_json(silent=True) or {}, request.headers.get('Accept', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        delta = ExpandDelta(plan)
+        frontier = plan['ids']
+        with get_session() as session:
+            for _ in range(plan['depth']):
+                if not frontier or delta.truncated:
+                    break
+                frontier = delta.add_hop(session.run(plan['cypher'], hop_params(plan, frontier)))
+        return encoded_response(delta.payload(), plan['format'])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/analyze/betweenness', methods=['POST'])
-def analyze_betweenness():
-    """Approximate betweenness centrality - nodes that bridge communities."""
+@app.route('/summary/expand', methods=['POST'])
+def expand_summary():
+    """Get the members of one summary super-node and the edges touching them."""
+    params = request.get_json(silent=True) or {}
+    summary = summary_store.get(params.get('summaryId', ''))
+    if summary is None:
+        return jsonify({'error': 'Summary expired; run the query again'}), 404
     try:
-        driver = get_driver()
-        with driver.session(database=DATABASE) as session:
-            # Find nodes that connect different label types (bridge nodes)
-            result = session.run("""
-                MATCH (n)-[r]-(m)
-                WITH n, collect(DISTINCT labels(m)[0]) as connectedLabels
-                WITH n, size(connectedLabels) as labelDiversity,
-                     connectedLabels
-                RETURN n, labelDiversity, connectedLabels
-                ORDER BY labelDiversity DESC
-                LIMIT 100
-            """)
-            
-            nodes = {}
-            max_score = 1
-            
-            for record in result:
-                node = record['n']
-                score = record['labelDiversity']
-                node_id = node.element_id
-                props = dict(node)
-                
-                if score > max_score:
-                    max_score = score
-                
-                nodes[node_id] = {
-                    'id': node_id,
-                    'label': props.get('name', props.get('title', 'Node')),
-                    'labels': list(node.labels),
-                    'properties': props,
-                    'score': score,
-                    'connectedLabels': record['connectedLabels']
-                }
-            
-            # Get edges
-            node_ids = list(nodes.keys())
-            result = session.run("""
-                MATCH (n)-[r]->(m)
-                WHERE elementId(n) IN $ids AND elementId(m) IN $ids
-                RETURN r
-            """, {'ids': node_ids})
-            
-            edges = []
-            for record in result:
-                rel = record['r']
-                edges.append({
-                    'from': rel.start_node.element_id,
-                    'to': rel.end_node.element_id,
-                    'label': rel.type
-                })
-        
-        driver.close()
-        return jsonify({
-            'nodes': list(nodes.values()),
-            'edges': edges,
-            'algorithm': 'betweenness',
-            'maxScore': max_score
-        })
-        
+        return jsonify(summary.expand(params.get('group'), params.get('expanded') or []))
+    except KeyError:
+        return jsonify({'error': 'Unknown group'}), 404
+
+
+def plan_search(params):
+    """Normalize /search parameters (JSON body or query string)."""
+    query = params.get('q', params.get('query')) or ''
+    if not query.strip():
+        raise ValueError('Missing search query')
+    kinds = params.get('kind') or []
+    if isinstance(kinds, str):
+        kinds = [kind for kind in kinds.split(',') if kind]
+    return {
+        'query': query,
+        'limit': max(1, min(number_param(params, 'limit', SEARCH_LIMIT), SEARCH_MAX_LIMIT)),
+        'kinds': kinds,
+        'prefix': params.get('prefix', True) not in (False, 'false', '0'),
+        'graph': params.get('graph', False) in (True, 'true', '1'),
+        'keys': resolve_projection(params.get('projection')),
+        'layout': params.get('layout')
+    }
+
+
+def search_graph(index, plan):
+    """
+    Search hits as a nodes/edges payload the visualization can draw directly.
+    
+    Nodes are fetched by element id and edges between them come from the
+    analytics snapshot, as for /analyze/*.
+    """
+    ranked, scores, total, matched = index.search(plan['query'], plan['limit'], plan['kinds'], plan['prefix'])
+    snapshot = snapshot_cache.get()
+    score_of = {index.ids[i]: float(score) for i, score in zip(ranked.tolist(), scores.tolist())}
+    indices = [snapshot.index[element_id] for element_id in score_of if element_id in snapshot.index]
+    nodes = [node for _, node in fetch_nodes(snapshot, indices, plan['keys'])]
+    
+    for node in nodes:
+        node['score'] = round(score_of[node['id']], 4)
+    
+    edges = snapshot.induced_edges(indices)
+    if wants_layout(plan['layout'], len(nodes)):
+        nodes = with_layout(nodes, edges)
+    return {
+        'nodes': nodes,
+        'edges': edges,
+        'algorithm': 'search',
+        'maxScore': max((node['score'] for node in nodes), default=1),
+        'total': total,
+        'terms': matched
+    }
+
+
+def search_payload(plan):
+    """Ranked results for /search, or a graph of them if plan['graph']."""
+    start = time.perf_counter()
+    index = search_index()
+    if plan['graph']:
+        payload = search_graph(index, plan)
+    else:
+        payload = index.results(plan['query'], plan['limit'], plan['kinds'], plan['prefix'])
+    payload['tookMs'] = round((time.perf_counter() - start) * 1000, 2)
+    return payload
+
+
+@app.route('/search', methods=['GET', 'POST'])
+def search():
+    """Rank SymbolModel nodes by name and documentation (BM25 with fuzzy and prefix matching)."""
+    try:
+        params = request.get_json(silent=True) or request.args.to_dict()
+        plan = plan_search(params)
+        fmt = negotiate_format(params.get('format'), request.headers.get('Accept', ''))
+        g.timer.query = f"search {plan['query']}"
+        with g.timer.phase('search'):
+            payload = search_payload(plan)
+        with g.timer.phase('encode'):
+            body, mimetype = encode(payload, fmt)
+        return Response(body, mimetype=mimetype)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/search/suggest', methods=['GET'])
+def suggest_symbols():
+    """Autocomplete symbol names from a prefix of any word in them."""
+    try:
+        limit = max(1, min(number_param(request.args, 'limit', 10), SEARCH_MAX_LIMIT))
+        return jsonify({'suggestions': search_index().suggest(request.args.get('q', ''), limit)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/search/stats', methods=['GET'])
+def get_search_stats():
+    """Get the size of the search index (building it if needed)."""
+    try:
+        return jsonify(search_index().stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def plan_traversal(params, direction, depth, max_depth):
+    """
+    Direction, relationship types, depth and node cap for /paths and /impact.
+    
+    direction and depth are the defaults; maxDepth and maxNodes may be lowered
+    but not raised. Raises ValueError for an unknown direction.
+    """
+    direction = params.get('direction', direction)
+    if direction not in EXPAND_PATTERNS:
+        raise ValueError(f'Unknown direction: {direction}')
+    return {
+        'direction': direction,
+        # None follows every type; an explicit list (even of unknown types) filters
+        'types': relationship_types(params.get('types')) or None,
+        'depth': max(0, min(number_param(params, 'maxDepth', depth), max_depth)),
+        'max_nodes': max(1, min(number_param(params, 'maxNodes', TRAVERSAL_MAX_NODES), TRAVERSAL_MAX_NODES)),
+        'keys': resolve_projection(params.get('projection')),
+        'layout': params.get('layout')
+    }
+
+
+def snapshot_indices(snapshot, element_ids):
+    """Dense snapshot ids of element ids; LookupError if any is not in the snapshot."""
+    missing = [element_id for element_id in element_ids if element_id not in snapshot.index]
+    if missing:
+        raise LookupError(f"Not in the analytics snapshot: {', '.join(map(str, missing))}")
+    return [snapshot.index[element_id] for element_id in element_ids]
+
+
+def traversal_graph(snapshot, layers, edges, plan):
+    """
+    Nodes and edges of a traversal as a payload the visualization can draw.
+    
+    layers[d] are the dense ids at depth d (each node gets a depth field) and
+    edges is (sources, targets, rel_types); both are cut to plan['max_nodes'].
+    """
+    indices = np.concatenate(layers)[:plan['max_nodes']] if layers else np.empty(0, dtype=np.int32)
+    depth = np.repeat(np.arange(len(layers)), [len(layer) for layer in layers])
+    depth_of = dict(zip(indices.tolist(), depth.tolist()))
+    nodes = []
+    for i, node in fetch_nodes(snapshot, indices.tolist(), plan['keys']):
+        node['depth'] = depth_of[i]
+        nodes.append(node)
+    
+    # Edges between nodes that were cut or deleted since the snapshot are dropped
+    kept = np.zeros(snapshot.num_nodes, dtype=bool)
+    kept[[snapshot.index[node['id']] for node in nodes]] = True
+    sources, targets, rel_types = edges
+    keep = kept[sources] & kept[targets]
+    edges = snapshot.edge_dicts(sources[keep], targets[keep], rel_types[keep])
+    if wants_layout(plan['layout'], len(nodes)):
+        nodes = with_layout(nodes, edges)
+    return {'nodes': nodes, 'edges': edges, 'truncated': len(indices) < sum(len(layer) for layer in layers)}
+
+
+def paths_payload(params):
+    """Every shortest path between two nodes, for /paths."""
+    if not params.get('from') or not params.get('to'):
+        raise ValueError('from and to must be element ids')
+    plan = plan_traversal(params, 'out', PATHS_MAX_DEPTH, PATHS_MAX_DEPTH)
+    start = time.perf_counter()
+    snapshot = snapshot_cache.get()
+    source, target = snapshot_indices(snapshot, [params['from'], params['to']])
+    layers, edges = shortest_paths(snapshot, source, target, plan['direction'], plan['types'], plan['depth'])
+    payload = traversal_graph(snapshot, layers, edges, plan)
+    payload['length'] = len(layers) - 1 if layers else None
+    payload['tookMs'] = round((time.perf_counter() - start) * 1000, 2)
+    return payload
+
+
+def impact_payload(params):
+    """
+    Nodes that reach the given ones within maxDepth hops, for /impact.
+    
+    Scores fall with depth so the changed nodes stand out when drawn as an
+    analysis; direction 'out' gives what the nodes depend on instead.
+    """
+    ids = params.get('ids') or ([params['id']] if params.get('id') else [])
+    if not isinstance(ids, list) or not ids:
+        raise ValueError('ids must be a non-empty list of element ids')
+    plan = plan_traversal(params, 'in', IMPACT_DEPTH, IMPACT_MAX_DEPTH)
+    start = time.perf_counter()
+    snapshot = snapshot_cache.get()
+    seeds = snapshot_indices(snapshot, ids)
+    layers, edges, truncated = reachable(snapshot, seeds, plan['direction'], plan['types'], plan['depth'],
+                                         plan['max_nodes'])
+    payload = traversal_graph(snapshot, layers, edges, plan)
+    
+    levels = len(layers) - (0 if layers[-1].size else 1)
+    for node in payload['nodes']:
+        node['score'] = levels - node['depth']
+    payload.update({
+        'algorithm': 'impact',
+        'maxScore': levels,
+        'byDepth': [len(layer) for layer in layers[:levels]],
+        'truncated': truncated or payload['truncated'],
+        'tookMs': round((time.perf_counter() - start) * 1000, 2)
+    })
+    return payload
+
+
+def traversal(payload_fn, name):
+    """Run a /paths or /impact request and encode the result."""
+    try:
+        params = request.get_json(silent=True) or {}
+        fmt = negotiate_format(params.get('format'), request.headers.get('Accept', ''))
+        g.timer.query = f'{name} {json.dumps(params, sort_keys=True)}'
+        with g.timer.phase('traverse'):
+            payload = payload_fn(params)
+        with g.timer.phase('encode'):
+            body, mimetype = encode(payload, fmt)
+        return Response(body, mimetype=mimetype)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/paths', methods=['POST'])
+def paths():
+    """
+    Get every shortest path from one node to another as a subgraph.
+    
+    Runs a bidirectional BFS over the analytics snapshot following direction
+    (out, in or both) and only the given relationship types, up to maxDepth hops.
+    """
+    return traversal(paths_payload, 'paths')
+
+
+@app.route('/impact', methods=['POST'])
+def impact():
+    """
+    Get everything that depends on the given nodes, up to maxDepth hops away.
+    
+    Walks relationships backwards (bounded reverse reachability) over the
+    analytics snapshot, optionally only those of the given types.
+    """
+    return traversal(impact_payload, 'impact')
+
+
+@app.route('/layout/cache', methods=['GET'])
+def get_layout_cache_stats():
+    """Get server-side layout cache statistics."""
+    return jsonify(layout_cache.stats())
+
+
+@app.route('/snapshot', methods=['GET'])
+def get_snapshot_stats():
+    """Get the state of the cached analytics snapshot."""
+    return jsonify(snapshot_cache.stats())
+
+
+@app.route('/snapshot/invalidate', methods=['POST'])
+def invalidate_snapshot():
+    """Drop the cached analytics snapshot so the next analysis reloads it."""
+    snapshot_cache.invalidate()
+    return jsonify({'invalidated': True})
+
+
 @app.route('/labels', methods=['GET'])
 def get_labels():
     """Get all node labels in the database."""
     try:
-        driver = get_driver()
-        with driver.session(database=DATABASE) as session:
+        with get_session() as session:
             result = session.run("CALL db.labels()")
             labels = [record[0] for record in result]
-        driver.close()
         return jsonify({'labels': labels})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -411,11 +1447,9 @@ def get_labels():
 def get_relationships():
     """Get all relationship types in the database."""
     try:
-        driver = get_driver()
-        with driver.session(database=DATABASE) as session:
+        with get_session() as session:
             result = session.run("CALL db.relationshipTypes()")
             types = [record[0] for record in result]
-        driver.close()
         return jsonify({'types': types})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -423,84 +1457,90 @@ def get_relationships():
 
 @app.route('/schema', methods=['GET'])
 def get_schema():
-    """Get database schema information for AI context."""
+    """Get database schema information for AI context (served from memory)."""
     try:
-        driver = get_driver()
-        schema = {}
-        
-        with driver.session(database=DATABASE) as session:
-            # Get labels
-            result = session.run("CALL db.labels()")
-            schema['labels'] = [record[0] for record in result]
-            
-            # Get relationship types
-            result = session.run("CALL db.relationshipTypes()")
-            schema['relationships'] = [record[0] for record in result]
-            
-            # Get property keys for SymbolModel
-            result = session.run("""
-                MATCH (n:SymbolModel) 
-                WITH n LIMIT 1 
-                RETURN keys(n) as props
-            """)
-            record = result.single()
-            schema['symbolProperties'] = record['props'] if record else []
-            
-            # Get distinct kinds
-            result = session.run("MATCH (n:SymbolModel) RETURN DISTINCT n.kind as kind")
-            schema['kinds'] = [record['kind'] for record in result if record['kind']]
-            
-            # Sample data for context
-            result = session.run("MATCH (n:SymbolModel) RETURN n.name as name LIMIT 5")
-            schema['sampleNames'] = [record['name'] for record in result]
-        
-        driver.close()
-        return jsonify(schema)
+        return jsonify(schema_cache.get())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/ai/chat', methods=['POST'])
-def ai_chat():
-    """Chat with Ollama to help build Cypher queries."""
-    import requests
-    
-    user_message = request.json.get('message', '')
-    model = request.json.get('model', 'llama3.2')
-    
-    if not user_message.strip():
-        return jsonify({'error': 'Empty message'}), 400
-    
+@app.route('/schema/stats', methods=['GET'])
+def get_schema_stats():
+    """Get the state of the cached schema."""
+    return jsonify(schema_cache.stats())
+
+
+@app.route('/schema/refresh', methods=['POST'])
+def refresh_schema():
+    """Re-introspect the schema now instead of waiting for the next interval."""
     try:
-        # Get schema for context
-        driver = get_driver()
-        with driver.session(database=DATABASE) as session:
-            result = session.run("CALL db.labels()")
-            labels = [record[0] for record in result]
-            
-            result = session.run("CALL db.relationshipTypes()")
-            relationships = [record[0] for record in result]
-            
-            result = session.run("MATCH (n:SymbolModel) RETURN DISTINCT n.kind as kind")
-            kinds = [record['kind'] for record in result if record['kind']]
-            
-            result = session.run("""
-                MATCH (n:SymbolModel) 
-                WITH n LIMIT 1 
-                RETURN keys(n) as props
-            """)
-            record = result.single()
-            symbol_props = record['props'] if record else []
-        driver.close()
-        
-        # Build system prompt with schema context
-        system_prompt = f"""You are a Neo4j Cypher query assistant. Help users build Cypher queries for their graph database.
+        return jsonify(schema_cache.refresh())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def metric_gauges():
+    """Point-in-time values from the caches and connection pool for /metrics."""
+    cache = query_cache.stats()
+    snapshot = snapshot_cache.stats()
+    pool = pool_stats()
+    return {
+        'app_query_cache_entries': ('Entries in the query result cache.', cache['entries']),
+        'app_query_cache_bytes': ('Bytes held by the query result cache.', cache['bytes']),
+        'app_query_cache_hit_ratio': ('Query cache hits / lookups.', cache['hitRate']),
+        'app_snapshot_nodes': ('Nodes in the analytics snapshot.', snapshot['nodes']),
+        'app_snapshot_edges': ('Relationships in the analytics snapshot.', snapshot['edges']),
+        'app_neo4j_sessions_in_use': ('Neo4j sessions currently open.', pool['inUse']),
+        'app_neo4j_connections_open': ('Pooled Neo4j connections.', pool['openConnections']),
+        'app_neo4j_acquire_timeouts': ('Session acquisitions that timed out.', pool['timeouts']),
+    }
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, phase and cache metrics in Prometheus text format."""
+    return Response(metrics.render(metric_gauges()), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """Get the slowest recent /query and /analyze requests."""
+    return jsonify({**slow_queries.stats(), 'queries': slow_queries.entries()})
+
+
+@app.route('/slow-queries/clear', methods=['POST'])
+def clear_slow_queries():
+    """Empty the slow-query log."""
+    slow_queries.clear()
+    return jsonify({'cleared': True})
+
+
+@app.route('/executor/stats', methods=['GET'])
+def get_executor_stats():
+    """Get concurrent read executor usage (batches, timeouts, wall vs serial time)."""
+    return jsonify(query_executor.stats())
+
+
+@app.route('/pool/stats', methods=['GET'])
+def get_pool_stats():
+    """Get Neo4j connection pool usage."""
+    return jsonify(pool_stats())
+
+
+def build_system_prompt(schema):
+    """Build the Cypher assistant system prompt with schema context."""
+    scores = ''
+    if 'pagerank' in schema['symbolProperties']:
+        # Written back by materialize.py and indexed, so ordering and filtering on them is cheap
+        scores = ("\n7. Precomputed scores: n.pagerank and n.degree (higher is more central), "
+                  "n.community (0 is the largest); e.g. ORDER BY n.pagerank DESC LIMIT 20")
+    return f"""You are a Neo4j Cypher query assistant. Help users build Cypher queries for their graph database.
 
 DATABASE SCHEMA:
-- Node Labels: {', '.join(labels)}
-- Relationship Types: {', '.join(relationships)}
-- SymbolModel kinds: {', '.join(kinds)}
-- SymbolModel properties: {', '.join(symbol_props)}
+- Node Labels: {', '.join(schema['labels'])}
+- Relationship Types: {', '.join(schema['relationships'])}
+- SymbolModel kinds: {', '.join(schema['kinds'])}
+- SymbolModel properties: {', '.join(schema['symbolProperties'])}
 
 IMPORTANT RULES:
 1. SymbolModel nodes have a 'kind' property (class, function, method)
@@ -508,7 +1548,7 @@ IMPORTANT RULES:
 3. FileModel contains SymbolModel via CONTAINS relationship
 4. FolderModel contains FileModel via CONTAINS relationship
 5. Symbols can have tags via HAS_TAG relationship to Tag nodes
-6. The 'documentation' property contains JSON with summary, description, parameters, examples, etc.
+6. The 'documentation' property contains JSON with summary, description, parameters, examples, etc.{scores}
 
 EXAMPLE QUERIES:
 - All classes: MATCH (n:SymbolModel) WHERE n.kind = 'class' RETURN n LIMIT 50
@@ -520,22 +1560,212 @@ EXAMPLE QUERIES:
 Respond with a valid Cypher query. If explaining, keep it brief and include the query.
 Always return visualization-friendly queries (RETURN nodes and relationships, not just properties)."""
 
+
+# Fenced block with a newline after the opening fence; the closing fence may not have arrived yet
+CYPHER_FENCE = re.compile(r'```(?:cypher|sql)?[ \t]*\n([\s\S]*?)(```|$)', re.IGNORECASE)
+CYPHER_FENCE_DONE = re.compile(r'```(?:cypher|sql)?\s*([\s\S]*?)```', re.IGNORECASE)
+CYPHER_BARE = re.compile(r'(MATCH\s+[\s\S]*?(?:RETURN|LIMIT)[\s\S]*?)(?:\n\n|\n(?=[A-Z])|$)', re.IGNORECASE)
+
+
+def extract_cypher(text):
+    """Pull the Cypher query out of a complete LLM answer, or return None."""
+    match = CYPHER_FENCE_DONE.search(text)
+    if match:
+        return match.group(1).strip()
+    match = CYPHER_BARE.search(text)
+    return match.group(1).strip() if match else None
+
+
+class CypherExtractor:
+    """Tracks the Cypher query inside an answer that is still being generated."""
+    
+    def __init__(self):
+        self.text = ''
+        self.query = None
+        self.complete = False
+    
+    def feed(self, token):
+        """Append a token; return {'query', 'complete'} when the query changed, else None."""
+        self.text += token
+        if self.complete:
+            return None
+        
+        match = CYPHER_FENCE.search(self.text)
+        if not match:
+            return None
+        
+        # Drop a partially received closing fence
+        query = match.group(1).rstrip('`').strip()
+        complete = bool(match.group(2))
+        if query == self.query and complete == self.complete:
+            return None
+        self.query = query
+        self.complete = complete
+        return {'query': query, 'complete': complete}
+    
+    def finish(self):
+        """Final query once generation has ended (falls back to a bare MATCH)."""
+        if not self.complete:
+            self.query = extract_cypher(self.text)
+            self.complete = self.query is not None
+        return self.query
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+class ChatRelay:
+    """Turns Ollama's streamed /api/generate lines into SSE messages."""
+    
+    def __init__(self, model):
+        self.model = model
+        self.extractor = CypherExtractor()
+        self.finished = False
+        self.failed = False
+    
+    def feed(self, line):
+        """Return the SSE messages for one NDJSON line from Ollama."""
+        if not line:
+            return []
+        chunk = json.loads(line)
+        if chunk.get('error'):
+            return [self.error(chunk['error'])]
+        
+        token = chunk.get('response', '')
+        events = [sse_event('token', {'token': token})] if token else []
+        cypher = self.extractor.feed(token)
+        if cypher:
+            events.append(sse_event('cypher', cypher))
+        if chunk.get('done'):
+            events.append(self.done())
+        return events
+    
+    @property
+    def answer(self):
+        """(response, query) of a completed answer worth caching, else None."""
+        if not self.finished or self.failed or not self.extractor.finish():
+            return None
+        return self.extractor.text, self.extractor.query
+    
+    def error(self, message):
+        """An 'error' message; the stream ends after it."""
+        self.finished = True
+        self.failed = True
+        return sse_event('error', {'error': message})
+    
+    def done(self):
+        """Closing 'done' message with the full answer and final query."""
+        self.finished = True
+        return sse_event('done', {
+            'response': self.extractor.text,
+            'query': self.extractor.finish(),
+            'model': self.model
+        })
+
+
+def cached_chat_events(cached, model):
+    """Replay a cached answer as the same SSE messages a live answer produces."""
+    return [
+        sse_event('token', {'token': cached['response']}),
+        sse_event('cypher', {'query': cached['query'], 'complete': True}),
+        sse_event('done', chat_answer(cached, model)),
+    ]
+
+
+def chat_answer(cached, model):
+    """/ai/chat response body for a cached answer."""
+    return {
+        'response': cached['response'],
+        'query': cached['query'],
+        'model': model,
+        'cached': {key: cached[key] for key in ('match', 'similarity', 'prompt')}
+    }
+
+
+def lookup_answer(model, schema_version, message):
+    """
+    Find a cached answer for message: exact prompt first, then nearest embedding.
+    
+    Returns (cached answer or None, embedding to store with a fresh answer).
+    """
+    cached = chat_cache.lookup(model, schema_version, message)
+    if cached is not None or CHAT_CACHE_THRESHOLD > 1:
+        return cached, None
+    embedding = ollama.embed(message, CHAT_EMBED_MODEL)
+    return chat_cache.nearest(model, schema_version, embedding), embedding
+
+
+def ollama_payload(model, message, system_prompt, stream=False):
+    return {
+        'model': model,
+        'prompt': message,
+        'system': system_prompt,
+        'stream': stream,
+        'keep_alive': OLLAMA_KEEP_ALIVE
+    }
+
+
+@app.route('/ai/chat', methods=['POST'])
+def ai_chat():
+    """Chat with Ollama to help build Cypher queries."""
+    user_message = request.json.get('message', '')
+    model = request.json.get('model', ollama.model)
+    stream = bool(request.json.get('stream'))
+    use_cache = request.json.get('cache', True)
+    
+    if not user_message.strip():
+        return jsonify({'error': 'Empty message'}), 400
+    
+    try:
+        schema = schema_cache.get()
+        system_prompt = build_system_prompt(schema)
+        
+        cached, embedding = None, None
+        if use_cache:
+            cached, embedding = lookup_answer(model, schema['version'], user_message)
+        if cached is not None:
+            if stream:
+                return Response(cached_chat_events(cached, model), mimetype='text/event-stream')
+            return jsonify(chat_answer(cached, model))
+        
+        if stream:
+            # Leaving the with-block closes the upstream connection, which
+            # makes Ollama stop generating when the browser goes away
+            upstream = ollama.generate(ollama_payload(model, user_message, system_prompt), stream=True)
+            if upstream.status_code != 200:
+                upstream.close()
+                return jsonify({'error': f'Ollama error: {upstream.status_code}'}), 500
+            
+            def generate():
+                relay = ChatRelay(model)
+                with upstream:
+                    try:
+                        for line in upstream.iter_lines():
+                            yield from relay.feed(line)
+                    except requests.exceptions.RequestException as e:
+                        yield relay.error(str(e))
+                if not relay.finished:
+                    yield relay.done()
+                if use_cache and relay.answer:
+                    chat_cache.store(model, schema['version'], user_message, *relay.answer, embedding)
+            
+            return Response(generate(), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        
         # Call Ollama API
-        ollama_response = requests.post(
-            'http://localhost:11434/api/generate',
-            json={
-                'model': model,
-                'prompt': user_message,
-                'system': system_prompt,
-                'stream': False
-            },
-            timeout=60
-        )
+        ollama_response = ollama.generate(ollama_payload(model, user_message, system_prompt))
         
         if ollama_response.status_code == 200:
             response_data = ollama_response.json()
+            response_text = response_data.get('response', '')
+            query = extract_cypher(response_text)
+            if use_cache and query:
+                chat_cache.store(model, schema['version'], user_message, response_text, query, embedding)
             return jsonify({
-                'response': response_data.get('response', ''),
+                'response': response_text,
+                'query': query,
                 'model': model
             })
         else:
@@ -547,21 +1777,42 @@ Always return visualization-friendly queries (RETURN nodes and relationships, no
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/ai/cache', methods=['GET'])
+def get_chat_cache_stats():
+    """Get NL->Cypher answer cache statistics."""
+    return jsonify(chat_cache.stats())
+
+
+@app.route('/ai/cache/invalidate', methods=['POST'])
+def invalidate_chat_cache():
+    """Delete every cached chat answer."""
+    chat_cache.clear()
+    return jsonify({'invalidated': True})
+
+
 @app.route('/ai/models', methods=['GET'])
 def get_ollama_models():
-    """Get available Ollama models."""
-    import requests
-    
+    """Get available Ollama models (cached briefly)."""
+    ollama.start_warmup()
     try:
-        response = requests.get('http://localhost:11434/api/tags', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            models = [m['name'] for m in data.get('models', [])]
-            return jsonify({'models': models})
-        return jsonify({'models': []})
-    except:
+        return jsonify({'models': ollama.models()})
+    except requests.exceptions.RequestException:
         return jsonify({'models': [], 'error': 'Ollama not available'})
 
 
+@app.route('/ai/warmup', methods=['POST'])
+def warm_up_model():
+    """Load a model into Ollama's memory ahead of the first chat."""
+    model = (request.get_json(silent=True) or {}).get('model', ollama.model)
+    return jsonify({'model': model, 'warm': ollama.warm_up(model)})
+
+
+@app.route('/ai/stats', methods=['GET'])
+def get_ollama_stats():
+    """Get Ollama client configuration and warm-up state."""
+    return jsonify(ollama.stats())
+
+
 if __name__ == '__main__':
+    ollama.start_warmup()
     app.run(debug=True, port=5000)
@@ -0,0 +1,690 @@
+"""
+Async (ASGI) serving path for the Neo4j visualization app.
+
+Same routes as app.py, served by Quart on the async Neo4j driver and a shared
+httpx.AsyncClient, so slow Ollama calls and queries wait on the event loop
+instead of holding a worker thread each. CPU-bound analytics run in a thread.
+
+Production entry point:
+    hypercorn asgi_app:app --bind 0.0.0.0:5000 --workers 2
+"""
+import asyncio
+import json
+import time
+
+import httpx
+from quart import Quart, Response, g, render_template, request, jsonify
+from quart.wrappers.response import IterableBody
+
+from neo4j_connection import get_async_session, close_async_driver, pool_stats
+from query_executor import query_executor
+from materialize import materializer, PROPERTIES as MATERIALIZED_PROPERTIES
+from snapshot_cache import snapshot_cache
+from schema_cache import schema_cache
+from chat_cache import chat_cache, CHAT_CACHE_THRESHOLD, CHAT_EMBED_MODEL
+from ollama_client import ollama, OLLAMA_URL, OLLAMA_TIMEOUT, OLLAMA_KEEP_ALIVE, OLLAMA_POOL_SIZE
+from query_cache import query_cache
+from search_index import search_index
+from serializer import serialize_node, negotiate_format, dumps, encode
+from graph_layout import layout_cache
+from graph_summary import summary_store
+from profiling import RequestTimer, metrics, slow_queries, finish_request, recorded_async_stream
+from app import (
+    GraphBatcher, ChatRelay, build_system_prompt,
+    cached_chat_events, chat_answer, extract_cypher, extract_graph_data, ollama_payload,
+    plan_query, finish_meta, query_body, record_summary, start_budget, admit_record,
+    analysis_payload, finish_graph, plan_expand, hop_params, ExpandDelta, plan_export,
+    phase_timings, cacheable, metric_gauges, plan_search, search_payload, SEARCH_MAX_LIMIT,
+    paths_payload, impact_payload, number_param, analysis_export_options
+)
+from export import EXPORT_FORMATS, export_query, export_analysis, primed
+
+app = Quart(__name__)
+http_client = None
+
+
+@app.before_serving
+async def startup():
+    global http_client
+    http_client = httpx.AsyncClient(
+        base_url=OLLAMA_URL, timeout=OLLAMA_TIMEOUT,
+        limits=httpx.Limits(max_connections=OLLAMA_POOL_SIZE, max_keepalive_connections=OLLAMA_POOL_SIZE))
+    ollama.start_warmup()
+
+
+@app.after_serving
+async def shutdown():
+    await http_client.aclose()
+    await close_async_driver()
+
+
+@app.before_request
+async def start_timer():
+    g.timer = RequestTimer()
+
+
+@app.after_request
+async def record_timing(response):
+    """Feed the request's timings to /metrics and the slow-query log."""
+    timer = g.get('timer')
+    if timer is not None and isinstance(response.response, IterableBody):
+        # The body is produced after this hook returns, so record the request when it has been sent
+        response.response = IterableBody(recorded_async_stream(
+            response.response.iter, request.endpoint or 'unknown', timer, response.status_code))
+    elif timer is not None:
+        finish_request(request.endpoint or 'unknown', timer, response.status_code,
+                       response.content_length)
+        response.headers['Server-Timing'] = timer.server_timing()
+    return response
+
+
+@app.route('/')
+async def index():
+    return await render_template('index.html')
+
+
+async def capped_records(result, meta, max_records, max_bytes):
+    """Iterate an async result, stopping early once a ceiling is hit."""
+    start_budget(meta)
+    async for record in result:
+        if not admit_record(record, meta, max_records, max_bytes):
+            return
+        yield record
+
+
+@app.route('/query', methods=['POST'])
+async def query():
+    """Execute a Cypher query and return nodes/edges for visualization."""
+    try:
+        plan = plan_query(await request.get_json(), request.headers.get('Accept', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    meta = {'skip': plan['skip']}
+    timer = g.timer
+    timer.query = plan['cypher']
+
+    if plan['stream']:
+        async def generate():
+            try:
+                async with get_async_session() as session:
+                    with timer.phase('fetch'):
+                        result = await session.run(plan['run_cypher'], plan['run_params'])
+                    batcher = GraphBatcher(plan['batch_size'], keys=plan['keys'])
+
+                    # Time spent waiting for records and building batches, not the client reading them
+                    clock = time.perf_counter
+                    fetched = extracted = 0.0
+                    mark = clock()
+                    async for record in capped_records(result, meta, plan['max_records'],
+                                                       plan['max_bytes']):
+                        now = clock()
+                        fetched += now - mark
+                        line = batcher.add(record)
+                        mark = clock()
+                        extracted += mark - now
+                        if line:
+                            yield line
+                            mark = clock()
+
+                    line = batcher.flush()
+                    if line:
+                        yield line
+                    timer.add('fetch', fetched)
+                    timer.add('extract', extracted)
+                    with timer.phase('fetch'):
+                        record_summary(await result.consume(), meta)
+                    yield batcher.done(phase_timings(timer, finish_meta(plan, meta)))
+            except Exception as e:
+                yield dumps({'error': str(e)}) + b'\n'
+
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    cached = query_cache.get(plan['cache_key'])
+    if cached is not None:
+        body, mimetype = cached
+        return Response(body, mimetype=mimetype, headers={'X-Query-Cache': 'HIT'})
+    generation = query_cache.generation
+
+    try:
+        with timer.phase('fetch'):
+            async with get_async_session() as session:
+                result = await session.run(plan['run_cypher'], plan['run_params'])
+                records = [record async for record in capped_records(
+                    result, meta, plan['max_records'], plan['max_bytes'])]
+                record_summary(await result.consume(), meta)
+
+        with timer.phase('extract'):
+            nodes, edges = extract_graph_data(records, plan['keys'])
+        with timer.phase('finish'):
+            nodes, edges = await asyncio.to_thread(finish_graph, nodes, edges, plan, meta)
+        meta = phase_timings(timer, finish_meta(plan, meta))
+        with timer.phase('encode'):
+            body, mimetype = query_body(nodes, edges, meta, plan['format'])
+        if cacheable(meta, plan):
+            query_cache.put(plan['cache_key'], (body, mimetype), len(body), generation)
+        return Response(body, mimetype=mimetype, headers={'X-Query-Cache': 'MISS'})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+async def run_analysis(algorithm):
+    """Run an analysis off the event loop; it is CPU-bound and uses the sync driver."""
+    try:
+        params = await request.get_json(silent=True) or {}
+        fmt = negotiate_format(params.get('format'), request.headers.get('Accept', ''))
+        g.timer.query = f'{algorithm} {json.dumps(params, sort_keys=True)}'
+        with g.timer.phase('compute'):
+            payload = await asyncio.to_thread(analysis_payload, algorithm, params)
+        with g.timer.phase('encode'):
+            body, mimetype = encode(payload, fmt)
+        return Response(body, mimetype=mimetype)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/analytics/materialize', methods=['GET'])
+async def get_materialize_status():
+    """Get the state of the analytics write-back job and which scores are indexed."""
+    return jsonify(materializer.stats())
+
+
+@app.route('/analytics/materialize', methods=['POST'])
+async def start_materialize():
+    """Start writing degree/pagerank/community scores back to Neo4j in the background."""
+    params = await request.get_json(silent=True) or {}
+    algorithms = params.get('algorithms') or list(MATERIALIZED_PROPERTIES)
+    unknown = [algorithm for algorithm in algorithms if algorithm not in MATERIALIZED_PROPERTIES]
+    if unknown:
+        return jsonify({'error': f"Unknown algorithms: {', '.join(unknown)}"}), 400
+    if not materializer.start(tuple(algorithms)):
+        return jsonify({'started': False, 'error': 'A materialization run is already in progress'}), 409
+    return jsonify({'started': True, 'algorithms': algorithms}), 202
+
+
+@app.route('/analyze/degree', methods=['POST'])
+async def analyze_degree():
+    """Calculate degree centrality for nodes."""
+    return await run_analysis('degree')
+
+
+@app.route('/analyze/pagerank', methods=['POST'])
+async def analyze_pagerank():
+    """Calculate PageRank by power iteration over the whole graph."""
+    return await run_analysis('pagerank')
+
+
+@app.route('/analyze/communities', methods=['POST'])
+async def analyze_communities():
+    """Detect communities using label propagation over the whole graph."""
+    return await run_analysis('communities')
+
+
+@app.route('/analyze/betweenness', methods=['POST'])
+async def analyze_betweenness():
+    """Calculate betweenness centrality (Brandes, optionally sampled)."""
+    return await run_analysis('betweenness')
+
+
+async def threaded_chunks(chunks):
+    """Drive a blocking export generator from worker threads, chunk by chunk."""
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            break
+        yield chunk
+
+
+def export_response(chunks, fmt, name):
+    """Stream an export as a file download."""
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(threaded_chunks(chunks), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{name}.{extension}"'
+    })
+
+
+@app.route('/export/query', methods=['POST'])
+async def export_query_results():
+    """
+    Export a Cypher query's records as Parquet, Arrow IPC or CSV.
+
+    Records are fetched fetchSize at a time and written batchRows per row
+    group, so the export never holds the whole result in memory.
+    """
+    params = await request.get_json(silent=True) or {}
+    cypher = params.get('query', '')
+    try:
+        if not cypher.strip():
+            raise ValueError('Empty query')
+        plan = plan_export(params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        chunks = await asyncio.to_thread(primed, export_query(
+            cypher, params.get('params'), plan['format'], plan['fetch_size'], plan['batch_rows'],
+            plan['schema']))
+        return export_response(chunks, plan['format'], 'query')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/export/analyze/<algorithm>', methods=['POST'])
+async def export_analysis_results(algorithm):
+    """Export an analysis' scores for every node as Parquet, Arrow IPC or CSV."""
+    params = await request.get_json(silent=True) or {}
+    try:
+        plan = plan_export(params)
+        chunks = await asyncio.to_thread(primed, export_analysis(
+            algorithm, plan['format'], plan['batch_rows'], **analysis_export_options(params)))
+        return export_response(chunks, plan['format'], algorithm)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/query/validate', methods=['POST'])
+async def validate_query():
+    """Check a Cypher query with EXPLAIN (planned, never executed)."""
+    cypher = (await request.get_json() or {}).get('query', '')
+    if not cypher.strip():
+        return jsonify({'valid': False, 'error': 'Empty query'}), 400
+
+    try:
+        async with get_async_session() as session:
+            result = await session.run('EXPLAIN ' + cypher)
+            summary = await result.consume()
+        return jsonify({'valid': True, 'queryType': summary.query_type})
+    except Exception as e:
+        return jsonify({'valid': False, 'error': str(e)})
+
+
+@app.route('/node/<path:element_id>', methods=['GET'])
+async def get_node(element_id):
+    """Get one node with all of its properties (for lazily loaded details)."""
+    try:
+        async with get_async_session() as session:
+            result = await session.run("""
+                MATCH (n)
+                WHERE elementId(n) = $id
+                RETURN n
+            """, {'id': element_id})
+            record = await result.single()
+
+        if record is None:
+            return jsonify({'error': 'Node not found'}), 404
+        body, mimetype = encode(serialize_node(record['n']))
+        return Response(body, mimetype=mimetype)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/expand', methods=['POST'])
+async def expand():
+    """
+    Get the neighbourhood of on-screen nodes as a delta.
+    
+    Follows up to depth hops from ids (optionally only relationships of the
+    given types), at most fanout relationships per node per hop, and returns
+    only nodes and edges the client does not already have.
+    """
+    try:
+        plan = plan_expand(await request.get_json(silent=True) or {}, request.headers.get('Accept', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        delta = ExpandDelta(plan)
+        frontier = plan['ids']
+        async with get_async_session() as session:
+            for _ in range(plan['depth']):
+                if not frontier or delta.truncated:
+                    break
+                result = await session.run(plan['cypher'], hop_params(plan, frontier))
+                frontier = delta.add_hop([record async for record in result])
+        body, mimetype = encode(delta.payload(), plan['format'])
+        return Response(body, mimetype=mimetype)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/query/cache', methods=['GET'])
+async def get_query_cache_stats():
+    """Get query result cache statistics."""
+    return jsonify(query_cache.stats())
+
+
+@app.route('/query/cache/invalidate', methods=['POST'])
+async def invalidate_query_cache():
+    """Drop every cached query result."""
+    query_cache.invalidate()
+    return jsonify({'invalidated': True})
+
+
+@app.route('/summary/expand', methods=['POST'])
+async def expand_summary():
+    """Get the members of one summary super-node and the edges touching them."""
+    params = await request.get_json(silent=True) or {}
+    summary = summary_store.get(params.get('summaryId', ''))
+    if summary is None:
+        return jsonify({'error': 'Summary expired; run the query again'}), 404
+    try:
+        return jsonify(summary.expand(params.get('group'), params.get('expanded') or []))
+    except KeyError:
+        return jsonify({'error': 'Unknown group'}), 404
+
+
+@app.route('/search', methods=['GET', 'POST'])
+async def search():
+    """Rank SymbolModel nodes by name and documentation (BM25 with fuzzy and prefix matching)."""
+    try:
+        params = await request.get_json(silent=True) or request.args.to_dict()
+        plan = plan_search(params)
+        fmt = negotiate_format(params.get('format'), request.headers.get('Accept', ''))
+        g.timer.query = f"search {plan['query']}"
+        with g.timer.phase('search'):
+            payload = await asyncio.to_thread(search_payload, plan)
+        with g.timer.phase('encode'):
+            body, mimetype = encode(payload, fmt)
+        return Response(body, mimetype=mimetype)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/search/suggest', methods=['GET'])
+async def suggest_symbols():
+    """Autocomplete symbol names from a prefix of any word in them."""
+    try:
+        limit = max(1, min(number_param(request.args, 'limit', 10), SEARCH_MAX_LIMIT))
+        index = await asyncio.to_thread(search_index)
+        return jsonify({'suggestions': index.suggest(request.args.get('q', ''), limit)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/search/stats', methods=['GET'])
+async def get_search_stats():
+    """Get the size of the search index (building it if needed)."""
+    try:
+        index = await asyncio.to_thread(search_index)
+        return jsonify(index.stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+async def traversal(payload_fn, name):
+    """Run a /paths or /impact request off the event loop and encode the result."""
+    try:
+        params = await request.get_json(silent=True) or {}
+        fmt = negotiate_format(params.get('format'), request.headers.get('Accept', ''))
+        g.timer.query = f'{name} {json.dumps(params, sort_keys=True)}'
+        with g.timer.phase('traverse'):
+            payload = await asyncio.to_thread(payload_fn, params)
+        with g.timer.phase('encode'):
+            body, mimetype = encode(payload, fmt)
+        return Response(body, mimetype=mimetype)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/paths', methods=['POST'])
+async def paths():
+    """Get every shortest path from one node to another as a subgraph (bidirectional BFS)."""
+    return await traversal(paths_payload, 'paths')
+
+
+@app.route('/impact', methods=['POST'])
+async def impact():
+    """Get everything that depends on the given nodes, up to maxDepth hops away."""
+    return await traversal(impact_payload, 'impact')
+
+
+@app.route('/layout/cache', methods=['GET'])
+async def get_layout_cache_stats():
+    """Get server-side layout cache statistics."""
+    return jsonify(layout_cache.stats())
+
+
+@app.route('/snapshot', methods=['GET'])
+async def get_snapshot_stats():
+    """Get the state of the cached analytics snapshot."""
+    return jsonify(snapshot_cache.stats())
+
+
+@app.route('/snapshot/invalidate', methods=['POST'])
+async def invalidate_snapshot():
+    """Drop the cached analytics snapshot so the next analysis reloads it."""
+    snapshot_cache.invalidate()
+    return jsonify({'invalidated': True})
+
+
+async def fetch_column(session, cypher, key=0):
+    """Run a query and return one column of its records."""
+    result = await session.run(cypher)
+    return [record[key] async for record in result]
+
+
+@app.route('/labels', methods=['GET'])
+async def get_labels():
+    """Get all node labels in the database."""
+    try:
+        async with get_async_session() as session:
+            labels = await fetch_column(session, "CALL db.labels()")
+        return jsonify({'labels': labels})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/relationships', methods=['GET'])
+async def get_relationships():
+    """Get all relationship types in the database."""
+    try:
+        async with get_async_session() as session:
+            types = await fetch_column(session, "CALL db.relationshipTypes()")
+        return jsonify({'types': types})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/schema', methods=['GET'])
+async def get_schema():
+    """Get database schema information for AI context (served from memory)."""
+    try:
+        return jsonify(await asyncio.to_thread(schema_cache.get))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/schema/stats', methods=['GET'])
+async def get_schema_stats():
+    """Get the state of the cached schema."""
+    return jsonify(schema_cache.stats())
+
+
+@app.route('/schema/refresh', methods=['POST'])
+async def refresh_schema():
+    """Re-introspect the schema now instead of waiting for the next interval."""
+    try:
+        return jsonify(await asyncio.to_thread(schema_cache.refresh))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/metrics', methods=['GET'])
+async def get_metrics():
+    """Request, phase and cache metrics in Prometheus text format."""
+    return Response(metrics.render(metric_gauges()), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/slow-queries', methods=['GET'])
+async def get_slow_queries():
+    """Get the slowest recent /query and /analyze requests."""
+    return jsonify({**slow_queries.stats(), 'queries': slow_queries.entries()})
+
+
+@app.route('/slow-queries/clear', methods=['POST'])
+async def clear_slow_queries():
+    """Empty the slow-query log."""
+    slow_queries.clear()
+    return jsonify({'cleared': True})
+
+
+@app.route('/executor/stats', methods=['GET'])
+async def get_executor_stats():
+    """Get concurrent read executor usage (batches, timeouts, wall vs serial time)."""
+    return jsonify(query_executor.stats())
+
+
+@app.route('/pool/stats', methods=['GET'])
+async def get_pool_stats():
+    """Get Neo4j connection pool usage."""
+    return jsonify(pool_stats())
+
+
+async def embed_prompt(text):
+    """Embedding of a chat prompt from Ollama, or None if it is unavailable."""
+    try:
+        response = await http_client.post('/api/embed', json={
+            'model': CHAT_EMBED_MODEL,
+            'input': text,
+            'keep_alive': OLLAMA_KEEP_ALIVE
+        }, timeout=10)
+        if response.status_code == 200:
+            embeddings = response.json().get('embeddings')
+            return embeddings[0] if embeddings else None
+    except httpx.HTTPError:
+        pass
+    return None
+
+
+async def lookup_answer(model, schema_version, message):
+    """Cached answer (exact, then nearest embedding) and the embedding to store."""
+    cached = chat_cache.lookup(model, schema_version, message)
+    if cached is not None or CHAT_CACHE_THRESHOLD > 1:
+        return cached, None
+    embedding = await embed_prompt(message)
+    return chat_cache.nearest(model, schema_version, embedding), embedding
+
+
+@app.route('/ai/chat', methods=['POST'])
+async def ai_chat():
+    """Chat with Ollama to help build Cypher queries."""
+    params = await request.get_json()
+    user_message = params.get('message', '')
+    model = params.get('model', ollama.model)
+    stream = bool(params.get('stream'))
+    use_cache = params.get('cache', True)
+
+    if not user_message.strip():
+        return jsonify({'error': 'Empty message'}), 400
+
+    try:
+        schema = await asyncio.to_thread(schema_cache.get)
+        system_prompt = build_system_prompt(schema)
+
+        cached, embedding = None, None
+        if use_cache:
+            cached, embedding = await lookup_answer(model, schema['version'], user_message)
+        if cached is not None:
+            if stream:
+                return Response(cached_chat_events(cached, model), mimetype='text/event-stream')
+            return jsonify(chat_answer(cached, model))
+
+        if stream:
+            # Quart cancels this generator when the client disconnects; leaving
+            # the stream context closes the upstream request and stops Ollama
+            async def generate():
+                relay = ChatRelay(model)
+                try:
+                    async with http_client.stream('POST', '/api/generate', json=ollama_payload(
+                            model, user_message, system_prompt, stream=True)) as upstream:
+                        if upstream.status_code != 200:
+                            yield relay.error(f'Ollama error: {upstream.status_code}')
+                            return
+                        async for line in upstream.aiter_lines():
+                            for event in relay.feed(line):
+                                yield event
+                except httpx.ConnectError:
+                    yield relay.error('Cannot connect to Ollama. Make sure Ollama is running (ollama serve)')
+                    return
+                if not relay.finished:
+                    yield relay.done()
+                if use_cache and relay.answer:
+                    chat_cache.store(model, schema['version'], user_message, *relay.answer, embedding)
+
+            return Response(generate(), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+        ollama_response = await http_client.post(
+            '/api/generate', json=ollama_payload(model, user_message, system_prompt))
+
+        if ollama_response.status_code == 200:
+            response_text = ollama_response.json().get('response', '')
+            query = extract_cypher(response_text)
+            if use_cache and query:
+                chat_cache.store(model, schema['version'], user_message, response_text, query, embedding)
+            return jsonify({
+                'response': response_text,
+                'query': query,
+                'model': model
+            })
+        else:
+            return jsonify({'error': f'Ollama error: {ollama_response.status_code}'}), 500
+
+    except httpx.ConnectError:
+        return jsonify({'error': 'Cannot connect to Ollama. Make sure Ollama is running (ollama serve)'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/ai/cache', methods=['GET'])
+async def get_chat_cache_stats():
+    """Get NL->Cypher answer cache statistics."""
+    return jsonify(chat_cache.stats())
+
+
+@app.route('/ai/cache/invalidate', methods=['POST'])
+async def invalidate_chat_cache():
+    """Delete every cached chat answer."""
+    chat_cache.clear()
+    return jsonify({'invalidated': True})
+
+
+@app.route('/ai/models', methods=['GET'])
+async def get_ollama_models():
+    """Get available Ollama models (cached briefly)."""
+    try:
+        return jsonify({'models': await asyncio.to_thread(ollama.models)})
+    except Exception:
+        return jsonify({'models': [], 'error': 'Ollama not available'})
+
+
+@app.route('/ai/warmup', methods=['POST'])
+async def warm_up_model():
+    """Load a model into Ollama's memory ahead of the first chat."""
+    model = (await request.get_json(silent=True) or {}).get('model', ollama.model)
+    return jsonify({'model': model, 'warm': await asyncio.to_thread(ollama.warm_up, model)})
+
+
+@app.route('/ai/stats', methods=['GET'])
+async def get_ollama_stats():
+    """Get Ollama client configuration and warm-up state."""
+    return jsonify(ollama.stats())
+
+
+if __name__ == '__main__':
+    app.run(debug=True, port=5000)
@@ -0,0 +1,287 @@
+"""
+Synthetic code graphs and an in-process stand-in for the Neo4j driver.
+
+code_graph() builds a graph shaped like the real one: nested FolderModel
+nodes CONTAINS FileModel, FileModel CONTAINS SymbolModel, SymbolModel CALLS
+SymbolModel (skewed towards a few popular callees) and SymbolModel HAS_TAG
+Tag. FakeDriver answers the queries the app itself issues (snapshot loads,
+node lookups, schema introspection, /expand hops, the search index, analytics
+write-back) plus the fixed benchmark queries in BENCH_QUERIES, with real
+neo4j.graph.Node/Relationship values, so routes run their normal code paths
+without a database.
+"""
+import re
+from collections import defaultdict
+
+import numpy as np
+from neo4j import Record
+from neo4j.graph import Graph, Node
+
+KINDS = ('class', 'function', 'method')
+SYMBOLS_PER_FILE = 20
+FILES_PER_FOLDER = 10
+TAG_COUNT = 20
+
+# Benchmark /query cases: name -> Cypher; all take a $limit parameter
+BENCH_QUERIES = {
+    'symbols': 'MATCH (n:SymbolModel) RETURN n LIMIT $limit',
+    'file-symbols': 'MATCH (f:FileModel)-[r:CONTAINS]->(s:SymbolModel) RETURN f, r, s LIMIT $limit',
+    'calls': 'MATCH (a:SymbolModel)-[r:CALLS]->(b:SymbolModel) RETURN a, r, b LIMIT $limit',
+    'tags': 'MATCH (n:SymbolModel)-[r:HAS_TAG]->(t:Tag) RETURN n, r, t LIMIT $limit',
+}
+
+
+class CodeGraph:
+    """Nodes and relationships of a synthetic code graph, with lookup indexes."""
+
+    def __init__(self):
+        self.graph = Graph()
+        self.nodes = []
+        self.relationships = []
+        self.by_id = {}
+        self.by_label = defaultdict(list)
+        self.outgoing = defaultdict(list)
+        self.incoming = defaultdict(list)
+        self.indexes = set()
+
+    def add_node(self, label, properties):
+        node = Node(self.graph, f'4:bench:{len(self.nodes)}', len(self.nodes), [label], properties)
+        self.nodes.append(node)
+        self.by_id[node.element_id] = node
+        self.by_label[label].append(node)
+        return node
+
+    def add_relationship(self, source, target, rel_type, properties=None):
+        rel_id = len(self.relationships)
+        rel = self.graph.relationship_type(rel_type)(self.graph, f'5:bench:{rel_id}', rel_id,
+                                                     properties or {})
+        rel._start_node = source
+        rel._end_node = target
+        self.relationships.append(rel)
+        self.outgoing[source.element_id].append(rel)
+        self.incoming[target.element_id].append(rel)
+        return rel
+
+    def stats(self):
+        return {'nodes': len(self.nodes), 'relationships': len(self.relationships),
+                'labels': {label: len(nodes) for label, nodes in self.by_label.items()}}
+
+
+def code_graph(symbols, calls_per_symbol=2, seed=0):
+    """Synthetic code graph with about `symbols` SymbolModel nodes."""
+    rng = np.random.default_rng(seed)
+    graph = CodeGraph()
+    files = max(1, symbols // SYMBOLS_PER_FILE)
+    folders = max(1, files // FILES_PER_FOLDER)
+
+    folder_nodes = []
+    for i in range(folders):
+        folder = graph.add_node('FolderModel', {'name': f'pkg{i}', 'path': f'src/pkg{i}'})
+        if folder_nodes:
+            # Each folder nests under an earlier one, giving a tree a few levels deep
+            graph.add_relationship(folder_nodes[int(rng.integers(0, len(folder_nodes)))], folder, 'CONTAINS')
+        folder_nodes.append(folder)
+
+    tags = [graph.add_node('Tag', {'name': f'tag{i}'}) for i in range(TAG_COUNT)]
+
+    symbol_nodes = []
+    for i in range(files):
+        file = graph.add_node('FileModel', {'name': f'module{i}.py', 'path': f'src/module{i}.py',
+                                            'language': 'python'})
+        graph.add_relationship(folder_nodes[i % folders], file, 'CONTAINS')
+        for j in range(SYMBOLS_PER_FILE):
+            k = len(symbol_nodes)
+            kind = KINDS[k % len(KINDS)]
+            symbol = graph.add_node('SymbolModel', {
+                'name': f'{kind}_{k}',
+                'kind': kind,
+                'line': j * 10 + 1,
+                'documentation': f'{kind.title()} {k} of module{i}. Handles request parsing and caching.'
+            })
+            graph.add_relationship(file, symbol, 'CONTAINS')
+            symbol_nodes.append(symbol)
+
+    n = len(symbol_nodes)
+    m = n * calls_per_symbol
+    callers = rng.integers(0, n, m)
+    callees = rng.permutation(n)[np.minimum(rng.zipf(1.5, m) - 1, n - 1)]
+    for a, b in zip(callers.tolist(), callees.tolist()):
+        graph.add_relationship(symbol_nodes[a], symbol_nodes[b], 'CALLS')
+
+    for k in rng.choice(n, size=n // 2, replace=False).tolist():
+        graph.add_relationship(symbol_nodes[k], tags[k % TAG_COUNT], 'HAS_TAG')
+    return graph
+
+
+class FakeSummary:
+    """The parts of neo4j.ResultSummary the app reads."""
+    query_type = 'r'
+    result_available_after = 0
+    result_consumed_after = 0
+    profile = None
+
+
+class FakeResult(list):
+    def single(self):
+        return self[0] if self else None
+
+    def consume(self):
+        return FakeSummary()
+
+
+def _records(keys, rows):
+    return FakeResult(Record(zip(keys, row)) for row in rows)
+
+
+def _label_in(query):
+    return re.search(r':`([^`]+)`', query).group(1)
+
+
+class FakeSession:
+    """Answers app queries from a CodeGraph by recognising their text."""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def execute_write(self, work):
+        return work(self)
+
+    def run(self, query, params=None, **kwargs):
+        params = {**(params or {}), **kwargs}
+        graph = self.graph
+        text = ' '.join(getattr(query, 'text', query).split())
+
+        for name, cypher in BENCH_QUERIES.items():
+            if text == cypher:
+                return self._bench(name, params['limit'])
+
+        if 'count(n) AS nodes' in text:
+            return _records(['nodes', 'maxNodeId'], [(len(graph.nodes), len(graph.nodes) - 1)])
+        if 'count(r) AS relationships' in text:
+            return _records(['relationships', 'maxRelId'],
+                            [(len(graph.relationships), len(graph.relationships) - 1)])
+        if 'collect(elementId(m))' in text:
+            return _records(['id', 'label', 'targets', 'types'], [
+                (node.element_id, next(iter(node.labels)),
+                 [r.end_node.element_id for r in graph.outgoing[node.element_id]],
+                 [r.type for r in graph.outgoing[node.element_id]])
+                for node in graph.nodes])
+        if 'id(n) > $after' in text or 'id(r) > $after' in text:
+            return FakeResult()
+        if 'UNWIND $frontier' in text:
+            return self._expand(text, params)
+        if 'coalesce(n.name' in text:
+            return _records(['id', 'name'], [(i, graph.by_id[i].get('name')) for i in params['ids']
+                                             if i in graph.by_id])
+        if 'elementId(b) IN $ids' in text:
+            ids = set(params['ids'])
+            return _records(['source', 'target', 'type'], [
+                (r.start_node.element_id, r.end_node.element_id, r.type)
+                for i in params['ids'] for r in graph.outgoing[i] if r.end_node.element_id in ids])
+        if 'UNWIND $ids' in text:
+            return _records(['n'], [(graph.by_id[i],) for i in params['ids'] if i in graph.by_id])
+        if 'elementId(n) = $id' in text:
+            node = graph.by_id.get(params['id'])
+            return _records(['n'], [(node,)] if node is not None else [])
+        if 'db.labels' in text:
+            return _records(['label'], [(label,) for label in graph.by_label])
+        if 'db.relationshipTypes' in text:
+            return _records(['relationshipType'], [(t,) for t in sorted({r.type for r in graph.relationships})])
+        if 'RETURN count(n) AS count' in text:
+            return _records(['count'], [(len(graph.by_label[_label_in(text)]),)])
+        if 'RETURN count(r) AS count' in text:
+            rel_type = _label_in(text)
+            return _records(['count'], [(sum(1 for r in graph.relationships if r.type == rel_type),)])
+        if 'properties(n) AS props' in text:
+            nodes = graph.by_label[_label_in(text)][:params.get('limit', 100)]
+            return _records(['props'], [(dict(node),) for node in nodes])
+        if text.startswith('SHOW INDEXES'):
+            return _records(['label', 'property'], sorted(graph.indexes))
+        if text.startswith('CREATE INDEX'):
+            graph.indexes.add(re.search(r'FOR \(n:`([^`]+)`\) ON \(n\.(\w+)\)', text).groups())
+            return FakeResult()
+        if 'SET n += row.scores' in text:
+            for row in params['rows']:
+                graph.by_id[row['id']]._properties.update(row['scores'])
+            return FakeResult()
+        if 'UNION ALL' in text or 'COUNT { (n)<--() }' in text:
+            return self._materialized_top(text, params['limit'])
+        if 'RETURN n.community AS community' in text:
+            values = [n['community'] for n in graph.by_label[_label_in(text)] if 'community' in n]
+            return _records(['community'], [(max(values),)] if values else [])
+        if 'n.documentation AS documentation' in text:
+            return _records(['id', 'name', 'kind', 'documentation'],
+                            [(node.element_id, node.get('name'), node.get('kind'), node.get('documentation'))
+                             for node in graph.by_label['SymbolModel']])
+        if 'DISTINCT n.kind' in text:
+            return _records(['kind'], [(kind,) for kind in KINDS])
+        if 'n.name as name' in text:
+            return _records(['name'], [(node['name'],) for node in graph.by_label['SymbolModel'][:5]])
+        raise NotImplementedError(f'FakeSession does not know this query: {text[:200]}')
+
+    def _bench(self, name, limit):
+        graph = self.graph
+        if name == 'symbols':
+            return _records(['n'], [(node,) for node in graph.by_label['SymbolModel'][:limit]])
+        rel_type, end_label = {'file-symbols': ('CONTAINS', 'SymbolModel'),
+                               'calls': ('CALLS', 'SymbolModel'),
+                               'tags': ('HAS_TAG', 'Tag')}[name]
+        rows = []
+        for rel in graph.relationships:
+            if rel.type == rel_type and end_label in rel.end_node.labels:
+                if name == 'file-symbols' and 'FileModel' not in rel.start_node.labels:
+                    continue
+                rows.append((rel.start_node, rel, rel.end_node))
+                if len(rows) >= limit:
+                    break
+        return _records(['a', 'r', 'b'], rows)
+
+    def _materialized_top(self, text, limit):
+        graph = self.graph
+        prop, order = re.search(r'WITH DISTINCT n ORDER BY n\.(\w+) (ASC|DESC)', text).groups()
+        labels = set(re.findall(r'MATCH \(n:`([^`]+)`\)', text))
+        nodes = [n for n in graph.nodes if prop in n and labels & set(n.labels)]
+        nodes.sort(key=lambda n: n[prop], reverse=order == 'DESC')
+        return _records(['n', 'score', 'inDegree', 'outDegree'], [
+            (n, n[prop], len(graph.incoming[n.element_id]), len(graph.outgoing[n.element_id]))
+            for n in nodes[:limit]])
+
+    def _expand(self, text, params):
+        graph = self.graph
+        rows = []
+        for element_id in params['frontier']:
+            rels = []
+            if '<-[r]-' not in text:
+                rels += [(r, r.end_node) for r in graph.outgoing[element_id]]
+            if '-[r]->' not in text:
+                rels += [(r, r.start_node) for r in graph.incoming[element_id]]
+            if params['types']:
+                rels = [(r, m) for r, m in rels if r.type in params['types']]
+            rows += [(element_id, r, m) for r, m in rels[:params['limit']]]
+        return _records(['id', 'r', 'm'], rows)
+
+
+class FakeDriver:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def session(self, **kwargs):
+        return FakeSession(self.graph)
+
+    def close(self):
+        pass
+
+
+def install(graph):
+    """Point neo4j_connection at a FakeDriver over graph."""
+    import neo4j_connection
+    neo4j_connection._driver = FakeDriver(graph)
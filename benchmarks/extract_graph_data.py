@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark extract_graph_data on record-heavy results.
+
+Compares the previous hasattr-based extraction (kept below as
+extract_graph_data_hasattr) with app.extract_graph_data on synthetic results:
+(a)-[r]->(b) rows, two-hop paths that share relationships, and collect()
+lists, which the old version silently dropped.
+
+    python -m benchmarks.extract_graph_data
+    python -m benchmarks.extract_graph_data --records 100000 --projection compact
+"""
+import argparse
+import time
+
+from neo4j import Record
+from neo4j.graph import Path
+
+from app import extract_graph_data
+from benchmarks.code_graph import code_graph
+from serializer import resolve_projection, serialize_edge, serialize_node
+
+
+def extract_graph_data_hasattr(result, keys=None):
+    """extract_graph_data as it was before type dispatch, for comparison."""
+    nodes = {}
+    edges = []
+    for record in result:
+        for value in record.values():
+            if hasattr(value, 'labels'):
+                if value.element_id not in nodes:
+                    nodes[value.element_id] = serialize_node(value, keys)
+            elif hasattr(value, 'type'):
+                edges.append(serialize_edge(value, keys))
+                for node in [value.start_node, value.end_node]:
+                    if node.element_id not in nodes:
+                        nodes[node.element_id] = serialize_node(node, keys)
+            elif hasattr(value, 'nodes'):
+                for node in value.nodes:
+                    if node.element_id not in nodes:
+                        nodes[node.element_id] = serialize_node(node, keys)
+                for rel in value.relationships:
+                    edges.append(serialize_edge(rel, keys))
+    return nodes, edges
+
+
+def results(graph, count):
+    """Synthetic record lists of about `count` records each, by shape."""
+    calls = [r for r in graph.relationships if r.type == 'CALLS']
+    rows = [Record(zip(['a', 'r', 'b'], (r.start_node, r, r.end_node)))
+            for r in (calls * (count // len(calls) + 1))[:count]]
+
+    # file -[CONTAINS]-> symbol -[CALLS]-> callee; a symbol's CONTAINS edge recurs in each of its paths
+    contained_by = {r.end_node.element_id: r for r in graph.relationships
+                    if r.type == 'CONTAINS' and 'SymbolModel' in r.end_node.labels}
+    paths = [Record([('p', Path(contained_by[r.start_node.element_id].start_node,
+                                contained_by[r.start_node.element_id], r))])
+             for r in (calls * (count // len(calls) + 1))[:count]]
+
+    members = {}
+    for symbol_id, rel in contained_by.items():
+        members.setdefault(rel.start_node.element_id, (rel.start_node, []))[1].append(rel.end_node)
+    files = list(members.values())
+    collected = [Record(zip(['f', 'symbols'], files[i % len(files)])) for i in range(count // 20)]
+    return {'rows (a,r,b)': rows, 'paths': paths, 'collect()': collected}
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--symbols', type=int, default=20000, help='SymbolModel nodes in the graph')
+    parser.add_argument('--projection', default='full', choices=['full', 'compact'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    keys = resolve_projection(args.projection)
+    graph = code_graph(args.symbols)
+    print(f"graph: {graph.stats()['nodes']} nodes, {graph.stats()['relationships']} relationships; "
+          f"projection={args.projection}")
+    print(f"{'result':<14} {'records':>8} {'hasattr ms':>11} {'typed ms':>10} {'speedup':>8} "
+          f"{'old edges':>10} {'new edges':>10} {'old nodes':>10} {'new nodes':>10}")
+    for name, records in results(graph, args.records).items():
+        old_ms, (old_nodes, old_edges) = best_of(lambda: extract_graph_data_hasattr(records, keys), args.repeat)
+        new_ms, (new_nodes, new_edges) = best_of(lambda: extract_graph_data(records, keys), args.repeat)
+        print(f"{name:<14} {len(records):>8} {old_ms:>11.1f} {new_ms:>10.1f} {old_ms / new_ms:>7.2f}x "
+              f"{len(old_edges):>10} {len(new_edges):>10} {len(old_nodes):>10} {len(new_nodes):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark the induced-subgraph (top-k edges) fetch used by /analyze/*.
+
+Compares the old relationship scan (`elementId(n) IN $ids AND elementId(m) IN
+$ids`) with lookups anchored on the top-k node set, on synthetic graphs of
+growing size and, with --neo4j, against the configured database.
+
+    python -m benchmarks.induced_edges
+    python -m benchmarks.induced_edges --sizes 10000 100000 1000000 --k 100
+    python -m benchmarks.induced_edges --neo4j
+"""
+import argparse
+import time
+
+import numpy as np
+
+from graph_analytics import GraphSnapshot, degree, top_k
+
+OLD_EDGE_QUERY = """
+    MATCH (n)-[r]->(m)
+    WHERE elementId(n) IN $ids AND elementId(m) IN $ids
+    RETURN elementId(n) AS source, elementId(m) AS target, type(r) AS type
+"""
+
+ANCHORED_EDGE_QUERY = """
+    UNWIND $ids AS id
+    MATCH (n) WHERE elementId(n) = id
+    MATCH (n)-[r]->(m)
+    WHERE elementId(m) IN $ids
+    RETURN elementId(n) AS source, elementId(m) AS target, type(r) AS type
+"""
+
+
+def synthetic_snapshot(n, avg_degree=3, seed=0):
+    """Random directed graph with a skewed (Zipf-like) target distribution."""
+    rng = np.random.default_rng(seed)
+    m = n * avg_degree
+    sources = rng.integers(0, n, m)
+    targets = np.minimum(rng.zipf(1.5, m) - 1, n - 1)
+    targets = rng.permutation(n)[targets]
+    return GraphSnapshot([f'4:bench:{i}' for i in range(n)], ['SymbolModel'] * n,
+                         sources, targets, np.zeros(m, dtype=np.int16), ['CALLS'])
+
+
+def scan_edges(snapshot, indices):
+    """What the old query does: test every relationship against the id set."""
+    selected = np.isin(snapshot.sources, indices) & np.isin(snapshot.targets, indices)
+    return [
+        {
+            'from': snapshot.node_ids[s],
+            'to': snapshot.node_ids[t],
+            'label': snapshot.type_names[r]
+        }
+        for s, t, r in zip(snapshot.sources[selected].tolist(),
+                           snapshot.targets[selected].tolist(),
+                           snapshot.rel_types[selected].tolist())
+    ]
+
+
+def best_of(fn, repeat):
+    """Best wall time of fn() in milliseconds, plus its last return value."""
+    best = float('inf')
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, value
+
+
+def run_synthetic(sizes, k, repeat):
+    print(f"{'nodes':>10} {'edges':>10} {'scan ms':>10} {'anchored ms':>12} {'speedup':>8} {'edges out':>10}")
+    for n in sizes:
+        snapshot = synthetic_snapshot(n)
+        ranked = top_k(degree(snapshot), k).tolist()
+        scan_ms, expected = best_of(lambda: scan_edges(snapshot, ranked), repeat)
+        anchored_ms, edges = best_of(lambda: snapshot.induced_edges(ranked), repeat)
+        assert sorted(map(tuple, map(dict.values, edges))) == sorted(map(tuple, map(dict.values, expected)))
+        print(f"{n:>10} {snapshot.num_edges:>10} {scan_ms:>10.2f} {anchored_ms:>12.2f} "
+              f"{scan_ms / anchored_ms:>7.1f}x {len(edges):>10}")
+
+
+def run_neo4j(k, repeat):
+    from neo4j_connection import get_session
+    from snapshot_cache import snapshot_cache
+
+    snapshot = snapshot_cache.get()
+    ranked = top_k(degree(snapshot), k).tolist()
+    ids = [snapshot.node_ids[i] for i in ranked]
+    print(f"graph: {snapshot.num_nodes} nodes, {snapshot.num_edges} relationships, k={k}")
+
+    with get_session() as session:
+        for name, query in [('old IN/IN scan', OLD_EDGE_QUERY), ('UNWIND anchored', ANCHORED_EDGE_QUERY)]:
+            ms, rows = best_of(lambda: list(session.run(query, {'ids': ids})), repeat)
+            print(f"  {name:<18} {ms:>10.2f} ms  {len(rows)} edges")
+
+    ms, edges = best_of(lambda: snapshot.induced_edges(ranked), repeat)
+    print(f"  {'snapshot (CSR)':<18} {ms:>10.2f} ms  {len(edges)} edges")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--k', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--neo4j', action='store_true', help='benchmark against the configured database')
+    args = parser.parse_args()
+
+    if args.neo4j:
+        run_neo4j(args.k, args.repeat)
+    else:
+        run_synthetic(args.sizes, args.k, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
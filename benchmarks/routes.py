@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Flask routes end to end through the test client.
+
+Each route is driven against a FakeDriver over synthetic code graphs of
+growing size (see benchmarks/code_graph.py) or, with --neo4j, against the
+configured database. Reports latency (mean/p50/p95), throughput and peak
+Python memory per route and graph size; --output saves the results as JSON
+and --compare prints the change against an earlier results file.
+
+    python -m benchmarks.routes
+    python -m benchmarks.routes --sizes 1000 10000 50000 --repeat 20 --output before.json
+    python -m benchmarks.routes --output after.json --compare before.json
+    python -m benchmarks.routes --neo4j --only query analyze
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from collections import namedtuple
+from urllib.parse import quote
+
+import numpy as np
+
+from benchmarks.code_graph import BENCH_QUERIES, code_graph, install
+
+Case = namedtuple('Case', 'name method path body setup')
+
+
+def build_cases(node_id, limit):
+    """Requests to time; setup runs before each one so caches don't hide the work."""
+    from query_cache import query_cache
+    from snapshot_cache import snapshot_cache
+
+    def cold_query():
+        query_cache.invalidate()
+
+    def cold_analysis():
+        snapshot_cache.clear_results()
+
+    cases = []
+    for name, cypher in BENCH_QUERIES.items():
+        cases.append(Case(f'query:{name}', 'POST', '/query',
+                          {'query': cypher, 'params': {'limit': limit}, 'projection': 'compact'},
+                          cold_query))
+    calls = {'query': BENCH_QUERIES['calls'], 'params': {'limit': limit}}
+    cases += [
+        Case('query:calls:full', 'POST', '/query', {**calls, 'projection': 'full'}, cold_query),
+        Case('query:calls:msgpack', 'POST', '/query', {**calls, 'format': 'msgpack'}, cold_query),
+        Case('query:calls:stream', 'POST', '/query', {**calls, 'stream': True}, None),
+        Case('query:calls:summary', 'POST', '/query',
+             {**calls, 'summarize': 'auto', 'maxNodes': 100}, cold_query),
+        Case('query:calls:cached', 'POST', '/query', calls, None),
+        Case('analyze:degree', 'POST', '/analyze/degree', {}, cold_analysis),
+        Case('analyze:pagerank', 'POST', '/analyze/pagerank', {}, cold_analysis),
+        Case('analyze:communities', 'POST', '/analyze/communities', {}, cold_analysis),
+        Case('analyze:betweenness', 'POST', '/analyze/betweenness', {'samples': 16}, cold_analysis),
+        Case('expand', 'POST', '/expand', {'ids': [node_id], 'depth': 2}, None),
+        Case('impact', 'POST', '/impact', {'ids': [node_id], 'maxDepth': 3}, None),
+        Case('impact:calls', 'POST', '/impact', {'ids': [node_id], 'types': ['CALLS'], 'maxDepth': 6}, None),
+        Case('search', 'GET', '/search?q=request%20pars&limit=20', None, None),
+        Case('search:graph', 'POST', '/search', {'q': 'caching', 'graph': True, 'limit': 100}, None),
+        Case('search:suggest', 'GET', '/search/suggest?q=meth', None, None),
+        Case('node', 'GET', f'/node/{quote(node_id, safe="")}', None, None),
+        Case('export:csv', 'POST', '/export/query', {**calls, 'format': 'csv'}, None),
+        Case('schema', 'GET', '/schema', None, None),
+        Case('labels', 'GET', '/labels', None, None),
+        Case('metrics', 'GET', '/metrics', None, None),
+    ]
+    return cases
+
+
+def request_once(client, case):
+    """Issue one request, read the whole body and return (seconds, status, bytes)."""
+    if case.setup:
+        case.setup()
+    start = time.perf_counter()
+    response = client.open(case.path, method=case.method, json=case.body)
+    body = response.get_data()
+    return time.perf_counter() - start, response.status_code, len(body)
+
+
+def measure(client, case, repeat, warmup):
+    for _ in range(warmup):
+        request_once(client, case)
+
+    times = []
+    status = size = None
+    for _ in range(repeat):
+        seconds, status, size = request_once(client, case)
+        times.append(seconds)
+
+    # Peak memory is taken on a separate run; tracemalloc would distort the timings
+    tracemalloc.start()
+    request_once(client, case)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ms = np.array(times) * 1000
+    return {
+        'status': status,
+        'responseBytes': size,
+        'meanMs': round(float(ms.mean()), 3),
+        'p50Ms': round(float(np.percentile(ms, 50)), 3),
+        'p95Ms': round(float(np.percentile(ms, 95)), 3),
+        'minMs': round(float(ms.min()), 3),
+        'requestsPerSecond': round(repeat / float(np.sum(times)), 1),
+        'peakMemoryMb': round(peak / 1e6, 2),
+    }
+
+
+def selected(cases, only):
+    return [case for case in cases if not only or any(case.name.startswith(prefix) for prefix in only)]
+
+
+def run_size(label, graph_stats, node_id, args):
+    from app import app
+    from query_cache import query_cache
+    from snapshot_cache import snapshot_cache
+    from schema_cache import schema_cache
+
+    query_cache.invalidate()
+    snapshot_cache.invalidate()
+    schema_cache.refresh()
+    client = app.test_client()
+
+    results = []
+    print(f"\n{label}: {graph_stats}")
+    print(f"{'route':<24} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'req/s':>9} {'peak MB':>9} {'bytes':>10}")
+    for case in selected(build_cases(node_id, args.limit), args.only):
+        result = {'case': case.name, 'size': label, **graph_stats,
+                  **measure(client, case, args.repeat, args.warmup)}
+        results.append(result)
+        flag = '' if result['status'] == 200 else f"  (HTTP {result['status']})"
+        print(f"{case.name:<24} {result['meanMs']:>10.2f} {result['p50Ms']:>10.2f} {result['p95Ms']:>10.2f} "
+              f"{result['requestsPerSecond']:>9.1f} {result['peakMemoryMb']:>9.2f} {result['responseBytes']:>10}{flag}")
+    return results
+
+
+def run_synthetic(args):
+    results = []
+    for size in args.sizes:
+        graph = code_graph(size)
+        install(graph)
+        top_symbol = max(graph.by_label['SymbolModel'], key=lambda n: len(graph.incoming[n.element_id]))
+        stats = graph.stats()
+        results += run_size(size, {'nodes': stats['nodes'], 'relationships': stats['relationships']},
+                            top_symbol.element_id, args)
+    return results
+
+
+def run_neo4j(args):
+    from neo4j_connection import run_query
+
+    counts = run_query("""
+        MATCH (n) WITH count(n) AS nodes
+        MATCH ()-[r]->() RETURN nodes, count(r) AS relationships
+    """)[0]
+    node_id = run_query("""
+        MATCH (n:SymbolModel)
+        RETURN elementId(n) AS id
+        ORDER BY COUNT { (n)<--() } DESC
+        LIMIT 1
+    """)[0]['id']
+    return run_size('neo4j', counts, node_id, args)
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['case'], str(r['size'])): r for r in json.load(f)['results']}
+    print(f"\nChange in mean latency vs {baseline_path} (negative is faster):")
+    for result in results:
+        old = baseline.get((result['case'], str(result['size'])))
+        if old and old['meanMs']:
+            change = (result['meanMs'] - old['meanMs']) / old['meanMs'] * 100
+            print(f"  {result['case']:<24} {str(result['size']):>8} {old['meanMs']:>10.2f} -> "
+                  f"{result['meanMs']:>10.2f} ms  {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000],
+                        help='SymbolModel nodes in each synthetic graph')
+    parser.add_argument('--limit', type=int, default=1000, help='LIMIT for the /query cases')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--only', nargs='+', help='run only cases whose name starts with one of these')
+    parser.add_argument('--neo4j', action='store_true', help='benchmark against the configured database')
+    parser.add_argument('--output', help='save results as JSON')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    results = run_neo4j(args) if args.neo4j else run_synthetic(args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'args': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+                'results': results,
+            }, f, indent=2)
+        print(f"\nSaved {len(results)} results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Persistent cache of /ai/chat answers (natural-language prompt -> Cypher).
+
+Answers are stored in SQLite keyed by model and schema version. A prompt is
+first looked up by its normalized text; failing that, by cosine similarity of
+its embedding (from Ollama's embed API) against the stored embeddings, so a
+paraphrased question can reuse an earlier answer without running the LLM.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+CHAT_CACHE_PATH = os.getenv("CHAT_CACHE_PATH", "chat_cache.sqlite3")
+CHAT_CACHE_THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", "0.92"))
+CHAT_EMBED_MODEL = os.getenv("CHAT_EMBED_MODEL", "nomic-embed-text")
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS answers (
+        id INTEGER PRIMARY KEY,
+        model TEXT NOT NULL,
+        schema_version TEXT NOT NULL,
+        prompt TEXT NOT NULL,
+        normalized TEXT NOT NULL,
+        response TEXT NOT NULL,
+        query TEXT,
+        embedding BLOB,
+        created_at REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (model, schema_version, normalized)
+    )
+"""
+
+
+def normalize_prompt(prompt):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', prompt.lower()).split())
+
+
+def unit(vector):
+    """Embedding as a float32 unit vector (or None if it is empty)."""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if vector.size and norm else None
+
+
+class ChatCache:
+    """SQLite-backed answer store with an in-memory embedding matrix per key."""
+
+    def __init__(self, path=CHAT_CACHE_PATH, threshold=CHAT_CACHE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._db = None
+        self._vectors = {}  # (model, schema_version) -> (ids, unit embedding matrix)
+        self._stats = {'exactHits': 0, 'semanticHits': 0, 'misses': 0, 'stored': 0}
+
+    def lookup(self, model, schema_version, prompt):
+        """Answer stored for the same normalized prompt, or None."""
+        with self._lock:
+            row = self._connect().execute("""
+                SELECT id, prompt, response, query FROM answers
+                WHERE model = ? AND schema_version = ? AND normalized = ?
+            """, (model, schema_version, normalize_prompt(prompt))).fetchone()
+            if row is None:
+                return None
+            self._stats['exactHits'] += 1
+            return self._hit(row, 'exact', 1.0)
+
+    def nearest(self, model, schema_version, embedding):
+        """Most similar stored answer if its cosine similarity reaches the threshold."""
+        query = unit(embedding) if embedding is not None else None
+        with self._lock:
+            if query is None:
+                self._stats['misses'] += 1
+                return None
+
+            ids, matrix = self._matrix(model, schema_version)
+            if len(ids) == 0 or matrix.shape[1] != query.shape[0]:
+                self._stats['misses'] += 1
+                return None
+
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self._stats['misses'] += 1
+                return None
+
+            row = self._connect().execute(
+                "SELECT id, prompt, response, query FROM answers WHERE id = ?",
+                (int(ids[best]),)).fetchone()
+            self._stats['semanticHits'] += 1
+            return self._hit(row, 'semantic', similarity)
+
+    def store(self, model, schema_version, prompt, response, query, embedding=None):
+        """Save an answer, replacing any earlier one for the same normalized prompt."""
+        vector = unit(embedding) if embedding is not None else None
+        with self._lock:
+            db = self._connect()
+            db.execute("""
+                INSERT OR REPLACE INTO answers
+                    (model, schema_version, prompt, normalized, response, query, embedding, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (model, schema_version, prompt, normalize_prompt(prompt), response, query,
+                  vector.tobytes() if vector is not None else None, time.time()))
+            db.commit()
+            self._vectors.pop((model, schema_version), None)
+            self._stats['stored'] += 1
+
+    def clear(self):
+        """Delete every stored answer."""
+        with self._lock:
+            db = self._connect()
+            db.execute("DELETE FROM answers")
+            db.commit()
+            self._vectors.clear()
+
+    def stats(self):
+        """Describe the stored answers and lookup effectiveness."""
+        with self._lock:
+            entries, embedded = self._connect().execute(
+                "SELECT count(*), count(embedding) FROM answers").fetchone()
+            return {
+                'path': self.path,
+                'entries': entries,
+                'withEmbeddings': embedded,
+                'threshold': self.threshold,
+                'embedModel': CHAT_EMBED_MODEL,
+                **self._stats,
+            }
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(_SCHEMA)
+            self._db.commit()
+        return self._db
+
+    def _matrix(self, model, schema_version):
+        key = (model, schema_version)
+        if key not in self._vectors:
+            rows = self._connect().execute("""
+                SELECT id, embedding FROM answers
+                WHERE model = ? AND schema_version = ? AND embedding IS NOT NULL
+            """, key).fetchall()
+            vectors = [np.frombuffer(blob, dtype=np.float32) for _, blob in rows]
+            # Rows embedded with a different embedding model have another width
+            width = len(vectors[-1]) if vectors else 0
+            keep = [i for i, vector in enumerate(vectors) if len(vector) == width]
+            ids = np.array([rows[i][0] for i in keep], dtype=np.int64)
+            matrix = np.vstack([vectors[i] for i in keep]) if keep else np.empty((0, 0), np.float32)
+            self._vectors[key] = (ids, matrix)
+        return self._vectors[key]
+
+    def _hit(self, row, match, similarity):
+        self._connect().execute("UPDATE answers SET hits = hits + 1 WHERE id = ?", (row[0],))
+        self._connect().commit()
+        return {
+            'prompt': row[1],
+            'response': row[2],
+            'query': row[3],
+            'match': match,
+            'similarity': round(similarity, 4),
+        }
+
+
+chat_cache = ChatCache()
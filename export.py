@@ -0,0 +1,369 @@
+"""
+Bulk export of query and analytics results to Parquet, Arrow IPC or CSV.
+
+Query records are fetched from Neo4j fetch_size at a time and converted to
+pandas frames of EXPORT_BATCH_ROWS rows, each written out as one Parquet row
+group / Arrow record batch / CSV chunk, so exports of millions of rows run in
+bounded memory. Analytics exports build one frame per algorithm straight from
+the snapshot arrays, with a score for every node rather than the top few.
+
+Usage:
+    python export.py "MATCH (n:SymbolModel) RETURN n.name AS name, n.kind AS kind" -o symbols.parquet
+    python export.py --analysis pagerank -o pagerank.csv
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from neo4j_connection import iter_query
+from graph_analytics import degree, pagerank, betweenness, label_propagation
+from snapshot_cache import snapshot_cache
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet and Arrow exports need pyarrow; CSV does not
+    pa = None
+    pq = None
+
+load_dotenv(override=True)
+
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "10000"))
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "50000"))
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'csv': ('text/csv', 'csv'),
+}
+EXPORT_ANALYSES = ('degree', 'pagerank', 'communities', 'betweenness')
+
+# Column types, as pandas (nullable) dtypes and Arrow types
+COLUMN_TYPES = ('bool', 'int', 'float', 'string')
+PANDAS_DTYPES = {'bool': 'boolean', 'int': 'Int64', 'float': 'float64'}
+ARROW_TYPES = {'bool': pa.bool_(), 'int': pa.int64(), 'float': pa.float64(), 'string': pa.string()} if pa else {}
+# Errors a failed conversion raises (Arrow's own are not all ValueErrors)
+EXPORT_ERRORS = (ValueError, pa.ArrowException) if pa else (ValueError,)
+# pandas.api.types.infer_dtype -> column type (anything else is stored as strings)
+INFERRED_KINDS = {'boolean': 'bool', 'integer': 'int', 'floating': 'float', 'mixed-integer-float': 'float',
+                  'decimal': 'float', 'string': 'string'}
+
+
+def check_format(fmt):
+    """Raise ValueError unless fmt can be written in this environment."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    if fmt != 'csv' and pa is None:
+        raise ValueError(f'{fmt} export needs pyarrow (pip install pyarrow)')
+
+
+def format_for_path(path):
+    """Export format implied by an output file name (CSV if unrecognised)."""
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    for fmt, (_, ext) in EXPORT_FORMATS.items():
+        if extension in (fmt, ext):
+            return fmt
+    return 'csv'
+
+
+def cell(value):
+    """Column value for one field: scalars as they are, anything else as JSON."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, default=str)
+
+
+def flatten(row):
+    """Record dict as one flat row; map values become "column.key" fields."""
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            for inner, inner_value in value.items():
+                flat[f'{key}.{inner}'] = cell(inner_value)
+        else:
+            flat[key] = cell(value)
+    return flat
+
+
+def to_frame(rows):
+    """
+    Frame for a batch of record dicts.
+
+    Node and map values (record.data() turns nodes into property maps) are
+    flattened one level into "column.key" columns; lists, relationships and
+    deeper maps are stored as JSON strings. Columns keep the Python values
+    (object dtype) so an int column with nulls is not turned into floats.
+    """
+    flat = [flatten(row) for row in rows]
+    columns = list(dict.fromkeys(key for row in flat for key in row))
+    return pd.DataFrame({column: [row.get(column) for row in flat] for column in columns}, dtype=object)
+
+
+def record_frames(rows, batch_rows=EXPORT_BATCH_ROWS):
+    """Group an iterable of record dicts into frames of batch_rows rows."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield to_frame(batch)
+            batch = []
+    if batch:
+        yield to_frame(batch)
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file object that hands out whatever was written since the last drain()."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def column_kind(values):
+    """Column type of a Series: 'bool', 'int', 'float', 'string', or None if it is all null."""
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred == 'empty':
+        return None
+    return INFERRED_KINDS.get(inferred, 'string')
+
+
+def widen(kind, other):
+    """The narrowest column type that holds values of both types."""
+    if kind is None or kind == other:
+        return other
+    if other is None:
+        return kind
+    if {kind, other} == {'int', 'float'}:
+        return 'float'
+    return 'string'
+
+
+def check_schema(schema):
+    """Validate an explicit {column: type} schema; ValueError if it is unusable."""
+    if not isinstance(schema, dict) or not schema:
+        raise ValueError('schema must be an object mapping column names to types')
+    unknown = {kind for kind in schema.values() if kind not in COLUMN_TYPES}
+    if unknown:
+        raise ValueError(f"Unknown column types: {', '.join(map(str, unknown))} "
+                         f"(use {', '.join(COLUMN_TYPES)})")
+    return dict(schema)
+
+
+def check_kinds(found, kinds, rows_written):
+    """
+    Check a later frame's column types against those fixed by the first frame.
+
+    Values are promoted where nothing is lost (int into a float column, any
+    value into a string column). A column that first appears now, or that
+    needs a wider type, cannot be added to a file that is already being
+    written, so that raises ValueError instead of dropping data.
+    """
+    for column, kind in found.items():
+        if column not in kinds:
+            raise ValueError(f'Column {column!r} first appears after row {rows_written}; pass a schema '
+                             f'listing every column or raise batchRows')
+        if widen(kinds[column], kind) != kinds[column]:
+            raise ValueError(f'Column {column!r} holds {kind} values after row {rows_written} but was '
+                             f'written as {kinds[column]}; pass a schema or raise batchRows')
+
+
+def typed_column(values, kind, found=None):
+    """Series converted to the nullable pandas dtype of a column type (found: its inferred type)."""
+    if kind == 'string' and found in ('string', None):
+        return values
+    if kind == 'string':
+        return values.map(lambda v: v if v is None or isinstance(v, str) else json.dumps(v), na_action='ignore')
+    return values.astype(PANDAS_DTYPES[kind])
+
+
+def typed_frame(frame, kinds, found):
+    """Frame with exactly the schema's columns, in order, each converted to its type."""
+    columns = {}
+    for column, kind in kinds.items():
+        values = frame[column] if column in frame else pd.Series([None] * len(frame), dtype=object)
+        try:
+            columns[column] = typed_column(values, kind, found.get(column))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Column {column!r} does not fit type {kind}: {e}') from None
+    return pd.DataFrame(columns)
+
+
+def write_frames(frames, fmt, schema=None):
+    """
+    Encode frames as one file in fmt, yielding bytes as each frame is written.
+
+    Column types come from schema ({column: 'bool' | 'int' | 'float' |
+    'string'}, other columns are left out) or else are inferred from the
+    first frame, with all-null columns stored as strings. Later frames are
+    promoted to those types; see check_kinds for what raises ValueError.
+
+    An error after the first chunk has been yielded can no longer become an
+    error response. CSV output then ends with a "# export failed ..." line,
+    and the error is re-raised either way so the server aborts the transfer
+    instead of ending it cleanly. Parquet without its footer is unreadable,
+    and an Arrow stream lacks its end-of-stream marker.
+    """
+    check_format(fmt)
+    sink = ChunkSink()
+    writer = None
+    kinds = check_schema(schema) if schema is not None else None
+    rows_written = 0
+
+    try:
+        for frame in frames:
+            found = {column: column_kind(frame[column]) for column in frame.columns}
+            if kinds is None:
+                kinds = {column: kind or 'string' for column, kind in found.items()}
+            elif schema is None:
+                check_kinds(found, kinds, rows_written)
+            frame = typed_frame(frame, kinds, found)
+
+            if fmt == 'csv':
+                sink.write(frame.to_csv(index=False, header=rows_written == 0).encode())
+            else:
+                arrow_schema = pa.schema([pa.field(column, ARROW_TYPES[kind]) for column, kind in kinds.items()])
+                table = pa.Table.from_pandas(frame, schema=arrow_schema, preserve_index=False)
+                if writer is None:
+                    writer = (pq.ParquetWriter(sink, arrow_schema) if fmt == 'parquet'
+                              else pa.ipc.new_stream(sink, arrow_schema))
+                writer.write_table(table)
+            rows_written += len(frame)
+            yield sink.drain()
+    except Exception as e:
+        if rows_written and fmt == 'csv':
+            yield f'# export failed after row {rows_written}: {e}\n'.encode()
+        raise
+
+    if writer is not None:
+        writer.close()
+    elif fmt != 'csv':
+        # No rows at all: still produce a valid (empty) file
+        empty = pa.schema([])
+        (pq.ParquetWriter(sink, empty) if fmt == 'parquet' else pa.ipc.new_stream(sink, empty)).close()
+    yield sink.drain()
+
+
+def export_query(query, params=None, fmt='parquet', fetch_size=EXPORT_FETCH_SIZE,
+                 batch_rows=EXPORT_BATCH_ROWS, schema=None):
+    """Yield the encoded result of a Cypher query in fmt (column types as in write_frames)."""
+    check_format(fmt)
+    rows = iter_query(query, params, fetch_size=fetch_size)
+    yield from write_frames(record_frames(rows, batch_rows), fmt, schema)
+
+
+def analysis_frame(algorithm, damping=0.85, max_iter=None, samples=None):
+    """
+    One row per node of the snapshot with the algorithm's scores.
+
+    max_iter defaults to 10 rounds for communities and 100 for PageRank;
+    samples (betweenness pivots) to the algorithm's own default.
+    """
+    if algorithm not in EXPORT_ANALYSES:
+        raise ValueError(f'Unknown analysis: {algorithm}')
+    if max_iter is None:
+        max_iter = 10 if algorithm == 'communities' else 100
+
+    def compute(snapshot):
+        frame = pd.DataFrame({'elementId': snapshot.node_ids, 'label': snapshot.node_labels})
+        if algorithm == 'degree':
+            frame['degree'] = degree(snapshot)
+            frame['inDegree'] = snapshot.in_degree()
+            frame['outDegree'] = snapshot.out_degree()
+        elif algorithm == 'pagerank':
+            frame['pagerank'] = pagerank(snapshot, damping=damping, max_iter=max_iter)
+        elif algorithm == 'communities':
+            frame['community'] = label_propagation(snapshot, max_iter=max_iter)
+        else:
+            frame['betweenness'] = betweenness(snapshot, samples=samples)
+        return frame
+
+    return snapshot_cache.memoize(('export', algorithm, damping, max_iter, samples), compute)
+
+
+def export_analysis(algorithm, fmt='parquet', batch_rows=EXPORT_BATCH_ROWS, **options):
+    """Yield the encoded per-node scores of an analysis in fmt (options as for analysis_frame)."""
+    check_format(fmt)
+    frame = analysis_frame(algorithm, **options)
+    frames = (frame.iloc[start:start + batch_rows] for start in range(0, len(frame), batch_rows))
+    yield from write_frames(frames, fmt)
+
+
+def primed(chunks):
+    """
+    Start an export generator so query errors surface before a response is sent.
+
+    Returns an iterator over all of its chunks.
+    """
+    first = next(chunks, b'')
+    return itertools.chain([first], chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a Cypher query or analysis to a columnar file.')
+    parser.add_argument('query', nargs='?', help='Cypher query to export')
+    parser.add_argument('--analysis', choices=EXPORT_ANALYSES,
+                        help='export per-node scores of an analysis instead of a query')
+    parser.add_argument('--params', default='{}', help='query parameters as a JSON object')
+    parser.add_argument('-o', '--output', required=True, help='output file')
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS),
+                        help='output format (default: from the output file extension)')
+    parser.add_argument('--fetch-size', type=int, default=EXPORT_FETCH_SIZE,
+                        help='records fetched from Neo4j per round trip')
+    parser.add_argument('--batch-rows', type=int, default=EXPORT_BATCH_ROWS,
+                        help='rows per row group / record batch')
+    parser.add_argument('--schema', type=json.loads,
+                        help='column types as a JSON object, e.g. \'{"name": "string", "size": "int"}\' '
+                             '(default: inferred from the first batch)')
+    args = parser.parse_args()
+
+    if bool(args.query) == bool(args.analysis):
+        parser.error('give either a query or --analysis')
+    fmt = args.format or format_for_path(args.output)
+
+    start = time.perf_counter()
+    if args.analysis:
+        chunks = export_analysis(args.analysis, fmt=fmt, batch_rows=args.batch_rows)
+    else:
+        chunks = export_query(args.query, json.loads(args.params), fmt,
+                              args.fetch_size, args.batch_rows, args.schema)
+    try:
+        with open(args.output, 'wb') as out:
+            for chunk in chunks:
+                out.write(chunk)
+    except EXPORT_ERRORS as e:
+        # Don't leave a truncated file behind
+        os.remove(args.output)
+        sys.exit(f'Error: {e}')
+
+    size = os.path.getsize(args.output)
+    print(f'Wrote {args.output} ({fmt}, {size / 1e6:.1f} MB) in {time.perf_counter() - start:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
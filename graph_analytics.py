@@ -0,0 +1,492 @@
+"""
+In-process graph analytics over a compact CSR snapshot of the Neo4j topology.
+
+The whole graph is pulled once into NumPy arrays (int32 offsets/targets keyed by
+a dense id <-> elementId map) and the algorithms run vectorized on top of it.
+"""
+import numpy as np
+
+from neo4j_connection import get_session
+
+# Exact betweenness is O(n*m); above this many nodes we sample source pivots
+EXACT_BETWEENNESS_LIMIT = 2000
+DEFAULT_BETWEENNESS_SAMPLES = 64
+
+
+class GraphSnapshot:
+    """Array-backed adjacency (CSR) of the directed graph."""
+
+    def __init__(self, node_ids, node_labels, sources, targets, rel_types, type_names):
+        self.node_ids = list(node_ids)
+        self.index = {element_id: i for i, element_id in enumerate(self.node_ids)}
+        self.node_labels = list(node_labels)
+        self.type_names = list(type_names)
+
+        n = len(self.node_ids)
+        sources = np.asarray(sources, dtype=np.int32)
+        targets = np.asarray(targets, dtype=np.int32)
+        rel_types = np.asarray(rel_types, dtype=np.int16)
+
+        # Sort edges by source so each node's out-edges are contiguous
+        order = np.argsort(sources, kind='stable')
+        self.sources = sources[order]
+        self.targets = targets[order]
+        self.rel_types = rel_types[order]
+        self.offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(self.sources, minlength=n), out=self.offsets[1:])
+
+        self._undirected = None
+        self._reverse = None
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    def out_degree(self):
+        return np.diff(self.offsets)
+
+    def in_degree(self):
+        return np.bincount(self.targets, minlength=self.num_nodes)
+
+    def undirected(self):
+        """Return (offsets, sources, targets) of the simple undirected graph."""
+        if self._undirected is None:
+            loops = self.sources == self.targets
+            src = np.concatenate([self.sources[~loops], self.targets[~loops]])
+            dst = np.concatenate([self.targets[~loops], self.sources[~loops]])
+
+            # Collapse parallel and reciprocal edges; keys sort by source first
+            keys = np.sort(src.astype(np.int64) * self.num_nodes + dst)
+            keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+            src = (keys // self.num_nodes).astype(np.int32)
+            dst = (keys % self.num_nodes).astype(np.int32)
+            offsets = np.zeros(self.num_nodes + 1, dtype=np.int32)
+            np.cumsum(np.bincount(src, minlength=self.num_nodes), out=offsets[1:])
+            self._undirected = (offsets, src, dst)
+        return self._undirected
+
+    def reverse(self):
+        """Return (offsets, sources, rel_types) of the in-edges, grouped by target."""
+        if self._reverse is None:
+            order = np.argsort(self.targets, kind='stable')
+            offsets = np.zeros(self.num_nodes + 1, dtype=np.int32)
+            np.cumsum(np.bincount(self.targets, minlength=self.num_nodes), out=offsets[1:])
+            self._reverse = (offsets, self.sources[order], self.rel_types[order])
+        return self._reverse
+
+    def type_codes(self, types):
+        """Codes of the named relationship types (unknown names are skipped)."""
+        codes = {name: code for code, name in enumerate(self.type_names)}
+        return np.array([codes[t] for t in types if t in codes], dtype=np.int16)
+
+    def edge_dicts(self, sources, targets, rel_types):
+        """Vis-style dicts for parallel arrays of dense source, target and type codes."""
+        return [
+            {
+                'from': self.node_ids[s],
+                'to': self.node_ids[t],
+                'label': self.type_names[r]
+            }
+            for s, t, r in zip(sources.tolist(), targets.tolist(), rel_types.tolist())
+        ]
+
+    def neighbors(self, i):
+        """Dense ids adjacent to node i in either direction."""
+        offsets, _, targets = self.undirected()
+        return targets[offsets[i]:offsets[i + 1]]
+
+    def induced_edges(self, indices):
+        """Edges whose endpoints are both in indices, as vis-style dicts."""
+        indices = np.asarray(indices, dtype=np.int32)
+        selected = np.zeros(self.num_nodes, dtype=bool)
+        selected[indices] = True
+        src, positions = _expand(self.offsets, indices)
+        keep = selected[self.targets[positions]]
+        src, positions = src[keep], positions[keep]
+        return self.edge_dicts(src, self.targets[positions], self.rel_types[positions])
+
+
+def load_snapshot(session=None, max_node_id=None, max_rel_id=None):
+    """
+    Pull the whole topology from Neo4j into a GraphSnapshot.
+
+    max_node_id/max_rel_id bound the load by internal id so it matches a
+    change marker taken beforehand (see snapshot_cache).
+    """
+    if session is None:
+        with get_session() as session:
+            return load_snapshot(session, max_node_id, max_rel_id)
+
+    if max_node_id is None:
+        query = """
+            MATCH (n)
+            OPTIONAL MATCH (n)-[r]->(m)
+            RETURN elementId(n) AS id, labels(n)[0] AS label,
+                   collect(elementId(m)) AS targets, collect(type(r)) AS types
+        """
+    else:
+        query = """
+            MATCH (n) WHERE id(n) <= $max_node_id
+            OPTIONAL MATCH (n)-[r]->(m)
+            WHERE id(r) <= $max_rel_id AND id(m) <= $max_node_id
+            RETURN elementId(n) AS id, labels(n)[0] AS label,
+                   collect(elementId(m)) AS targets, collect(type(r)) AS types
+        """
+
+    # One record per node keeps driver overhead low on large graphs
+    result = session.run(query, {'max_node_id': max_node_id, 'max_rel_id': max_rel_id})
+
+    node_ids = []
+    node_labels = []
+    adjacency = []
+    for record in result:
+        node_ids.append(record['id'])
+        node_labels.append(record['label'] or 'Unknown')
+        adjacency.append((record['targets'], record['types']))
+
+    index = {element_id: i for i, element_id in enumerate(node_ids)}
+    type_codes = {}
+    sources = []
+    targets = []
+    rel_types = []
+    for i, (neighbours, types) in enumerate(adjacency):
+        for element_id, rel_type in zip(neighbours, types):
+            sources.append(i)
+            targets.append(index[element_id])
+            rel_types.append(type_codes.setdefault(rel_type, len(type_codes)))
+
+    return GraphSnapshot(node_ids, node_labels, sources, targets, rel_types, list(type_codes))
+
+
+def extend_snapshot(snapshot, new_nodes, new_edges):
+    """
+    Return a new GraphSnapshot with extra nodes and edges appended.
+
+    new_nodes is a list of (elementId, label) and new_edges a list of
+    (source elementId, target elementId, type). Existing dense ids are kept.
+    """
+    node_ids = snapshot.node_ids + [element_id for element_id, _ in new_nodes]
+    node_labels = snapshot.node_labels + [label or 'Unknown' for _, label in new_nodes]
+    index = dict(snapshot.index)
+    for element_id, _ in new_nodes:
+        index[element_id] = len(index)
+
+    type_codes = {name: code for code, name in enumerate(snapshot.type_names)}
+    sources = [index[s] for s, _, _ in new_edges]
+    targets = [index[t] for _, t, _ in new_edges]
+    rel_types = [type_codes.setdefault(rel_type, len(type_codes)) for _, _, rel_type in new_edges]
+
+    return GraphSnapshot(
+        node_ids,
+        node_labels,
+        np.concatenate([snapshot.sources, np.asarray(sources, dtype=np.int32)]),
+        np.concatenate([snapshot.targets, np.asarray(targets, dtype=np.int32)]),
+        np.concatenate([snapshot.rel_types, np.asarray(rel_types, dtype=np.int16)]),
+        list(type_codes)
+    )
+
+
+def _expand(offsets, frontier):
+    """Return (source, edge position) pairs for all out-edges of frontier."""
+    starts = offsets[frontier]
+    counts = offsets[frontier + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int32)
+        return empty, empty
+    src = np.repeat(frontier, counts)
+    shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return src, shift + np.arange(total, dtype=np.int32)
+
+
+def degree(snapshot):
+    """Total degree (in + out) of every node."""
+    return snapshot.out_degree() + snapshot.in_degree()
+
+
+def pagerank(snapshot, damping=0.85, max_iter=100, tol=1e-6):
+    """PageRank by power iteration; dangling mass is spread uniformly."""
+    n = snapshot.num_nodes
+    if n == 0:
+        return np.zeros(0)
+
+    out_degree = snapshot.out_degree().astype(np.float64)
+    dangling = out_degree == 0
+    inv_out = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    rank = np.full(n, 1.0 / n)
+
+    for _ in range(max_iter):
+        flow = np.bincount(snapshot.targets,
+                           weights=(rank * inv_out)[snapshot.sources],
+                           minlength=n)
+        new_rank = (1.0 - damping) / n + damping * (flow + rank[dangling].sum() / n)
+        converged = np.abs(new_rank - rank).sum() < n * tol
+        rank = new_rank
+        if converged:
+            break
+    return rank
+
+
+def betweenness(snapshot, samples=None, seed=0):
+    """
+    Brandes betweenness on the undirected graph.
+
+    With samples set (or on graphs above EXACT_BETWEENNESS_LIMIT nodes), only
+    that many random source pivots are used and the result is extrapolated.
+    """
+    n = snapshot.num_nodes
+    scores = np.zeros(n)
+    if n == 0:
+        return scores
+
+    if samples is None and n > EXACT_BETWEENNESS_LIMIT:
+        samples = DEFAULT_BETWEENNESS_SAMPLES
+    if samples is not None and samples < n:
+        pivots = np.random.default_rng(seed).choice(n, size=samples, replace=False)
+        scale = n / samples
+    else:
+        pivots = np.arange(n)
+        scale = 1.0
+
+    offsets, _, targets = snapshot.undirected()
+    for s in pivots:
+        _accumulate_dependencies(offsets, targets, int(s), scores)
+
+    # Every undirected shortest path is counted from both of its endpoints
+    return scores * scale / 2.0
+
+
+def _accumulate_dependencies(offsets, targets, source, scores):
+    """Single-source Brandes step with level-synchronous vectorized BFS."""
+    n = len(offsets) - 1
+    dist = np.full(n, -1, dtype=np.int32)
+    slot = np.empty(n, dtype=np.int64)
+    sigma = np.zeros(n)
+    dist[source] = 0
+    sigma[source] = 1.0
+
+    levels = []
+    frontier = np.array([source], dtype=np.int32)
+    depth = 0
+    while frontier.size:
+        src, positions = _expand(offsets, frontier)
+        dst = targets[positions]
+        fresh = dst[dist[dst] < 0]
+        dist[fresh] = depth + 1
+
+        # Keep only edges that lie on a shortest path
+        on_path = dist[dst] == depth + 1
+        src, dst = src[on_path], dst[on_path]
+        np.add.at(sigma, dst, sigma[src])
+        levels.append((src, dst))
+
+        # De-duplicate the next frontier without sorting: last writer wins
+        slot[fresh] = np.arange(len(fresh))
+        frontier = fresh[slot[fresh] == np.arange(len(fresh))]
+        depth += 1
+
+    delta = np.zeros(n)
+    for src, dst in reversed(levels):
+        np.add.at(delta, src, sigma[src] / sigma[dst] * (1.0 + delta[dst]))
+    delta[source] = 0.0
+    scores += delta
+
+
+def label_propagation(snapshot, max_iter=10):
+    """
+    Synchronous label propagation on the undirected graph.
+
+    Each node adopts the most frequent label among itself and its neighbours
+    (ties go to the smallest label). Communities are renumbered densely from
+    the largest (0) to the smallest.
+    """
+    n = snapshot.num_nodes
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    _, src, dst = snapshot.undirected()
+    voters = np.concatenate([src, np.arange(n, dtype=np.int32)]).astype(np.int64)
+    neighbours = np.concatenate([dst, np.arange(n, dtype=np.int32)])
+    labels = np.arange(n, dtype=np.int64)
+
+    for _ in range(max_iter):
+        keys = np.sort(voters * n + labels[neighbours])
+        run_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        counts = np.diff(np.r_[run_starts, len(keys)])
+        keys = keys[run_starts]
+        node = keys // n
+        label = keys % n
+
+        # Keys are sorted by node then label; pick the first max-count label per node
+        starts = np.flatnonzero(np.r_[True, node[1:] != node[:-1]])
+        best = np.maximum.reduceat(counts, starts)
+        is_best = counts == np.repeat(best, np.diff(np.r_[starts, len(node)]))
+        winners = np.flatnonzero(is_best)
+        winners = winners[np.r_[True, node[winners][1:] != node[winners][:-1]]]
+
+        new_labels = labels.copy()
+        new_labels[node[winners]] = label[winners]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    _, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+    return rank[inverse]
+
+
+# Direction a search from the far end follows to walk the same relationships
+REVERSE_DIRECTION = {'out': 'in', 'in': 'out', 'both': 'both'}
+
+
+def _step(snapshot, frontier, direction, type_codes=None):
+    """
+    One BFS hop from frontier along out-edges ('out'), in-edges ('in') or both.
+
+    Returns (reached, sources, targets, rel_types) per edge followed; reached
+    is the far end of the edge, its target going out and its source going in.
+    """
+    parts = []
+    if direction in ('out', 'both'):
+        src, positions = _expand(snapshot.offsets, frontier)
+        dst = snapshot.targets[positions]
+        parts.append((dst, src, dst, snapshot.rel_types[positions]))
+    if direction in ('in', 'both'):
+        offsets, sources, rel_types = snapshot.reverse()
+        dst, positions = _expand(offsets, frontier)
+        src = sources[positions]
+        parts.append((src, src, dst, rel_types[positions]))
+    reached, src, dst, rel = (np.concatenate(column) for column in zip(*parts))
+    if type_codes is not None:
+        keep = np.isin(rel, type_codes)
+        reached, src, dst, rel = reached[keep], src[keep], dst[keep], rel[keep]
+    return reached, src, dst, rel
+
+
+def _edge_arrays(parts):
+    """Concatenate (sources, targets, rel_types) parts, dropping parallel duplicates."""
+    if not parts:
+        empty = np.empty(0, dtype=np.int32)
+        return empty, empty, empty
+    edges = np.unique(np.stack([np.concatenate(column).astype(np.int32) for column in zip(*parts)]), axis=1)
+    return edges[0], edges[1], edges[2]
+
+
+def _trace(snapshot, layer, dist, direction, codes, edges):
+    """
+    Walk from layer back to the root of a BFS with distances dist, keeping only
+    edges into the level one closer each time. Appends the edges to edges and
+    returns the levels passed, nearest first.
+    """
+    layers = []
+    for d in range(int(dist[layer[0]]), 0, -1):
+        reached, src, dst, rel = _step(snapshot, layer, direction, codes)
+        keep = dist[reached] == d - 1
+        edges.append((src[keep], dst[keep], rel[keep]))
+        layer = np.unique(reached[keep])
+        layers.append(layer)
+    return layers
+
+
+def shortest_paths(snapshot, source, target, direction='out', types=None, max_depth=6):
+    """
+    Every shortest path from source to target as one subgraph (bidirectional BFS).
+
+    Both ends advance a whole level at a time, always on the smaller frontier,
+    and stop at the first level where they meet, so each side explores only
+    about half the depth. The paths are then traced back from the meeting nodes
+    through the levels of both searches. types restricts the relationship
+    types followed (None for all).
+
+    Returns (layers, edges): layers[d] holds the dense ids at distance d from
+    source on some shortest path (empty if target is more than max_depth hops
+    away) and edges is (sources, targets, rel_types) of the path edges.
+    """
+    codes = None if types is None else snapshot.type_codes(types)
+    backward = REVERSE_DIRECTION[direction]
+    dist_f = np.full(snapshot.num_nodes, -1, dtype=np.int32)
+    dist_b = np.full(snapshot.num_nodes, -1, dtype=np.int32)
+    dist_f[source] = 0
+    dist_b[target] = 0
+    frontier_f = np.array([source], dtype=np.int32)
+    frontier_b = np.array([target], dtype=np.int32)
+    depth_f = depth_b = 0
+
+    meet = frontier_f if source == target else frontier_f[:0]
+    while not meet.size and frontier_f.size and frontier_b.size and depth_f + depth_b < max_depth:
+        if frontier_f.size <= frontier_b.size:
+            reached = _step(snapshot, frontier_f, direction, codes)[0]
+            frontier_f = np.unique(reached[dist_f[reached] < 0])
+            depth_f += 1
+            dist_f[frontier_f] = depth_f
+            meet = frontier_f[dist_b[frontier_f] >= 0]
+        else:
+            reached = _step(snapshot, frontier_b, backward, codes)[0]
+            frontier_b = np.unique(reached[dist_b[reached] < 0])
+            depth_b += 1
+            dist_b[frontier_b] = depth_b
+            meet = frontier_b[dist_f[frontier_b] >= 0]
+    if not meet.size:
+        return [], _edge_arrays([])
+
+    # Only the meeting nodes on the shortest total lie on shortest paths
+    total = dist_f[meet] + dist_b[meet]
+    meet = meet[total == total.min()]
+
+    edges = []
+    towards_source = _trace(snapshot, meet, dist_f, backward, codes, edges)
+    towards_target = _trace(snapshot, meet, dist_b, direction, codes, edges)
+    layers = towards_source[::-1] + [meet] + towards_target
+    return layers, _edge_arrays(edges)
+
+
+def reachable(snapshot, seeds, direction='in', types=None, max_depth=3, max_nodes=None):
+    """
+    Nodes within max_depth hops of seeds, level by level (bounded BFS).
+
+    With direction 'in' relationships are walked backwards, so this finds
+    everything that reaches the seeds: what is affected if they change.
+    types restricts the relationship types followed (None for all). At most
+    max_nodes nodes are returned; the level that passes it is cut short.
+
+    Returns (layers, edges, truncated): layers[d] holds the dense ids first
+    reached at depth d and edges is (sources, targets, rel_types) of the
+    relationships that reached them from the level before.
+    """
+    codes = None if types is None else snapshot.type_codes(types)
+    depth = np.full(snapshot.num_nodes, -1, dtype=np.int32)
+    frontier = np.unique(np.asarray(seeds, dtype=np.int32))
+    depth[frontier] = 0
+    layers = [frontier]
+    edges = []
+    count = frontier.size
+    truncated = False
+
+    for d in range(1, max_depth + 1):
+        if not frontier.size or truncated:
+            break
+        reached, src, dst, rel = _step(snapshot, frontier, direction, codes)
+        frontier = np.unique(reached[depth[reached] < 0])
+        if max_nodes is not None and count + frontier.size > max_nodes:
+            frontier = frontier[:max(0, max_nodes - count)]
+            truncated = True
+        depth[frontier] = d
+        keep = depth[reached] == d
+        edges.append((src[keep], dst[keep], rel[keep]))
+        layers.append(frontier)
+        count += frontier.size
+    return layers, _edge_arrays(edges), truncated
+
+
+def top_k(scores, k):
+    """Dense ids of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
@@ -0,0 +1,226 @@
+"""
+Server-side force-directed layout for result graphs.
+
+Fruchterman-Reingold vectorized with NumPy: exact O(n^2) repulsion for small
+graphs and, above EXACT_LAYOUT_LIMIT nodes, a one-level Barnes-Hut scheme on a
+uniform grid over the bulk of the nodes (exact forces from the 3x3 neighbouring
+cells, cell centroids for everything further away). Layouts are cached per result hash so re-running a
+query or analysis does not recompute them.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+from graph_analytics import _expand
+
+load_dotenv(override=True)
+
+EXACT_LAYOUT_LIMIT = 1000
+# Share of nodes on each side left out of the grid bounds (they go to the border cells)
+GRID_QUANTILE = 0.02
+LAYOUT_ITERATIONS = int(os.getenv("LAYOUT_ITERATIONS", "50"))
+# 'auto' only lays out results at least this large; smaller ones are left to vis.js
+LAYOUT_AUTO_THRESHOLD = int(os.getenv("LAYOUT_AUTO_THRESHOLD", "300"))
+LAYOUT_CACHE_SIZE = int(os.getenv("LAYOUT_CACHE_SIZE", "64"))
+# Layouts run inside the request: larger results are left to vis.js, and the
+# iterations are cut so nodes x iterations stays under LAYOUT_MAX_WORK
+LAYOUT_MAX_NODES = int(os.getenv("LAYOUT_MAX_NODES", "5000"))
+LAYOUT_MAX_WORK = int(os.getenv("LAYOUT_MAX_WORK", "100000"))
+LAYOUT_MIN_ITERATIONS = 10
+# Roughly the vis.js spring length, so laid-out graphs look like simulated ones
+LAYOUT_SPACING = 100.0
+
+
+def fruchterman_reingold(n, sources, targets, iterations=LAYOUT_ITERATIONS, seed=0):
+    """Return an (n, 2) array of positions for a graph given as edge index arrays."""
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2)) * np.sqrt(n)
+    if n <= 1:
+        return pos
+
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    keep = sources != targets
+    sources, targets = sources[keep], targets[keep]
+
+    # Unit optimal distance in an area of n, so the layout grows like sqrt(n)
+    k = 1.0
+    temperature = np.sqrt(n) / 10.0
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        if n <= EXACT_LAYOUT_LIMIT:
+            disp = _exact_repulsion(pos, k)
+        else:
+            disp = _grid_repulsion(pos, k)
+
+        # Attraction along edges: d^2 / k
+        delta = pos[sources] - pos[targets]
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        pull = delta * (distance / k)[:, None]
+        disp -= _scatter(sources, pull, n)
+        disp += _scatter(targets, pull, n)
+
+        # Move at most `temperature` per step
+        length = np.maximum(np.hypot(disp[:, 0], disp[:, 1]), 1e-9)
+        pos += disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature -= cooling
+
+    return pos
+
+
+def _scatter(index, values, n):
+    """Sum (m, 2) values into n rows by index (np.add.at, but much faster)."""
+    return np.column_stack([np.bincount(index, weights=values[:, 0], minlength=n),
+                            np.bincount(index, weights=values[:, 1], minlength=n)])
+
+
+def _exact_repulsion(pos, k):
+    """k^2 / d repulsion between every pair of nodes."""
+    dx = pos[:, 0, None] - pos[None, :, 0]
+    dy = pos[:, 1, None] - pos[None, :, 1]
+    distance_sq = dx * dx + dy * dy
+    np.fill_diagonal(distance_sq, np.inf)
+    np.maximum(distance_sq, 1e-9, out=distance_sq)
+    force = (k * k) / distance_sq
+    return np.column_stack([(dx * force).sum(axis=1), (dy * force).sum(axis=1)])
+
+
+def _grid_repulsion(pos, k, per_cell=16):
+    """Approximate repulsion: exact within neighbouring cells, cell centroids beyond."""
+    n = len(pos)
+    side = int(min(48, max(2, np.sqrt(n / per_cell))))
+    # Size the grid to the bulk of the nodes: nodes pushed far out would otherwise
+    # stretch the box and squeeze everything else into a few cells. Outliers are
+    # clamped into the border cells.
+    low, high = np.quantile(pos, [GRID_QUANTILE, 1 - GRID_QUANTILE], axis=0)
+    extent = np.maximum(high - low, 1e-9)
+    cell_xy = np.clip((pos - low) / extent * side, 0, side - 1).astype(np.int64)
+    cell = cell_xy[:, 0] * side + cell_xy[:, 1]
+    cells = side * side
+
+    # Nodes sorted by cell, with CSR offsets per cell
+    order = np.argsort(cell, kind='stable')
+    offsets = np.zeros(cells + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cell, minlength=cells), out=offsets[1:])
+
+    mass = np.diff(offsets).astype(np.float64)
+    centroid = _scatter(cell, pos, cells) / np.maximum(mass, 1)[:, None]
+
+    disp = np.zeros((n, 2))
+    counts = np.diff(offsets)
+
+    # Near field: exact forces between nodes in neighbouring cells. Each pair of
+    # cells is visited once (its own cell plus half the neighbours) and the force
+    # is applied to both ends.
+    for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        nx, ny = cell_xy[:, 0] + dx, cell_xy[:, 1] + dy
+        nodes = np.flatnonzero((nx >= 0) & (nx < side) & (ny >= 0) & (ny < side))
+        other_cell = nx[nodes] * side + ny[nodes]
+        _, positions = _expand(offsets, other_cell)
+        src = np.repeat(nodes, counts[other_cell])
+        dst = order[positions]
+        keep = src != dst
+        src, dst = src[keep], dst[keep]
+        delta = pos[src] - pos[dst]
+        distance_sq = np.maximum((delta ** 2).sum(axis=1), 1e-9)
+        push = delta * (k * k / distance_sq)[:, None]
+        disp += _scatter(src, push, n)
+        if dx or dy:
+            disp -= _scatter(dst, push, n)
+
+    # Far field: cells outside the 3x3 block act as one body at their centroid, and
+    # since that force varies slowly it is evaluated once per cell, not per node
+    occupied = np.flatnonzero(mass)
+    ox, oy = occupied // side, occupied % side
+    dx = centroid[occupied, 0, None] - centroid[None, occupied, 0]
+    dy = centroid[occupied, 1, None] - centroid[None, occupied, 1]
+    weight = mass[occupied][None, :] * (k * k) / np.maximum(dx * dx + dy * dy, 1e-9)
+    weight[(np.abs(ox[:, None] - ox[None, :]) <= 1) & (np.abs(oy[:, None] - oy[None, :]) <= 1)] = 0.0
+    far = np.zeros((cells, 2))
+    far[occupied, 0] = (dx * weight).sum(axis=1)
+    far[occupied, 1] = (dy * weight).sum(axis=1)
+    return disp + far[cell]
+
+
+def result_hash(node_ids, edges):
+    """Stable hash of a result's topology (node ids and edge endpoints)."""
+    digest = hashlib.sha1()
+    for node_id in sorted(node_ids):
+        digest.update(node_id.encode())
+        digest.update(b'\0')
+    digest.update(b'\1')
+    for source, target in sorted((edge['from'], edge['to']) for edge in edges):
+        digest.update(f'{source}\0{target}\0'.encode())
+    return digest.hexdigest()
+
+
+class LayoutCache:
+    """LRU cache of {node id: (x, y)} keyed by result hash."""
+
+    def __init__(self, max_entries=LAYOUT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def positions(self, node_ids, edges, iterations=LAYOUT_ITERATIONS):
+        """Positions for a result graph, computed once per distinct topology."""
+        key = (result_hash(node_ids, edges), iterations)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return cached
+            self._stats['misses'] += 1
+
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+        pairs = [(index[edge['from']], index[edge['to']]) for edge in edges
+                 if edge['from'] in index and edge['to'] in index]
+        sources = [s for s, _ in pairs]
+        targets = [t for _, t in pairs]
+        pos = fruchterman_reingold(len(node_ids), sources, targets, iterations)
+        if len(pos):
+            pos = (pos - pos.mean(axis=0)) * LAYOUT_SPACING
+        positions = {node_id: (round(float(x), 1), round(float(y), 1))
+                     for node_id, (x, y) in zip(node_ids, pos.tolist())}
+
+        with self._lock:
+            self._entries[key] = positions
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return positions
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'maxEntries': self.max_entries, **self._stats}
+
+
+layout_cache = LayoutCache()
+
+
+def wants_layout(option, node_count):
+    """Whether a request's layout option (true/false/'auto') asks for a layout."""
+    if node_count > LAYOUT_MAX_NODES:
+        return False
+    if option == 'auto':
+        return node_count >= LAYOUT_AUTO_THRESHOLD
+    return bool(option)
+
+
+def request_iterations(node_count, iterations=LAYOUT_ITERATIONS):
+    """Iterations for a layout computed during a request, within the work budget."""
+    return max(LAYOUT_MIN_ITERATIONS, min(iterations, LAYOUT_MAX_WORK // max(node_count, 1)))
+
+
+def with_layout(nodes, edges, iterations=LAYOUT_ITERATIONS):
+    """Copies of node dicts with 'x'/'y' attached."""
+    iterations = request_iterations(len(nodes), iterations)
+    positions = layout_cache.positions([node['id'] for node in nodes], edges, iterations)
+    return [{**node, 'x': positions[node['id']][0], 'y': positions[node['id']][1]}
+            for node in nodes]
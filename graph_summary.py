@@ -0,0 +1,256 @@
+"""
+Level-of-detail summaries for results too large to draw.
+
+Result nodes are grouped, either by their FileModel/FolderModel container
+(following CONTAINS edges in the analytics snapshot) or by label propagation
+communities over the result itself. Each group becomes one super-node and
+edges between groups are aggregated with counts. Summaries are kept in a small
+LRU so the UI can expand a super-node into its members on click.
+"""
+import os
+import threading
+import uuid
+from collections import Counter, OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+from graph_analytics import GraphSnapshot, label_propagation
+
+load_dotenv(override=True)
+
+SUMMARY_MAX_NODES = int(os.getenv("SUMMARY_MAX_NODES", "1500"))
+SUMMARY_STORE_SIZE = int(os.getenv("SUMMARY_STORE_SIZE", "32"))
+SUMMARY_MODES = ('auto', 'containment', 'communities')
+CONTAINMENT_LEVELS = ('FileModel', 'FolderModel')
+# Deepest CONTAINS chain followed when looking for a container
+MAX_CONTAINMENT_DEPTH = 32
+OTHER_GROUP = 'other'
+SUPER_NODE_PREFIX = 'summary:'
+
+
+def containers(snapshot, label):
+    """
+    Dense id of each node's nearest ancestor (or itself) with the given label.
+
+    Ancestors follow CONTAINS edges backwards; -1 where there is none.
+    """
+    n = snapshot.num_nodes
+    parent = np.full(n, -1, dtype=np.int64)
+    if 'CONTAINS' in snapshot.type_names:
+        contains = snapshot.rel_types == snapshot.type_names.index('CONTAINS')
+        parent[snapshot.targets[contains]] = snapshot.sources[contains]
+
+    is_target = np.fromiter((node_label == label for node_label in snapshot.node_labels),
+                            dtype=bool, count=n)
+    current = np.arange(n, dtype=np.int64)
+    for _ in range(MAX_CONTAINMENT_DEPTH):
+        climbing = ~is_target[current] & (parent[current] >= 0)
+        if not climbing.any():
+            break
+        current[climbing] = parent[current[climbing]]
+    return np.where(is_target[current], current, -1)
+
+
+def containment_groups(node_ids, snapshot, container_of):
+    """Group key per result node: container element id, or its label if uncontained."""
+    groups = []
+    for node_id in node_ids:
+        i = snapshot.index.get(node_id)
+        container = container_of[i] if i is not None else -1
+        groups.append(snapshot.node_ids[container] if container >= 0 else None)
+    return groups
+
+
+def community_groups(nodes, edges):
+    """Group key per result node from label propagation over the result graph."""
+    node_ids = [node['id'] for node in nodes]
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    pairs = [(index[edge['from']], index[edge['to']]) for edge in edges
+             if edge['from'] in index and edge['to'] in index]
+    result = GraphSnapshot(node_ids, [node['labels'][0] if node['labels'] else 'Node' for node in nodes],
+                           [s for s, _ in pairs], [t for _, t in pairs],
+                           np.zeros(len(pairs), dtype=np.int16), ['RELATED'])
+    return [f'community:{c}' for c in label_propagation(result).tolist()]
+
+
+def cap_groups(groups, max_groups):
+    """Fold all but the max_groups - 1 largest groups into OTHER_GROUP."""
+    sizes = Counter(groups)
+    if len(sizes) <= max_groups:
+        return groups
+    kept = {group for group, _ in sizes.most_common(max_groups - 1)}
+    return [group if group in kept else OTHER_GROUP for group in groups]
+
+
+def group_name(group, names):
+    """Display name of a group: its container's name, or a readable form of the key."""
+    if group in names:
+        return names[group]
+    kind, _, value = group.partition(':')
+    if kind == 'label':
+        return f'{value} (uncontained)'
+    if kind == 'community':
+        return f'Community {value}'
+    return group
+
+
+def super_node_id(group):
+    return f'{SUPER_NODE_PREFIX}{group}'
+
+
+def is_super_node(node_id):
+    return node_id.startswith(SUPER_NODE_PREFIX)
+
+
+def aggregate_edges(edges, endpoint):
+    """
+    Map edge ends through endpoint() and merge edges that touch a super-node.
+
+    Edges between two real nodes are kept as they are; edges with a
+    super-node end are merged per (from, to) with a count and per-type
+    breakdown, and edges inside a single super-node are dropped.
+    """
+    plain = []
+    merged = OrderedDict()
+    for edge in edges:
+        source, target = endpoint(edge['from']), endpoint(edge['to'])
+        if not is_super_node(source) and not is_super_node(target):
+            plain.append(edge)
+        elif source != target:
+            merged.setdefault((source, target), Counter())[edge['label']] += 1
+
+    for (source, target), types in merged.items():
+        count = sum(types.values())
+        plain.append({
+            'from': source,
+            'to': target,
+            'label': f'{next(iter(types))} ×{count}' if len(types) == 1 else f'{count} edges',
+            'count': count,
+            'types': dict(types.most_common())
+        })
+    return plain
+
+
+class Summary:
+    """A summarized result: group membership plus the original nodes and edges."""
+
+    def __init__(self, mode, nodes, edges, groups, names):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.nodes = {node['id']: node for node in nodes}
+        self.edges = edges
+        self.group_of = {node['id']: group for node, group in zip(nodes, groups)}
+        self.members = OrderedDict()
+        for node, group in zip(nodes, groups):
+            self.members.setdefault(group, []).append(node['id'])
+        self.names = names
+
+    def graph(self):
+        """Super-nodes and aggregated edges for the whole result."""
+        nodes = []
+        for group, members in self.members.items():
+            labels = Counter(label for member in members for label in self.nodes[member]['labels'])
+            name = group_name(group, self.names)
+            nodes.append({
+                'id': super_node_id(group),
+                'label': f'{name} ({len(members)})',
+                'labels': ['Summary'],
+                'properties': {'name': name, 'members': len(members)},
+                'summary': {
+                    'summaryId': self.id,
+                    'group': group,
+                    'count': len(members),
+                    'labels': dict(labels.most_common())
+                }
+            })
+        edges = aggregate_edges(self.edges, lambda node_id: super_node_id(self.group_of[node_id]))
+        return nodes, edges
+
+    def expand(self, group, expanded=(), limit=SUMMARY_MAX_NODES):
+        """
+        Members of one group and the edges touching them.
+
+        Edge ends in groups listed in expanded (already open on the client)
+        point at the member; other ends point at that group's super-node.
+        """
+        members = self.members.get(group)
+        if members is None:
+            raise KeyError(group)
+        shown = set(members[:limit])
+        expanded = set(expanded) - {group}
+
+        def endpoint(node_id):
+            if node_id in shown or self.group_of[node_id] in expanded:
+                return node_id
+            return super_node_id(self.group_of[node_id])
+
+        touching = [edge for edge in self.edges if edge['from'] in shown or edge['to'] in shown]
+        return {
+            'nodes': [self.nodes[member] for member in members[:limit]],
+            'edges': aggregate_edges(touching, endpoint),
+            'group': group,
+            'truncated': len(members) > limit
+        }
+
+
+def summarize(nodes, edges, mode='auto', max_nodes=SUMMARY_MAX_NODES, snapshot=None,
+              container_of=None, container_names=None):
+    """
+    Build a Summary for a result.
+
+    containment mode needs the analytics snapshot and a container_of(label)
+    callback returning containers(snapshot, label); container_names takes a
+    list of container element ids and returns {element id: display name}.
+    """
+    if mode not in SUMMARY_MODES:
+        raise ValueError(f'Unknown summary mode: {mode}')
+    node_ids = [node['id'] for node in nodes]
+
+    groups = None
+    if mode in ('auto', 'containment') and snapshot is not None and 'CONTAINS' in snapshot.type_names:
+        for level in CONTAINMENT_LEVELS:
+            candidate = containment_groups(node_ids, snapshot, container_of(level))
+            candidate = [group if group is not None else f"label:{node['labels'][0] if node['labels'] else 'Node'}"
+                         for group, node in zip(candidate, nodes)]
+            groups = candidate
+            if len(set(candidate)) <= max_nodes:
+                break
+        mode = 'containment'
+    if groups is None:
+        if mode == 'containment':
+            raise ValueError('Containment summary needs CONTAINS relationships')
+        groups = community_groups(nodes, edges)
+        mode = 'communities'
+
+    groups = cap_groups(groups, max_nodes)
+    names = {}
+    if container_names:
+        names = container_names([group for group in set(groups)
+                                 if not group.startswith(('label:', 'community:')) and group != OTHER_GROUP])
+    return Summary(mode, nodes, edges, groups, names)
+
+
+class SummaryStore:
+    """LRU of recent summaries so their groups can be expanded later."""
+
+    def __init__(self, max_entries=SUMMARY_STORE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def put(self, summary):
+        with self._lock:
+            self._entries[summary.id] = summary
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, summary_id):
+        with self._lock:
+            summary = self._entries.get(summary_id)
+            if summary is not None:
+                self._entries.move_to_end(summary_id)
+            return summary
+
+
+summary_store = SummaryStore()
@@ -0,0 +1,372 @@
+"""
+Bulk ingestion of a source tree into the FolderModel/FileModel/SymbolModel graph.
+
+The tree is walked in this process; reading, hashing and parsing files runs on
+a process pool. Each FileModel stores the SHA-256 of its content, so a re-run
+only re-extracts files whose hash changed, writes their symbols and deletes the
+graph nodes of files that disappeared. All writes are UNWIND ... MERGE batches
+of INGEST_BATCH_SIZE rows, one transaction per batch, on top of uniqueness
+constraints that make every MERGE an index seek.
+
+Paths in the graph are prefixed with the repository name (the root directory's
+name unless --name is given), so several repositories can share one database.
+
+Usage:
+    python ingest.py ~/src/project
+    python ingest.py ~/src/project --workers 8 --batch-size 5000
+    python ingest.py ~/src/project --full        # ignore stored hashes
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+from neo4j.exceptions import Neo4jError
+
+from neo4j_connection import get_session, iter_query
+
+load_dotenv(override=True)
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "2000"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+# Files handed to a worker at a time
+INGEST_CHUNK_SIZE = 16
+
+LANGUAGES = {'.py': 'python'}
+SKIP_DIRECTORIES = {'.git', '.hg', '.svn', '__pycache__', 'node_modules', '.venv', 'venv', 'env',
+                    '.tox', '.nox', '.mypy_cache', '.pytest_cache', 'build', 'dist', 'site-packages'}
+
+SCHEMA = [
+    "CREATE CONSTRAINT folder_path IF NOT EXISTS FOR (n:FolderModel) REQUIRE n.path IS UNIQUE",
+    "CREATE CONSTRAINT file_path IF NOT EXISTS FOR (n:FileModel) REQUIRE n.path IS UNIQUE",
+    "CREATE CONSTRAINT symbol_id IF NOT EXISTS FOR (n:SymbolModel) REQUIRE n.id IS UNIQUE",
+    "CREATE CONSTRAINT tag_name IF NOT EXISTS FOR (n:Tag) REQUIRE n.name IS UNIQUE",
+    "CREATE INDEX symbol_name IF NOT EXISTS FOR (n:SymbolModel) ON (n.name)",
+    "CREATE INDEX symbol_kind IF NOT EXISTS FOR (n:SymbolModel) ON (n.kind)",
+]
+
+STORED_HASHES = """
+    MATCH (f:FileModel)
+    WHERE f.path STARTS WITH $prefix
+    RETURN f.path AS path, f.contentHash AS hash
+"""
+
+MERGE_FOLDERS = """
+    UNWIND $rows AS row
+    MERGE (d:FolderModel {path: row.path})
+    SET d.name = row.name
+    WITH d, row
+    WHERE row.parent IS NOT NULL
+    MATCH (p:FolderModel {path: row.parent})
+    MERGE (p)-[:CONTAINS]->(d)
+"""
+
+MERGE_FILES = """
+    UNWIND $rows AS row
+    MERGE (f:FileModel {path: row.path})
+    SET f.name = row.name, f.language = row.language
+    WITH f, row
+    MATCH (d:FolderModel {path: row.folder})
+    MERGE (d)-[:CONTAINS]->(f)
+"""
+
+MERGE_SYMBOLS = """
+    UNWIND $rows AS row
+    MERGE (s:SymbolModel {id: row.id})
+    SET s += row.properties
+    WITH s, row
+    MATCH (f:FileModel {path: row.file})
+    MERGE (f)-[:CONTAINS]->(s)
+    WITH s, row
+    OPTIONAL MATCH (s)-[old:HAS_TAG]->()
+    DELETE old
+    WITH DISTINCT s, row
+    UNWIND row.tags AS tag
+    MERGE (t:Tag {name: tag})
+    MERGE (s)-[:HAS_TAG]->(t)
+"""
+
+# Symbols that a changed file no longer defines
+DELETE_STALE_SYMBOLS = """
+    UNWIND $rows AS row
+    MATCH (:FileModel {path: row.path})-[:CONTAINS]->(s:SymbolModel)
+    WHERE NOT s.id IN row.symbols
+    DETACH DELETE s
+"""
+
+DELETE_FILES = """
+    UNWIND $rows AS path
+    MATCH (f:FileModel {path: path})
+    OPTIONAL MATCH (f)-[:CONTAINS]->(s:SymbolModel)
+    DETACH DELETE s, f
+"""
+
+DELETE_EMPTY_FOLDERS = """
+    MATCH (d:FolderModel)
+    WHERE d.path STARTS WITH $prefix AND NOT (d)-[:CONTAINS]->()
+    DETACH DELETE d
+    RETURN count(*) AS deleted
+"""
+
+# Written last, so a run that dies half way re-ingests the files it didn't finish
+SET_HASHES = """
+    UNWIND $rows AS row
+    MATCH (f:FileModel {path: row.path})
+    SET f.contentHash = row.hash, f.symbolCount = row.symbolCount
+"""
+
+
+def walk(root):
+    """Relative paths of the source files under root that have an extractor, sorted."""
+    paths = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories
+                                   if d not in SKIP_DIRECTORIES and not d.startswith('.'))
+        for name in files:
+            if os.path.splitext(name)[1] in LANGUAGES:
+                paths.append(os.path.relpath(os.path.join(directory, name), root).replace(os.sep, '/'))
+    return sorted(paths)
+
+
+def decorator_name(node):
+    """Last dotted name of a decorator: @app.route('/x') -> route."""
+    if isinstance(node, ast.Call):
+        node = node.func
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return None
+
+
+def documentation(node, kind):
+    """Documentation JSON for a class or function: docstring summary/description and parameters."""
+    docstring = ast.get_docstring(node) or ''
+    summary, _, description = docstring.strip().partition('\n\n')
+    doc = {}
+    if summary:
+        doc['summary'] = ' '.join(summary.split())
+    if description.strip():
+        doc['description'] = description.strip()
+    if kind != 'class':
+        arguments = node.args.posonlyargs + node.args.args + node.args.kwonlyargs
+        parameters = [{'name': arg.arg, 'type': ast.unparse(arg.annotation) if arg.annotation else None}
+                      for arg in arguments if arg.arg not in ('self', 'cls')]
+        if parameters:
+            doc['parameters'] = parameters
+        if node.returns is not None:
+            doc['returns'] = ast.unparse(node.returns)
+    return json.dumps(doc) if doc else None
+
+
+def python_symbols(source, file_path):
+    """
+    Classes, functions and methods defined in a Python module, outermost first.
+
+    A symbol's id is file:qualifiedName. Names defined more than once in a
+    scope (a @property and its setter, alternative defs under if/else) get
+    #2, #3, ... in source order, so each definition keeps its own node.
+    """
+    symbols = []
+    seen = {}
+
+    def visit(body, scope, in_class):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                kind = 'class' if isinstance(node, ast.ClassDef) else 'method' if in_class else 'function'
+                qualified_name = f'{scope}.{node.name}' if scope else node.name
+                seen[qualified_name] = seen.get(qualified_name, 0) + 1
+                symbol_id = f'{file_path}:{qualified_name}'
+                if seen[qualified_name] > 1:
+                    symbol_id += f'#{seen[qualified_name]}'
+                tags = {name for name in map(decorator_name, node.decorator_list) if name}
+                if isinstance(node, ast.AsyncFunctionDef):
+                    tags.add('async')
+                symbols.append({
+                    'id': symbol_id,
+                    'file': file_path,
+                    'properties': {
+                        'name': node.name,
+                        'qualifiedName': qualified_name,
+                        'kind': kind,
+                        'line': node.lineno,
+                        'endLine': node.end_lineno,
+                        'documentation': documentation(node, kind),
+                    },
+                    'tags': sorted(tags),
+                })
+                if kind == 'class':
+                    # Functions nested in functions are implementation details and are skipped
+                    visit(node.body, qualified_name, True)
+            elif hasattr(node, 'body'):
+                # Definitions under if/try/with/for blocks belong to the enclosing scope
+                for field in ('body', 'orelse', 'handlers', 'finalbody'):
+                    visit(getattr(node, field, []), scope, in_class)
+
+    visit(ast.parse(source, filename=file_path).body, '', False)
+    return symbols
+
+
+EXTRACTORS = {'python': python_symbols}
+
+
+def extract_file(task):
+    """
+    Hash one file and, if the hash differs from the stored one, extract its symbols.
+
+    Runs in a worker process; task is (root, relative path, graph path, stored hash).
+    """
+    root, relative_path, path, stored_hash = task
+    with open(os.path.join(root, relative_path), 'rb') as f:
+        content = f.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+    language = LANGUAGES[os.path.splitext(relative_path)[1]]
+    extracted = {'path': path, 'hash': content_hash, 'language': language, 'changed': content_hash != stored_hash,
+                 'symbols': [], 'error': None}
+    if extracted['changed']:
+        try:
+            extracted['symbols'] = EXTRACTORS[language](content.decode('utf-8', errors='replace'), path)
+        except (SyntaxError, ValueError) as e:
+            extracted['error'] = f'{type(e).__name__}: {e}'
+    return extracted
+
+
+def folder_rows(paths, name):
+    """FolderModel rows for every directory holding one of paths, parents before children."""
+    folders = {name: None}
+    for path in paths:
+        parts = path.split('/')[:-1]
+        for depth in range(2, len(parts) + 1):
+            folders['/'.join(parts[:depth])] = '/'.join(parts[:depth - 1])
+    return [{'path': path, 'name': path.rsplit('/', 1)[-1], 'parent': parent}
+            for path, parent in sorted(folders.items(), key=lambda item: item[0].count('/'))]
+
+
+def batches(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def write_batches(session, query, rows, batch_size):
+    """Run query once per batch of rows, each batch in its own write transaction."""
+    for batch in batches(rows, batch_size):
+        session.execute_write(lambda tx: tx.run(query, rows=batch).consume())
+
+
+def create_schema(session):
+    """Create the constraints and indexes ingestion relies on (existing ones are kept)."""
+    for statement in SCHEMA:
+        try:
+            session.run(statement).consume()
+        except Neo4jError as e:
+            # Usually duplicate keys left by an earlier loader; MERGE still works, just slower
+            print(f'  ! could not apply "{statement}": {e.message}', file=sys.stderr)
+
+
+class Ingestion:
+    """One ingestion run of a source tree; run() does the work and returns its stats."""
+
+    def __init__(self, root, name=None, workers=INGEST_WORKERS, batch_size=INGEST_BATCH_SIZE, full=False):
+        self.root = os.path.abspath(root)
+        self.name = name or os.path.basename(self.root.rstrip(os.sep))
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.full = full
+        self.timings = {}
+
+    def timed(self, phase, start):
+        self.timings[phase] = round(time.perf_counter() - start, 2)
+
+    def extract(self, relative_paths, stored):
+        """Run extract_file over every path, on a process pool unless workers is 1."""
+        tasks = [(self.root, relative_path, f'{self.name}/{relative_path}',
+                  None if self.full else stored.get(f'{self.name}/{relative_path}'))
+                 for relative_path in relative_paths]
+        if self.workers == 1:
+            return [extract_file(task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(extract_file, tasks, chunksize=INGEST_CHUNK_SIZE))
+
+    def run(self):
+        start = time.perf_counter()
+        relative_paths = walk(self.root)
+        stored = {row['path']: row['hash'] for row in iter_query(STORED_HASHES, {'prefix': f'{self.name}/'})}
+        self.timed('walk', start)
+
+        start = time.perf_counter()
+        files = self.extract(relative_paths, stored)
+        changed = [f for f in files if f['changed']]
+        deleted = sorted(set(stored) - {f['path'] for f in files})
+        self.timed('extract', start)
+
+        start = time.perf_counter()
+        with get_session() as session:
+            create_schema(session)
+            self.timed('schema', start)
+
+            start = time.perf_counter()
+            write_batches(session, MERGE_FOLDERS, folder_rows([f['path'] for f in changed], self.name),
+                          self.batch_size)
+            write_batches(session, MERGE_FILES, [
+                {'path': f['path'], 'name': f['path'].rsplit('/', 1)[-1], 'language': f['language'],
+                 'folder': f['path'].rsplit('/', 1)[0]}
+                for f in changed], self.batch_size)
+            symbols = [symbol for f in changed for symbol in f['symbols']]
+            write_batches(session, MERGE_SYMBOLS, symbols, self.batch_size)
+            write_batches(session, DELETE_STALE_SYMBOLS, [
+                {'path': f['path'], 'symbols': [symbol['id'] for symbol in f['symbols']]}
+                for f in changed if f['path'] in stored], self.batch_size)
+            self.timed('write', start)
+
+            start = time.perf_counter()
+            write_batches(session, DELETE_FILES, deleted, self.batch_size)
+            if deleted:
+                # Each pass removes one level of folders left empty
+                while session.run(DELETE_EMPTY_FOLDERS, prefix=f'{self.name}/').single()['deleted']:
+                    pass
+            write_batches(session, SET_HASHES, [
+                {'path': f['path'], 'hash': f['hash'], 'symbolCount': len(f['symbols'])}
+                for f in changed], self.batch_size)
+            self.timed('finish', start)
+
+        return {
+            'repository': self.name,
+            'files': len(files),
+            'changed': len(changed),
+            'new': sum(1 for f in changed if f['path'] not in stored),
+            'unchanged': len(files) - len(changed),
+            'deleted': len(deleted),
+            'symbols': len(symbols),
+            'errors': {f['path']: f['error'] for f in changed if f['error']},
+            'seconds': self.timings,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest a source tree into the code graph.')
+    parser.add_argument('root', help='directory to ingest')
+    parser.add_argument('--name', help='repository name used as the path prefix (default: directory name)')
+    parser.add_argument('--workers', type=int, default=INGEST_WORKERS, help='extraction processes')
+    parser.add_argument('--batch-size', type=int, default=INGEST_BATCH_SIZE, help='rows per write transaction')
+    parser.add_argument('--full', action='store_true', help='re-extract every file, ignoring stored hashes')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        sys.exit(f'Error: {args.root} is not a directory')
+
+    stats = Ingestion(args.root, args.name, args.workers, args.batch_size, args.full).run()
+    print(f"{stats['repository']}: {stats['files']} files ({stats['new']} new, "
+          f"{stats['changed'] - stats['new']} changed, {stats['unchanged']} unchanged, "
+          f"{stats['deleted']} deleted), {stats['symbols']} symbols written")
+    print('  ' + ', '.join(f'{phase} {seconds} s' for phase, seconds in stats['seconds'].items()))
+    for path, error in stats['errors'].items():
+        print(f'  ! {path}: {error}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
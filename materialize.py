@@ -0,0 +1,290 @@
+"""
+Materialized analytics: degree, PageRank and community scores written back to Neo4j.
+
+A batch job computes the scores for every node on the analytics snapshot and
+stores them as node properties (degree, pagerank, community) with batched
+UNWIND ... SET transactions, then creates a range index per label on each
+property. The /analyze/* endpoints can then answer top-k with one indexed
+ORDER BY ... LIMIT read instead of recomputing on the snapshot, and the scores
+can be filtered on in ordinary Cypher (WHERE n.pagerank > 0.001).
+
+The job runs from the command line, on demand via POST /analytics/materialize,
+or every MATERIALIZE_INTERVAL seconds in the web app (0 disables the schedule).
+
+Usage:
+    python materialize.py
+    python materialize.py --algorithms pagerank communities --batch-size 20000
+"""
+import argparse
+import os
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from neo4j_connection import get_session
+from graph_analytics import degree, pagerank, label_propagation
+from query_executor import query_executor, Read, first_column
+from query_cache import query_cache
+from snapshot_cache import snapshot_cache
+from schema_cache import quote
+
+load_dotenv(override=True)
+
+MATERIALIZE_BATCH_SIZE = int(os.getenv("MATERIALIZE_BATCH_SIZE", "10000"))
+MATERIALIZE_INTERVAL = float(os.getenv("MATERIALIZE_INTERVAL", "0"))
+# How long the list of materialized (indexed) properties is trusted before SHOW INDEXES is re-read
+MATERIALIZED_CHECK_TTL = 60.0
+
+# algorithm -> node property holding its score
+PROPERTIES = {'degree': 'degree', 'pagerank': 'pagerank', 'communities': 'community'}
+INDEX_PREFIX = 'analytics_'
+
+WRITE_SCORES = """
+    UNWIND $rows AS row
+    MATCH (n)
+    WHERE elementId(n) = row.id
+    SET n += row.scores
+"""
+
+ONLINE_INDEXES = """
+    SHOW INDEXES
+    YIELD name, state, labelsOrTypes, properties
+    WHERE name STARTS WITH $prefix AND state = 'ONLINE'
+    RETURN labelsOrTypes[0] AS label, properties[0] AS property
+"""
+
+
+def index_name(label, prop):
+    return INDEX_PREFIX + re.sub(r'\W', '_', label) + '_' + prop
+
+
+def compute_scores(snapshot, algorithms):
+    """{property: array of per-node scores} for the given algorithms."""
+    scores = {}
+    if 'degree' in algorithms:
+        scores['degree'] = degree(snapshot)
+    if 'pagerank' in algorithms:
+        scores['pagerank'] = pagerank(snapshot)
+    if 'communities' in algorithms:
+        scores['community'] = label_propagation(snapshot)
+    return scores
+
+
+def score_rows(snapshot, scores, start, end):
+    """Write rows for snapshot nodes start..end: {id, scores: {property: value}}."""
+    columns = {prop: values[start:end].tolist() for prop, values in scores.items()}
+    return [
+        {'id': element_id, 'scores': {prop: column[i] for prop, column in columns.items()}}
+        for i, element_id in enumerate(snapshot.node_ids[start:end])
+    ]
+
+
+def write_scores(session, snapshot, scores, batch_size=MATERIALIZE_BATCH_SIZE):
+    """SET the scores on every snapshot node, one write transaction per batch of rows."""
+    for start in range(0, snapshot.num_nodes, batch_size):
+        rows = score_rows(snapshot, scores, start, start + batch_size)
+        session.execute_write(lambda tx: tx.run(WRITE_SCORES, rows=rows).consume())
+
+
+def create_indexes(session, labels, properties):
+    """Range index on each score property for each label (existing ones are kept)."""
+    for label in labels:
+        for prop in properties:
+            session.run(f"CREATE INDEX {index_name(label, prop)} IF NOT EXISTS "
+                        f"FOR (n:{quote(label)}) ON (n.{prop})").consume()
+
+
+class Materializer:
+    """Runs the materialization job and knows which scores are available to serve."""
+
+    def __init__(self, interval=MATERIALIZE_INTERVAL, batch_size=MATERIALIZE_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._indexed = None
+        self._checked_at = 0.0
+        self._thread = None
+        self._scheduler = None
+        self._last_run = None
+        self._error = None
+        # algorithm -> snapshot change marker its stored scores were computed at
+        self._markers = {}
+
+    def run(self, algorithms=tuple(PROPERTIES)):
+        """Compute and write back the scores now; returns a summary of the run."""
+        with self._run_lock:
+            with self._lock:
+                # Stored scores are about to be overwritten; a failed run leaves them mixed
+                for algorithm in algorithms:
+                    self._markers.pop(algorithm, None)
+            try:
+                timings = {}
+                start = time.perf_counter()
+                snapshot, marker = snapshot_cache.current()
+                scores = compute_scores(snapshot, algorithms)
+                timings['compute'] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                with get_session() as session:
+                    try:
+                        write_scores(session, snapshot, scores, self.batch_size)
+                    finally:
+                        # Cached /query results may filter on or show the scores, even after a partial write
+                        query_cache.invalidate()
+                    timings['write'] = time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    create_indexes(session, sorted(set(snapshot.node_labels)), list(scores))
+                    timings['index'] = time.perf_counter() - start
+            except Exception as e:
+                with self._lock:
+                    self._error = str(e)
+                raise
+
+            summary = {
+                'algorithms': list(algorithms),
+                'nodes': snapshot.num_nodes,
+                'marker': marker,
+                'finishedAt': time.time(),
+                'seconds': {phase: round(seconds, 2) for phase, seconds in timings.items()},
+            }
+            with self._lock:
+                self._last_run = summary
+                self._markers.update(dict.fromkeys(algorithms, marker))
+                self._error = None
+                # Re-read SHOW INDEXES; new indexes may still be populating
+                self._indexed = None
+            return summary
+
+    def start(self, algorithms=tuple(PROPERTIES)):
+        """Run the job on a background thread; False if a run is already in progress."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._run_quietly, args=(algorithms,),
+                                            name='materialize', daemon=True)
+            self._thread.start()
+            return True
+
+    def running(self):
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+
+    def labels(self, algorithm):
+        """
+        Labels whose nodes have an online index on the algorithm's property.
+
+        Empty if the scores were never materialized. Also starts the schedule
+        on first use when MATERIALIZE_INTERVAL is set.
+        """
+        self._start_scheduler()
+        with self._lock:
+            indexed = self._indexed
+            if indexed is not None and time.monotonic() - self._checked_at > MATERIALIZED_CHECK_TTL:
+                indexed = None
+        if indexed is None:
+            rows = query_executor.run([Read(ONLINE_INDEXES, {'prefix': INDEX_PREFIX})])[0]
+            indexed = {}
+            for row in rows:
+                indexed.setdefault(row['property'], []).append(row['label'])
+            with self._lock:
+                self._indexed = indexed
+                self._checked_at = time.monotonic()
+        return sorted(indexed.get(PROPERTIES[algorithm], []))
+
+    def current(self, algorithm):
+        """
+        Whether the algorithm's stored scores describe the graph as it is now.
+
+        True only if this process computed them at the change marker the
+        snapshot cache reports now, so scores written by another process, or
+        before nodes and relationships were added or deleted, count as stale.
+        """
+        with self._lock:
+            marker = self._markers.get(algorithm)
+        return marker is not None and marker == snapshot_cache.marker()
+
+    def top(self, algorithm, limit, ascending=False):
+        """
+        Top nodes by a materialized score with one read: an index-backed
+        ORDER BY ... LIMIT per label, merged. Returns records with n, score,
+        inDegree and outDegree.
+        """
+        prop = PROPERTIES[algorithm]
+        order = 'ASC' if ascending else 'DESC'
+        branches = [f"""
+            MATCH (n:{quote(label)})
+            WHERE n.{prop} IS NOT NULL
+            RETURN n ORDER BY n.{prop} {order} LIMIT $limit
+        """ for label in self.labels(algorithm)]
+        if not branches:
+            return []
+        query = f"""
+            CALL {{ {' UNION ALL '.join(branches)} }}
+            WITH DISTINCT n
+            ORDER BY n.{prop} {order}
+            LIMIT $limit
+            RETURN n, n.{prop} AS score, COUNT {{ (n)<--() }} AS inDegree, COUNT {{ (n)-->() }} AS outDegree
+        """
+        return query_executor.run([Read(query, {'limit': limit}, list)])[0]
+
+    def community_count(self):
+        """Number of materialized communities (ids are 0..count-1, largest first)."""
+        reads = [Read(f"""
+            MATCH (n:{quote(label)})
+            WHERE n.community IS NOT NULL
+            RETURN n.community AS community ORDER BY n.community DESC LIMIT 1
+        """, handler=first_column) for label in self.labels('communities')]
+        highest = [values[0] for values in query_executor.run(reads) if values]
+        return max(highest) + 1 if highest else 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'interval': self.interval,
+                'batchSize': self.batch_size,
+                'lastRun': self._last_run,
+                'lastError': self._error,
+                'indexed': self._indexed,
+            }
+
+    def _run_quietly(self, algorithms):
+        try:
+            self.run(algorithms)
+        except Exception:
+            pass  # kept in lastError
+
+    def _start_scheduler(self):
+        with self._lock:
+            if self._scheduler is not None or self.interval <= 0:
+                return
+            self._scheduler = threading.Thread(target=self._schedule_loop, name='materialize-schedule',
+                                               daemon=True)
+            self._scheduler.start()
+
+    def _schedule_loop(self):
+        while True:
+            self._run_quietly(tuple(PROPERTIES))
+            time.sleep(self.interval)
+
+
+materializer = Materializer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write degree, PageRank and community scores back to Neo4j.')
+    parser.add_argument('--algorithms', nargs='+', choices=list(PROPERTIES), default=list(PROPERTIES))
+    parser.add_argument('--batch-size', type=int, default=MATERIALIZE_BATCH_SIZE, help='nodes per write transaction')
+    args = parser.parse_args()
+
+    summary = Materializer(interval=0, batch_size=args.batch_size).run(tuple(args.algorithms))
+    print(f"Wrote {', '.join(PROPERTIES[a] for a in summary['algorithms'])} for {summary['nodes']} nodes")
+    print('  ' + ', '.join(f'{phase} {seconds} s' for phase, seconds in summary['seconds'].items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,17 @@
 """
 Simple Neo4j connection.
+
+A single driver (and its connection pool) is shared by the whole process.
+The async driver used by the ASGI app is created lazily on its event loop.
 """
-from neo4j import GraphDatabase
+from contextlib import asynccontextmanager, contextmanager
+from neo4j import AsyncGraphDatabase, GraphDatabase
 from dotenv import load_dotenv
+import asyncio
+import atexit
 import os
+import threading
+import time
 
 load_dotenv(override=True)
 
@@ -12,20 +20,180 @@ USER = os.getenv("NEO4J_USER")
 PASSWORD = os.getenv("NEO4J_PASSWORD")
 DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
 
+# Connection pool settings
+POOL_SIZE = int(os.getenv("NEO4J_POOL_SIZE", "50"))
+CONNECTION_LIFETIME = float(os.getenv("NEO4J_CONNECTION_LIFETIME", "3600"))
+ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))
+
+_driver = None
+_driver_lock = threading.Lock()
+_async_driver = None
+_async_slots = None
+
+# Sessions are gated by the pool size so waiting for a connection is measurable
+_slots = threading.BoundedSemaphore(POOL_SIZE)
+_stats_lock = threading.Lock()
+_stats = {
+    'in_use': 0,
+    'peak_in_use': 0,
+    'acquired': 0,
+    'timeouts': 0,
+    'total_wait': 0.0,
+    'max_wait': 0.0,
+}
+
+
+def _driver_config():
+    return {
+        'auth': (USER, PASSWORD),
+        'max_connection_pool_size': POOL_SIZE,
+        'max_connection_lifetime': CONNECTION_LIFETIME,
+        'connection_acquisition_timeout': ACQUISITION_TIMEOUT,
+    }
+
 
 def get_driver():
-    """Get Neo4j driver."""
-    return GraphDatabase.driver(URI, auth=(USER, PASSWORD))
+    """Get the shared Neo4j driver, creating it on first use."""
+    global _driver
+    if _driver is None:
+        with _driver_lock:
+            if _driver is None:
+                _driver = GraphDatabase.driver(URI, **_driver_config())
+    return _driver
+
+
+def get_async_driver():
+    """Get the shared async Neo4j driver, creating it on first use."""
+    global _async_driver, _async_slots
+    if _async_driver is None:
+        _async_driver = AsyncGraphDatabase.driver(URI, **_driver_config())
+        _async_slots = asyncio.Semaphore(POOL_SIZE)
+    return _async_driver
+
+
+def close_driver():
+    """Close the shared driver and its pooled connections."""
+    global _driver
+    with _driver_lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
+
+
+async def close_async_driver():
+    """Close the shared async driver (call on ASGI shutdown)."""
+    global _async_driver
+    if _async_driver is not None:
+        await _async_driver.close()
+        _async_driver = None
+
+
+atexit.register(close_driver)
+
+
+def _timed_out():
+    with _stats_lock:
+        _stats['timeouts'] += 1
+    return TimeoutError(
+        f"Timed out after {ACQUISITION_TIMEOUT}s waiting for a Neo4j connection"
+    )
+
+
+def _acquired(waited):
+    with _stats_lock:
+        _stats['acquired'] += 1
+        _stats['in_use'] += 1
+        _stats['peak_in_use'] = max(_stats['peak_in_use'], _stats['in_use'])
+        _stats['total_wait'] += waited
+        _stats['max_wait'] = max(_stats['max_wait'], waited)
+
+
+def _released():
+    with _stats_lock:
+        _stats['in_use'] -= 1
+
+
+@contextmanager
+def get_session(**kwargs):
+    """Open a session on the shared driver, tracking pool usage."""
+    start = time.perf_counter()
+    if not _slots.acquire(timeout=ACQUISITION_TIMEOUT):
+        raise _timed_out()
+    _acquired(time.perf_counter() - start)
+
+    try:
+        kwargs.setdefault('database', DATABASE)
+        with get_driver().session(**kwargs) as session:
+            yield session
+    finally:
+        _released()
+        _slots.release()
+
+
+@asynccontextmanager
+async def get_async_session(**kwargs):
+    """Open a session on the shared async driver, tracking pool usage."""
+    driver = get_async_driver()
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(_async_slots.acquire(), ACQUISITION_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise _timed_out()
+    _acquired(time.perf_counter() - start)
+
+    try:
+        kwargs.setdefault('database', DATABASE)
+        async with driver.session(**kwargs) as session:
+            yield session
+    finally:
+        _released()
+        _async_slots.release()
+
+
+def pool_stats():
+    """Return connection pool usage counters."""
+    with _stats_lock:
+        stats = dict(_stats)
+
+    # The driver keeps its pooled connections per server address
+    open_connections = 0
+    busy_connections = 0
+    for driver in (_driver, _async_driver):
+        pool = getattr(driver, '_pool', None)
+        for connections in list(getattr(pool, 'connections', {}).values()):
+            for connection in list(connections):
+                open_connections += 1
+                if getattr(connection, 'in_use', False):
+                    busy_connections += 1
+
+    acquired = stats['acquired']
+    return {
+        'maxPoolSize': POOL_SIZE,
+        'connectionLifetime': CONNECTION_LIFETIME,
+        'acquisitionTimeout': ACQUISITION_TIMEOUT,
+        'driverCreated': _driver is not None,
+        'asyncDriverCreated': _async_driver is not None,
+        'inUse': stats['in_use'],
+        'peakInUse': stats['peak_in_use'],
+        'openConnections': open_connections,
+        'idleConnections': open_connections - busy_connections,
+        'acquired': acquired,
+        'timeouts': stats['timeouts'],
+        'avgWaitMs': round(stats['total_wait'] / acquired * 1000, 3) if acquired else 0.0,
+        'maxWaitMs': round(stats['max_wait'] * 1000, 3),
+    }
+
+
+def iter_query(query, params=None, fetch_size=1000):
+    """Run a Cypher query and yield its records as dicts, fetching fetch_size at a time."""
+    with get_session(fetch_size=fetch_size) as session:
+        for record in session.run(query, params or {}):
+            yield record.data()
 
 
 def run_query(query, params=None):
     """Run a Cypher query and return results."""
-    driver = get_driver()
-    with driver.session(database=DATABASE) as session:
-        result = session.run(query, params or {})
-        records = [record.data() for record in result]
-    driver.close()
-    return records
+    return list(iter_query(query, params))
 
 
 def test():
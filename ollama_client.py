@@ -0,0 +1,138 @@
+"""
+Shared Ollama client: one pooled HTTP session, keep_alive control, background
+warm-up of the default model and a short-lived cache of the model list.
+"""
+import os
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+load_dotenv(override=True)
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "60"))
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+# How long Ollama keeps a model loaded after a request (Ollama duration string)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Re-warm the default model this often (seconds); 0 disables warm-up
+OLLAMA_WARMUP_INTERVAL = float(os.getenv("OLLAMA_WARMUP_INTERVAL", "600"))
+OLLAMA_MODELS_TTL = float(os.getenv("OLLAMA_MODELS_TTL", "60"))
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "10"))
+
+
+class OllamaClient:
+    """Thin wrapper over the Ollama HTTP API with connection reuse."""
+
+    def __init__(self, base_url=OLLAMA_URL, timeout=OLLAMA_TIMEOUT, model=OLLAMA_MODEL,
+                 keep_alive=OLLAMA_KEEP_ALIVE, warmup_interval=OLLAMA_WARMUP_INTERVAL,
+                 models_ttl=OLLAMA_MODELS_TTL, pool_size=OLLAMA_POOL_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.model = model
+        self.keep_alive = keep_alive
+        self.warmup_interval = warmup_interval
+        self.models_ttl = models_ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._models = None
+        self._models_at = 0.0
+        self._warmup_thread = None
+        self._stats = {'warmups': 0, 'warmupFailures': 0, 'lastWarmupMs': None,
+                       'modelListHits': 0, 'modelListFetches': 0}
+
+    def url(self, path):
+        return f'{self.base_url}{path}'
+
+    def generate(self, payload, stream=False):
+        """POST /api/generate; with stream=True the body is left unread for iter_lines()."""
+        payload = {'keep_alive': self.keep_alive, **payload, 'stream': stream}
+        return self.session.post(self.url('/api/generate'), json=payload,
+                                 stream=stream, timeout=self.timeout)
+
+    def embed(self, text, model, timeout=10):
+        """Embedding of text, or None if Ollama or the model is unavailable."""
+        try:
+            response = self.session.post(self.url('/api/embed'), json={
+                'model': model,
+                'input': text,
+                'keep_alive': self.keep_alive
+            }, timeout=timeout)
+            if response.status_code == 200:
+                embeddings = response.json().get('embeddings')
+                return embeddings[0] if embeddings else None
+        except requests.exceptions.RequestException:
+            pass
+        return None
+
+    def models(self):
+        """Names of locally available models, cached for models_ttl seconds."""
+        with self._lock:
+            if self._models is not None and time.monotonic() - self._models_at < self.models_ttl:
+                self._stats['modelListHits'] += 1
+                return self._models
+
+        response = self.session.get(self.url('/api/tags'), timeout=5)
+        response.raise_for_status()
+        models = [m['name'] for m in response.json().get('models', [])]
+        with self._lock:
+            self._models = models
+            self._models_at = time.monotonic()
+            self._stats['modelListFetches'] += 1
+        return models
+
+    def warm_up(self, model=None):
+        """Load a model into memory (a generate call without a prompt); True on success."""
+        start = time.perf_counter()
+        try:
+            response = self.session.post(self.url('/api/generate'), json={
+                'model': model or self.model,
+                'keep_alive': self.keep_alive
+            }, timeout=max(self.timeout, 120))
+            ok = response.status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+
+        with self._lock:
+            if ok:
+                self._stats['warmups'] += 1
+                self._stats['lastWarmupMs'] = round((time.perf_counter() - start) * 1000, 1)
+            else:
+                self._stats['warmupFailures'] += 1
+        return ok
+
+    def start_warmup(self):
+        """Warm the default model now and then every warmup_interval seconds (idempotent)."""
+        with self._lock:
+            if self._warmup_thread is not None or self.warmup_interval <= 0:
+                return
+            self._warmup_thread = threading.Thread(target=self._warmup_loop,
+                                                   name='ollama-warmup', daemon=True)
+            self._warmup_thread.start()
+
+    def stats(self):
+        """Describe client configuration and warm-up/model-list activity."""
+        with self._lock:
+            return {
+                'url': self.base_url,
+                'model': self.model,
+                'keepAlive': self.keep_alive,
+                'warmupInterval': self.warmup_interval,
+                'warmupRunning': self._warmup_thread is not None,
+                'modelsTtl': self.models_ttl,
+                **self._stats,
+            }
+
+    def _warmup_loop(self):
+        while True:
+            self.warm_up()
+            time.sleep(self.warmup_interval)
+
+
+ollama = OllamaClient()
@@ -0,0 +1,250 @@
+"""
+Per-request profiling: phase timings, a rolling slow-query log and metrics in
+Prometheus text format.
+
+Each request gets a RequestTimer; routes time their phases (Neo4j fetch,
+extract_graph_data, layout, encoding) and add Neo4j's own server timings from
+the result summary. After the response is built the timer feeds the metrics
+registry, is reported in a Server-Timing header and, if the request took
+longer than SLOW_QUERY_MS, is appended to the slow-query log.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "1000"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+# Longest query text kept in the slow-query log
+SLOW_QUERY_TEXT_LIMIT = 2000
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class RequestTimer:
+    """Wall-clock time of one request, split into named phases."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.server = {}
+        self.query = None
+        self.details = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        """Add time measured elsewhere (e.g. inside a streamed body) to a phase."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_server_timings(self, meta):
+        """Neo4j's resultAvailableAfter/resultConsumedAfter (ms) from a result meta dict."""
+        for key, name in (('resultAvailableAfter', 'available'), ('resultConsumedAfter', 'consumed')):
+            if meta.get(key) is not None:
+                self.server[name] = self.server.get(name, 0.0) + meta[key] / 1000
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """Server-Timing header value (durations in ms)."""
+        entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.phases.items()]
+        entries += [f'neo4j-{name};dur={seconds * 1000:.1f}' for name, seconds in self.server.items()]
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def simplify_plan(plan):
+    """PROFILE plan tree with the fields worth showing (operator, rows, db hits)."""
+    return {
+        'operator': plan.get('operatorType'),
+        'identifiers': plan.get('identifiers', []),
+        'details': plan.get('args', {}).get('Details'),
+        'rows': plan.get('rows', 0),
+        'dbHits': plan.get('dbHits', 0),
+        'children': [simplify_plan(child) for child in plan.get('children', [])]
+    }
+
+
+class SlowQueryLog:
+    """The most recent requests slower than the threshold."""
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, max_entries=SLOW_QUERY_LOG_SIZE):
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=max_entries)
+        self._total = 0
+
+    def record(self, endpoint, timer, status, size):
+        """Log timer's request if it was slow; True if it was logged."""
+        elapsed_ms = timer.elapsed() * 1000
+        if elapsed_ms < self.threshold_ms:
+            return False
+        entry = {
+            'time': time.time(),
+            'endpoint': endpoint,
+            'status': status,
+            'totalMs': round(elapsed_ms, 1),
+            'phasesMs': {name: round(s * 1000, 1) for name, s in timer.phases.items()},
+            'neo4jMs': {name: round(s * 1000, 1) for name, s in timer.server.items()},
+            'bytes': size,
+            'query': timer.query[:SLOW_QUERY_TEXT_LIMIT] if timer.query else None,
+            **timer.details,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self._total += 1
+        return True
+
+    def entries(self):
+        """Logged requests, slowest first."""
+        with self._lock:
+            return sorted(self._entries, key=lambda entry: entry['totalMs'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'thresholdMs': self.threshold_ms, 'maxEntries': self._entries.maxlen,
+                    'entries': len(self._entries), 'total': self._total}
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+class Metrics:
+    """Request counters, duration histograms and phase totals per endpoint."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests = {}   # (endpoint, status) -> count
+        self._durations = {}  # endpoint -> [bucket counts..., sum, count]
+        self._phases = {}     # (endpoint, phase) -> seconds
+        self._server = {}     # (endpoint, stage) -> seconds
+        self._bytes = {}      # endpoint -> bytes
+        self._slow = 0
+
+    def observe(self, endpoint, status, timer, size=None, slow=False):
+        elapsed = timer.elapsed()
+        with self._lock:
+            key = (endpoint, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            histogram = self._durations.setdefault(endpoint, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if elapsed <= bound:
+                    histogram[i] += 1
+            histogram[-2] += elapsed
+            histogram[-1] += 1
+
+            for name, seconds in timer.phases.items():
+                self._phases[(endpoint, name)] = self._phases.get((endpoint, name), 0.0) + seconds
+            for name, seconds in timer.server.items():
+                self._server[(endpoint, name)] = self._server.get((endpoint, name), 0.0) + seconds
+            if size is not None:
+                self._bytes[endpoint] = self._bytes.get(endpoint, 0) + size
+            if slow:
+                self._slow += 1
+
+    def render(self, gauges=None):
+        """
+        All metrics in Prometheus text exposition format.
+
+        gauges maps metric name -> (help text, value) for point-in-time values
+        owned by other components (caches, connection pool, snapshot).
+        """
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            family('app_requests_total', 'counter', 'Requests handled, by endpoint and status.')
+            for (endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f'app_requests_total{_labels(endpoint=endpoint, status=status)} {count}')
+
+            family('app_request_duration_seconds', 'histogram', 'Request wall-clock time.')
+            for endpoint, histogram in sorted(self._durations.items()):
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append('app_request_duration_seconds_bucket'
+                                 f'{_labels(endpoint=endpoint, le=bound)} {count}')
+                lines.append('app_request_duration_seconds_bucket'
+                             f'{_labels(endpoint=endpoint, le="+Inf")} {histogram[-1]}')
+                lines.append(f'app_request_duration_seconds_sum{_labels(endpoint=endpoint)} {histogram[-2]:.6f}')
+                lines.append(f'app_request_duration_seconds_count{_labels(endpoint=endpoint)} {histogram[-1]}')
+
+            family('app_phase_seconds_total', 'counter', 'Time spent in each request phase.')
+            for (endpoint, phase), seconds in sorted(self._phases.items()):
+                lines.append(f'app_phase_seconds_total{_labels(endpoint=endpoint, phase=phase)} {seconds:.6f}')
+
+            family('app_neo4j_server_seconds_total', 'counter',
+                   'Neo4j-reported time until results were available / consumed.')
+            for (endpoint, stage), seconds in sorted(self._server.items()):
+                lines.append(f'app_neo4j_server_seconds_total{_labels(endpoint=endpoint, stage=stage)} {seconds:.6f}')
+
+            family('app_response_bytes_total', 'counter', 'Response body bytes (non-streamed responses).')
+            for endpoint, size in sorted(self._bytes.items()):
+                lines.append(f'app_response_bytes_total{_labels(endpoint=endpoint)} {size}')
+
+            family('app_slow_queries_total', 'counter', 'Requests slower than the slow-query threshold.')
+            lines.append(f'app_slow_queries_total {self._slow}')
+
+        for name, (help_text, value) in (gauges or {}).items():
+            family(name, 'gauge', help_text)
+            lines.append(f'{name} {float(value):g}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+slow_queries = SlowQueryLog()
+
+
+def finish_request(endpoint, timer, status, size):
+    """Record a finished request in the metrics and (if slow) the slow-query log."""
+    slow = timer.query is not None and slow_queries.record(endpoint, timer, status, size)
+    metrics.observe(endpoint, status, timer, size, slow)
+
+
+def recorded_stream(chunks, endpoint, timer, status):
+    """
+    Pass a streamed response body through and record the request once it has
+    been sent (or the client went away), with the total time and bytes.
+    """
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        # Close the wrapped body too, so it releases its session if the client left early
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        finish_request(endpoint, timer, status, size)
+
+
+async def recorded_async_stream(chunks, endpoint, timer, status):
+    """recorded_stream for an async body."""
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        if hasattr(chunks, 'aclose'):
+            await chunks.aclose()
+        finish_request(endpoint, timer, status, size)
@@ -0,0 +1,134 @@
+"""
+LRU/TTL cache of /query responses keyed by normalized Cypher and parameters.
+
+Only read-only queries are admitted (as classified by the Neo4j planner in the
+result summary) and any write that runs through the app clears the cache.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))
+
+# Summary query types that are safe to cache ('r' = read only)
+READ_ONLY_QUERY_TYPES = {'r'}
+
+_TOKEN = re.compile(r"""
+    (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<quoted>`[^`]*`)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<space>\s+)
+  | (?P<other>[^'"`/\s]+|.)
+""", re.VERBOSE | re.DOTALL)
+
+
+def normalize_cypher(cypher):
+    """
+    Collapse whitespace and drop comments outside string and backtick literals.
+
+    Case is left alone: a keyword-looking word may be a label, type, property
+    key, parameter or alias (:Order, n.count, $end, AS Count), and those are
+    case-sensitive.
+    """
+    parts = []
+    for match in _TOKEN.finditer(cypher.strip().rstrip(';')):
+        kind = match.lastgroup
+        if kind not in ('space', 'comment'):
+            parts.append(match.group())
+        elif parts and parts[-1] != ' ':
+            parts.append(' ')
+    return ''.join(parts).strip()
+
+
+def cache_key(cypher, params=None, options=None):
+    """Build the cache key for a query, its parameters and response options."""
+    return (
+        normalize_cypher(cypher),
+        json.dumps(params or {}, sort_keys=True, default=str),
+        json.dumps(options or {}, sort_keys=True, default=str),
+    )
+
+
+class QueryCache:
+    """Byte-bounded LRU cache with per-entry expiry."""
+
+    def __init__(self, max_bytes=QUERY_CACHE_MAX_BYTES, ttl=QUERY_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self.generation = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0,
+                       'expired': 0, 'invalidations': 0, 'rejected': 0}
+
+    def get(self, key):
+        """Return the cached value or None, refreshing its LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            if entry[2] < time.monotonic():
+                self._drop(key)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def put(self, key, value, size, generation=None):
+        """
+        Store value, evicting least recently used entries to fit size bytes.
+
+        If generation is given and an invalidation happened since it was read,
+        the value may predate a write and is not stored.
+        """
+        with self._lock:
+            if size > self.max_bytes or (generation is not None and generation != self.generation):
+                self._stats['rejected'] += 1
+                return
+            if key in self._entries:
+                self._drop(key)
+            while self._entries and self._bytes + size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self._bytes += size
+
+    def invalidate(self):
+        """Remove every entry (called whenever a write goes through the app)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.generation += 1
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        """Describe cache size and effectiveness."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'maxBytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hitRate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                **self._stats,
+            }
+
+    def _drop(self, key):
+        value, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+query_cache = QueryCache()
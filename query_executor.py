@@ -0,0 +1,125 @@
+"""
+Concurrent execution of independent read queries.
+
+Endpoints that need several unrelated reads (schema introspection, the
+snapshot change marker and delta) hand them to the executor as a batch. Each
+read runs on its own pooled session on a worker thread, so a batch costs
+about one round trip (its slowest query) instead of one per query. Every
+query carries a transaction timeout, so the server aborts it if it runs over.
+The whole batch is bounded by the same timeout, and if one read fails the
+reads that have not started yet are cancelled and the error is raised.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+from neo4j import READ_ACCESS, Query
+
+from neo4j_connection import get_session
+
+load_dotenv(override=True)
+
+QUERY_PARALLELISM = int(os.getenv("QUERY_PARALLELISM", "8"))
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "30"))
+# Extra wait for results beyond the server-side timeout (network, session setup)
+TIMEOUT_GRACE = 5.0
+
+
+def records(result):
+    """Default handler: every record as a dict."""
+    return [record.data() for record in result]
+
+
+def first_column(result):
+    return [record[0] for record in result]
+
+
+def single_record(result):
+    """Handler returning the single record as a dict (None if there is none)."""
+    record = result.single()
+    return record.data() if record is not None else None
+
+
+def single_value(key):
+    """Handler returning one column of the single record (None if there is none)."""
+    def handler(result):
+        record = result.single()
+        return record[key] if record is not None else None
+    return handler
+
+
+# query text, parameters and a handler that turns the Result into a value (inside the session)
+Read = namedtuple('Read', 'query params handler', defaults=(None, records))
+
+
+class QueryExecutor:
+    """Thread pool that runs batches of independent reads on separate sessions."""
+
+    def __init__(self, max_workers=QUERY_PARALLELISM, timeout=QUERY_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='neo4j-read')
+        self._lock = threading.Lock()
+        self._stats = {'batches': 0, 'queries': 0, 'failures': 0, 'timeouts': 0, 'cancelled': 0,
+                       'wall': 0.0, 'serial': 0.0}
+
+    def _run_one(self, read, timeout):
+        start = time.perf_counter()
+        with get_session(default_access_mode=READ_ACCESS) as session:
+            value = read.handler(session.run(Query(read.query, timeout=timeout), read.params or {}))
+        return value, time.perf_counter() - start
+
+    def run(self, reads, timeout=None):
+        """
+        Run reads concurrently and return their handlers' values in the same order.
+
+        Raises the first error from any read, or TimeoutError if the batch takes
+        longer than timeout; reads still queued at that point are cancelled.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        futures = [self._pool.submit(self._run_one, read, timeout) for read in reads]
+        done, pending = wait(futures, timeout=timeout + TIMEOUT_GRACE, return_when=FIRST_EXCEPTION)
+
+        failed = any(future.exception() is not None for future in done)
+        cancelled = sum(future.cancel() for future in pending)
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['queries'] += len(reads)
+            self._stats['cancelled'] += cancelled
+            self._stats['wall'] += time.perf_counter() - start
+            self._stats['serial'] += sum(future.result()[1] for future in done if future.exception() is None)
+            if failed:
+                self._stats['failures'] += 1
+            elif pending:
+                self._stats['timeouts'] += 1
+
+        if failed:
+            # The error of the earliest read in the batch that failed
+            raise next(future.exception() for future in futures
+                       if future in done and future.exception() is not None)
+        if pending:
+            raise TimeoutError(f'{len(pending)} of {len(reads)} queries did not finish within {timeout}s')
+        return [future.result()[0] for future in futures]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            'maxWorkers': self.max_workers,
+            'timeout': self.timeout,
+            'batches': stats['batches'],
+            'queries': stats['queries'],
+            'failures': stats['failures'],
+            'timeouts': stats['timeouts'],
+            'cancelled': stats['cancelled'],
+            'wallMs': round(stats['wall'] * 1000, 1),
+            # Time the same reads would have taken one after another
+            'serialMs': round(stats['serial'] * 1000, 1),
+        }
+
+
+query_executor = QueryExecutor()
@@ -0,0 +1,219 @@
+"""
+In-memory schema context for /schema and /ai/chat.
+
+Labels, relationship types, counts, property keys per label (with types
+inferred from a sample of nodes) and SymbolModel kinds are introspected once
+and then refreshed by a background thread every SCHEMA_REFRESH_INTERVAL
+seconds, so requests never wait on schema queries after the first load.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from query_executor import query_executor, Read, first_column, single_value
+
+load_dotenv(override=True)
+
+SCHEMA_REFRESH_INTERVAL = float(os.getenv("SCHEMA_REFRESH_INTERVAL", "300"))
+SCHEMA_SAMPLE_SIZE = int(os.getenv("SCHEMA_SAMPLE_SIZE", "100"))
+
+
+def quote(name):
+    """Backtick-quote a label or relationship type for use in Cypher."""
+    return '`' + name.replace('`', '``') + '`'
+
+
+def value_type(value):
+    """Cypher-style type name of a property value."""
+    if isinstance(value, bool):
+        return 'Boolean'
+    if isinstance(value, int):
+        return 'Integer'
+    if isinstance(value, float):
+        return 'Float'
+    if isinstance(value, str):
+        return 'String'
+    if isinstance(value, (list, tuple)):
+        inner = sorted({value_type(item) for item in value})
+        return f"List<{'|'.join(inner) or 'Any'}>"
+    return type(value).__name__
+
+
+def infer_properties(samples):
+    """
+    Summarize sampled property maps as {key: {'types': [...], 'coverage': f}}.
+
+    coverage is the fraction of sampled nodes that have the key.
+    """
+    types = {}
+    present = Counter()
+    for props in samples:
+        for key, value in props.items():
+            present[key] += 1
+            types.setdefault(key, set()).add(value_type(value))
+    return {
+        key: {
+            'types': sorted(types[key]),
+            'coverage': round(present[key] / len(samples), 3)
+        }
+        for key in sorted(types)
+    }
+
+
+def introspect(sample_size=SCHEMA_SAMPLE_SIZE, executor=query_executor):
+    """
+    Read the full schema description from the database.
+
+    The queries run as two concurrent batches: labels, types and SymbolModel
+    kinds/names first, then a count and property sample per label and a count
+    per relationship type.
+    """
+    labels, relationships, kinds, sample_names = executor.run([
+        Read("CALL db.labels()", handler=first_column),
+        Read("CALL db.relationshipTypes()", handler=first_column),
+        Read("MATCH (n:SymbolModel) RETURN DISTINCT n.kind as kind", handler=first_column),
+        Read("MATCH (n:SymbolModel) RETURN n.name as name LIMIT 5", handler=first_column),
+    ])
+    # DISTINCT comes back in no particular order
+    kinds = sorted(kind for kind in kinds if kind)
+    if 'SymbolModel' not in labels:
+        kinds, sample_names = [], []
+
+    # Label and type counts are answered from the count store
+    reads = []
+    for label in labels:
+        reads.append(Read(f"MATCH (n:{quote(label)}) RETURN count(n) AS count", handler=single_value('count')))
+        reads.append(Read(f"MATCH (n:{quote(label)}) RETURN properties(n) AS props LIMIT $limit",
+                          {'limit': sample_size}, first_column))
+    for rel_type in relationships:
+        reads.append(Read(f"MATCH ()-[r:{quote(rel_type)}]->() RETURN count(r) AS count",
+                          handler=single_value('count')))
+    values = executor.run(reads)
+
+    label_counts = {}
+    properties = {}
+    for i, label in enumerate(labels):
+        label_counts[label] = values[2 * i]
+        samples = values[2 * i + 1]
+        properties[label] = infer_properties(samples) if samples else {}
+    relationship_counts = dict(zip(relationships, values[2 * len(labels):]))
+
+    schema = {
+        'labels': labels,
+        'relationships': relationships,
+        'symbolProperties': list(properties.get('SymbolModel', {})),
+        'kinds': kinds,
+        'sampleNames': sample_names,
+        'labelCounts': label_counts,
+        'relationshipCounts': relationship_counts,
+        'properties': properties,
+    }
+    schema['version'] = schema_version(schema)
+    return schema
+
+
+def schema_version(schema):
+    """
+    Short hash of the schema's shape: labels, relationship types, kinds and
+    property keys with their types.
+
+    Counts change on every write and coverage depends on which nodes were
+    sampled, so neither is part of it; nor is the order the database listed
+    things in.
+    """
+    shape = {
+        'labels': sorted(schema['labels']),
+        'relationships': sorted(schema['relationships']),
+        'kinds': sorted(schema['kinds']),
+        'properties': {label: {key: info['types'] for key, info in keys.items()}
+                       for label, keys in schema['properties'].items()},
+    }
+    return hashlib.sha1(json.dumps(shape, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+class SchemaCache:
+    """Holds the latest schema description and refreshes it in the background."""
+
+    def __init__(self, interval=SCHEMA_REFRESH_INTERVAL, sample_size=SCHEMA_SAMPLE_SIZE):
+        self.interval = interval
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._schema = None
+        self._loaded_at = 0.0
+        self._error = None
+        self._thread = None
+        self._stats = {'refreshes': 0, 'failures': 0, 'hits': 0}
+
+    def get(self):
+        """Return the cached schema, loading it (and starting refreshes) on first use."""
+        schema = self._schema
+        if schema is None:
+            with self._load_lock:
+                if self._schema is None:
+                    self._load()
+            schema = self._schema
+        else:
+            with self._lock:
+                self._stats['hits'] += 1
+        self._start_refresher()
+        return schema
+
+    def refresh(self):
+        """Reload the schema now; on failure the previous schema is kept."""
+        with self._load_lock:
+            self._load()
+        return self._schema
+
+    def stats(self):
+        """Describe the cached schema and refresh state."""
+        with self._lock:
+            schema = self._schema
+            return {
+                'loaded': schema is not None,
+                'version': schema['version'] if schema else None,
+                'ageSeconds': round(time.monotonic() - self._loaded_at, 1) if schema else None,
+                'interval': self.interval,
+                'sampleSize': self.sample_size,
+                'lastError': self._error,
+                **self._stats,
+            }
+
+    def _load(self):
+        # Introspection runs outside _lock so readers keep getting the old schema
+        try:
+            schema = introspect(self.sample_size)
+        except Exception as e:
+            with self._lock:
+                self._error = str(e)
+                self._stats['failures'] += 1
+            if self._schema is None:
+                raise
+            return
+
+        with self._lock:
+            self._schema = schema
+            self._loaded_at = time.monotonic()
+            self._error = None
+            self._stats['refreshes'] += 1
+
+    def _start_refresher(self):
+        with self._lock:
+            if self._thread is not None or self.interval <= 0:
+                return
+            self._thread = threading.Thread(target=self._refresh_loop,
+                                            name='schema-refresh', daemon=True)
+            self._thread.start()
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.refresh()
+
+
+schema_cache = SchemaCache()
@@ -0,0 +1,294 @@
+"""
+In-process full-text and fuzzy search over SymbolModel names and documentation.
+
+The index is built in one pass over the SymbolModel nodes (name, kind and the
+parsed documentation JSON) and memoized per analytics snapshot version, so it
+follows the graph as the snapshot refreshes. Names and documentation are split
+into lower-case terms (camelCase and snake_case identifiers are broken up) and
+kept in an inverted index whose postings carry precomputed BM25 weights; a
+query just sums the postings of its terms with NumPy. Query terms that are not
+in the vocabulary are matched fuzzily through a trigram index over it, and the
+last term also matches as a prefix so results follow the user's typing.
+Autocomplete bisects a sorted list of name suffixes taken at word boundaries.
+"""
+import bisect
+import json
+import os
+import re
+import time
+from collections import Counter
+
+import numpy as np
+from dotenv import load_dotenv
+
+from neo4j_connection import iter_query
+from graph_analytics import top_k
+from snapshot_cache import snapshot_cache
+
+load_dotenv(override=True)
+
+SEARCH_FUZZY_THRESHOLD = float(os.getenv("SEARCH_FUZZY_THRESHOLD", "0.4"))
+SEARCH_MAX_EXPANSIONS = int(os.getenv("SEARCH_MAX_EXPANSIONS", "10"))
+SEARCH_FETCH_SIZE = 5000
+# BM25 parameters; name terms count NAME_WEIGHT times towards tf and length
+BM25_K1 = 1.2
+BM25_B = 0.75
+NAME_WEIGHT = 3.0
+# Prefix matches of the last query term score at this fraction of an exact term
+PREFIX_WEIGHT = 0.5
+# Autocomplete looks at no more than this many suffix entries per prefix
+SUGGEST_SCAN_LIMIT = 5000
+
+SYMBOL_QUERY = """
+    MATCH (n:SymbolModel)
+    RETURN elementId(n) AS id, n.name AS name, n.kind AS kind, n.documentation AS documentation
+"""
+
+WORD = re.compile(r'[A-Za-z0-9]+')
+WORD_PART = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+
+
+def terms(text):
+    """Lower-case terms of text; identifiers also yield their camelCase parts."""
+    text = text or ''
+    found = [part.lower() for part in WORD_PART.findall(text)]
+    # Words made of several parts (parseHTTPHeader, utf8) are kept whole as well
+    found += [word.lower() for word in WORD.findall(text)
+              if not (word.isdigit() or word.isalpha() and (word.islower() or word.isupper() or word.istitle()))]
+    return found
+
+
+def documentation_text(value):
+    """All string values of a documentation property (JSON), or the raw text if it isn't JSON."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+
+    strings = []
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            strings.append(value)
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return ' '.join(reversed(strings))
+
+
+def trigrams(term):
+    padded = f' {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def boundaries(name):
+    """Offsets in name where a word part starts (HttpServer -> 0, 4)."""
+    return [match.start() for match in WORD_PART.finditer(name)]
+
+
+class SearchIndex:
+    """BM25 inverted index, trigram vocabulary index and autocomplete list over symbols."""
+
+    def __init__(self, symbols, popularity=None):
+        """
+        symbols yields dicts with id, name, kind and documentation; popularity
+        maps element id -> a number used to rank autocomplete suggestions.
+        """
+        start = time.perf_counter()
+        popularity = popularity or {}
+        self.ids = []
+        self.names = []
+        self.kinds = []
+        self.by_name = {}
+        self.term_ids = {}
+        posting_terms = []
+        posting_docs = []
+        posting_counts = []
+        lengths = []
+        suggestions = []
+
+        for symbol in symbols:
+            doc = len(self.ids)
+            name = symbol.get('name') or ''
+            self.ids.append(symbol['id'])
+            self.names.append(name)
+            self.kinds.append(symbol.get('kind'))
+            self.by_name.setdefault(name.lower(), []).append(doc)
+
+            name_terms = terms(name)
+            doc_terms = terms(documentation_text(symbol.get('documentation')))
+            tf = Counter(doc_terms)
+            for term in name_terms:
+                tf[term] += NAME_WEIGHT
+            lengths.append(NAME_WEIGHT * len(name_terms) + len(doc_terms))
+            for term, count in tf.items():
+                posting_terms.append(self.term_ids.setdefault(term, len(self.term_ids)))
+                posting_docs.append(doc)
+                posting_counts.append(count)
+
+            lowered = name.lower()
+            suggestions.extend((lowered[offset:], doc, offset == 0) for offset in boundaries(name))
+
+        n = len(self.ids)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(float(lengths.mean()) if n else 0.0, 1.0))
+
+        # Postings are grouped by term like a CSR adjacency: term t's documents are
+        # docs[offsets[t]:offsets[t + 1]], with their full BM25 weight (idf included)
+        posting_terms = np.asarray(posting_terms, dtype=np.int32)
+        order = np.argsort(posting_terms, kind='stable')
+        posting_terms = posting_terms[order]
+        self.docs = np.asarray(posting_docs, dtype=np.int32)[order]
+        tf = np.asarray(posting_counts, dtype=np.float32)[order]
+        self.document_frequency = np.bincount(posting_terms, minlength=len(self.term_ids))
+        self.offsets = np.zeros(len(self.term_ids) + 1, dtype=np.int64)
+        np.cumsum(self.document_frequency, out=self.offsets[1:])
+        idf = np.log(1 + (n - self.document_frequency + 0.5) / (self.document_frequency + 0.5))
+        self.weights = (idf[posting_terms] * tf * (BM25_K1 + 1) / (tf + norm[self.docs])).astype(np.float32)
+
+        self.vocabulary = sorted(self.term_ids)
+        self.trigram_terms = {}
+        for i, term in enumerate(self.vocabulary):
+            for gram in trigrams(term):
+                self.trigram_terms.setdefault(gram, []).append(i)
+
+        suggestions.sort()
+        self.suggest_keys = [key for key, _, _ in suggestions]
+        self.suggest_docs = np.array([doc for _, doc, _ in suggestions], dtype=np.int32)
+        self.suggest_whole = np.array([whole for _, _, whole in suggestions], dtype=bool)
+        self.name_lengths = np.array([len(name) for name in self.names], dtype=np.int32)
+        self.popularity = np.array([popularity.get(element_id, 0) for element_id in self.ids], dtype=np.float64)
+        self.kind_names = sorted({kind for kind in self.kinds if kind})
+        self.kind_codes = np.array([self.kind_names.index(kind) if kind else -1 for kind in self.kinds],
+                                   dtype=np.int16)
+        self.build_seconds = time.perf_counter() - start
+
+    @property
+    def num_documents(self):
+        return len(self.ids)
+
+    def fuzzy_terms(self, term):
+        """Vocabulary terms whose trigram Jaccard similarity to term passes the threshold."""
+        grams = trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigram_terms.get(gram, ()))
+        matches = []
+        for i, count in shared.items():
+            candidate = self.vocabulary[i]
+            similarity = count / (len(grams) + len(trigrams(candidate)) - count)
+            if similarity >= SEARCH_FUZZY_THRESHOLD:
+                matches.append((similarity, candidate))
+        matches.sort(reverse=True)
+        return [(candidate, similarity) for similarity, candidate in matches[:SEARCH_MAX_EXPANSIONS]]
+
+    def prefix_terms(self, term):
+        """Most common vocabulary terms that start with term (term itself excluded)."""
+        start = bisect.bisect_right(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + '\uffff')
+        candidates = self.vocabulary[start:end]
+        if len(candidates) > SEARCH_MAX_EXPANSIONS:
+            candidates = sorted(candidates, key=lambda t: self.document_frequency[self.term_ids[t]],
+                                reverse=True)[:SEARCH_MAX_EXPANSIONS]
+        return [(candidate, PREFIX_WEIGHT) for candidate in candidates]
+
+    def expand(self, term, prefix=False):
+        """(vocabulary term, weight) pairs a query term matches."""
+        expansions = [(term, 1.0)] if term in self.term_ids else []
+        if prefix:
+            expansions += self.prefix_terms(term)
+        if not expansions:
+            expansions = self.fuzzy_terms(term)
+        return expansions
+
+    def scores(self, query, prefix=True):
+        """
+        BM25 score of every document for query, plus the terms that matched.
+
+        With prefix, the last term also matches longer vocabulary terms unless
+        the query ends in whitespace (the user has finished typing it).
+        """
+        scores = np.zeros(self.num_documents, dtype=np.float32)
+        query_terms = list(dict.fromkeys(terms(query)))
+        matched = {}
+        for position, term in enumerate(query_terms):
+            is_last = position == len(query_terms) - 1
+            for vocabulary_term, weight in self.expand(term, prefix and is_last and not query[-1:].isspace()):
+                start, end = self.offsets[self.term_ids[vocabulary_term]:][:2]
+                scores[self.docs[start:end]] += weight * self.weights[start:end]
+                matched[vocabulary_term] = round(weight, 3)
+
+        # A symbol named exactly like the query goes first
+        exact = self.by_name.get(query.strip().lower())
+        if exact and scores.any():
+            scores[exact] += scores.max()
+        return scores, matched
+
+    def search(self, query, limit=20, kinds=None, prefix=True):
+        """
+        Ranked matches for query as (dense ids, scores, total matches, matched terms).
+
+        kinds restricts results to SymbolModel kinds (class, function, ...).
+        """
+        scores, matched = self.scores(query, prefix)
+        if kinds:
+            codes = [self.kind_names.index(kind) for kind in kinds if kind in self.kind_names]
+            scores[~np.isin(self.kind_codes, codes)] = 0
+        hits = np.flatnonzero(scores > 0)
+        ranked = hits[top_k(scores[hits], limit)]
+        return ranked, scores[ranked], len(hits), matched
+
+    def results(self, query, limit=20, kinds=None, prefix=True):
+        """search() as JSON-ready dicts."""
+        ranked, scores, total, matched = self.search(query, limit, kinds, prefix)
+        return {
+            'results': [
+                {'id': self.ids[i], 'name': self.names[i], 'kind': self.kinds[i],
+                 'score': round(float(score), 4)}
+                for i, score in zip(ranked.tolist(), scores.tolist())
+            ],
+            'total': total,
+            'terms': matched
+        }
+
+    def suggest(self, prefix, limit=10):
+        """Symbols with a word in their name starting with prefix, most referenced first."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.suggest_keys, prefix)
+        end = bisect.bisect_left(self.suggest_keys, prefix + '\uffff', start,
+                                 min(start + SUGGEST_SCAN_LIMIT, len(self.suggest_keys)))
+        docs = self.suggest_docs[start:end]
+        # Whole-name prefix matches first, then popularity, then shorter names
+        order = np.lexsort((self.name_lengths[docs], -self.popularity[docs], ~self.suggest_whole[start:end]))
+        docs = docs[order]
+        _, first = np.unique(docs, return_index=True)
+        docs = docs[np.sort(first)][:limit]
+        return [{'id': self.ids[i], 'name': self.names[i], 'kind': self.kinds[i]} for i in docs.tolist()]
+
+    def stats(self):
+        return {
+            'documents': self.num_documents,
+            'terms': len(self.vocabulary),
+            'postings': len(self.docs),
+            'trigrams': len(self.trigram_terms),
+            'suggestions': len(self.suggest_keys),
+            'kinds': self.kind_names,
+            'buildMs': round(self.build_seconds * 1000, 1),
+        }
+
+
+def build_index(snapshot):
+    """SearchIndex over the SymbolModel nodes, with popularity from the snapshot's in-degrees."""
+    in_degree = snapshot.in_degree()
+    popularity = {element_id: int(in_degree[i]) for element_id, i in snapshot.index.items()}
+    return SearchIndex(iter_query(SYMBOL_QUERY, fetch_size=SEARCH_FETCH_SIZE), popularity)
+
+
+def search_index():
+    """The search index for the current snapshot version, built on first use."""
+    return snapshot_cache.memoize(('search-index',), build_index)
@@ -0,0 +1,122 @@
+"""
+Node/edge serialization shared by every route that returns graph data.
+
+Nodes can be projected down to a few display properties (the full node is then
+fetched lazily through /node/<id>), and payloads are encoded with orjson or
+msgpack when those packages are installed.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Enough for the graph view: caption, colour by kind and the label badges
+COMPACT_PROPERTIES = ('name', 'title', 'kind')
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+
+def resolve_projection(projection):
+    """
+    Turn a request's projection option into property keys to keep.
+
+    None or 'full' keeps everything, 'compact' keeps COMPACT_PROPERTIES and a
+    list of property names keeps exactly those keys. Anything else raises
+    ValueError.
+    """
+    if projection is None or projection == 'full':
+        return None
+    if projection == 'compact':
+        return COMPACT_PROPERTIES
+    if isinstance(projection, (list, tuple)):
+        if not all(isinstance(key, str) for key in projection):
+            raise ValueError('projection must be "compact", "full" or a list of property names')
+        return tuple(projection)
+    raise ValueError(f'Unknown projection: {projection}')
+
+
+def _pick(entity, keys):
+    # Neo4j never stores null properties, so a None from get() is a missing key
+    picked = {}
+    for key in keys:
+        value = entity.get(key)
+        if value is not None:
+            picked[key] = value
+    return picked
+
+
+def project(entity, keys=None):
+    """Properties of a node or relationship, limited to keys if given."""
+    if keys is None:
+        # items() is the entity's own dict view, so this copies in C rather than key by key
+        return dict(entity.items())
+    return _pick(entity, keys)
+
+
+def serialize_node(node, keys=None):
+    """
+    Node as the dict the UI renders.
+
+    Its caption is the name or title property, else its first label ('Node'
+    only for a node without labels).
+    """
+    labels = list(node.labels)
+    return {
+        'id': node.element_id,
+        'label': node.get('name', node.get('title', labels[0] if labels else 'Node')),
+        'labels': labels,
+        'properties': project(node, keys)
+    }
+
+
+def serialize_edge(rel, keys=None, with_id=False):
+    """Relationship as the dict the UI renders."""
+    edge = {
+        'from': rel.start_node.element_id,
+        'to': rel.end_node.element_id,
+        'label': rel.type,
+        'properties': project(rel, keys)
+    }
+    if with_id:
+        edge['id'] = rel.element_id
+    return edge
+
+
+def _default(value):
+    # Neo4j temporal types, numpy scalars and anything else orjson/json can't handle
+    if hasattr(value, 'iso_format'):
+        return value.iso_format()
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def dumps(payload):
+    """Encode payload as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+
+def negotiate_format(requested=None, accept=''):
+    """Pick 'msgpack' when asked for (and available), otherwise 'json'."""
+    wants_msgpack = requested == 'msgpack' or MSGPACK_MIMETYPE in (accept or '')
+    return 'msgpack' if wants_msgpack and msgpack is not None else 'json'
+
+
+def encode(payload, fmt='json'):
+    """Return (body, mimetype) for payload in the negotiated format."""
+    if fmt == 'msgpack':
+        return msgpack.packb(payload, default=_default), MSGPACK_MIMETYPE
+    return dumps(payload), JSON_MIMETYPE
@@ -0,0 +1,234 @@
+"""
+Server-side cache of the graph snapshot used by the analytics endpoints.
+
+The snapshot is reused until its TTL expires. After that a change marker
+(node/relationship counts and highest internal ids) is read: if nothing changed
+the snapshot is kept, if the graph only grew the new nodes and relationships are
+appended, otherwise it is reloaded in full. Algorithm results are memoized per
+snapshot version.
+
+The marker is a heuristic, not a change log, and it misses some changes:
+
+- Property and label edits leave it unchanged. The topology is still right,
+  but anything memoized from node data (the search index's names and
+  documentation) stays stale.
+- A delete followed by a create that reuses the deleted internal id can leave
+  both the counts and the highest ids as they were.
+
+Such changes are picked up by the full reload every SNAPSHOT_MAX_AGE seconds,
+or at once through invalidate() (POST /snapshot/invalidate). Reading the
+marker is not free either: the counts come from the count store, but
+max(id(...)) scans every node and relationship. So it is read at most once
+per TTL.
+"""
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from neo4j_connection import get_session
+from graph_analytics import load_snapshot, extend_snapshot
+from query_executor import query_executor, Read, single_record
+
+load_dotenv(override=True)
+
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", "60"))
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", "3600"))
+
+
+def read_marker(executor=query_executor):
+    """
+    Read the change marker: counts and highest internal ids (two concurrent
+    queries, each a scan of all nodes or relationships for the max id).
+    """
+    nodes, relationships = executor.run([
+        Read("""
+            MATCH (n)
+            RETURN count(n) AS nodes, max(id(n)) AS maxNodeId
+        """, handler=single_record),
+        Read("""
+            MATCH ()-[r]->()
+            RETURN count(r) AS relationships, max(id(r)) AS maxRelId
+        """, handler=single_record),
+    ])
+    return {'nodes': nodes['nodes'], 'maxNodeId': nodes['maxNodeId'],
+            'relationships': relationships['relationships'], 'maxRelId': relationships['maxRelId']}
+
+
+def fetch_delta(old, new, executor=query_executor):
+    """Fetch nodes and relationships created between two markers (two concurrent queries)."""
+    nodes, edges = executor.run([
+        Read("""
+            MATCH (n)
+            WHERE id(n) > $after AND id(n) <= $upto
+            RETURN elementId(n) AS id, labels(n)[0] AS label
+        """, {'after': _floor(old['maxNodeId']), 'upto': new['maxNodeId']},
+             lambda result: [(record['id'], record['label']) for record in result]),
+        Read("""
+            MATCH (a)-[r]->(b)
+            WHERE id(r) > $after AND id(r) <= $upto AND id(a) <= $max_node AND id(b) <= $max_node
+            RETURN elementId(a) AS source, elementId(b) AS target, type(r) AS type
+        """, {'after': _floor(old['maxRelId']), 'upto': new['maxRelId'], 'max_node': new['maxNodeId']},
+             lambda result: [(record['source'], record['target'], record['type']) for record in result]),
+    ])
+    return nodes, edges
+
+
+def _floor(max_id):
+    return -1 if max_id is None else max_id
+
+
+class SnapshotCache:
+    """Holds the current GraphSnapshot and results computed from it."""
+
+    def __init__(self, ttl=SNAPSHOT_TTL, max_age=SNAPSHOT_MAX_AGE):
+        self.ttl = ttl
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._snapshot = None
+        self._marker = None
+        self._version = 0
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        # Most recently read marker and when, whether or not a snapshot was loaded with it
+        self._latest = (None, 0.0)
+        self._results = {}
+        self._stats = {'full_loads': 0, 'delta_loads': 0, 'unchanged': 0,
+                       'hits': 0, 'misses': 0}
+
+    def get(self):
+        """Return the current snapshot, refreshing it if the TTL has expired."""
+        return self.current()[0]
+
+    def current(self):
+        """Return (snapshot, the change marker it was loaded at), refreshing as get() does."""
+        snapshot, marker, _ = self._current()
+        return snapshot, marker
+
+    def _current(self):
+        # Snapshot, marker and version read under one lock, so they always belong together
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot is None or now - self._loaded_at > self.max_age:
+                self._full_load()
+            elif now - self._checked_at > self.ttl:
+                self._refresh()
+            return self._snapshot, self._marker, self._version
+
+    def marker(self):
+        """
+        The graph's change marker, at most TTL seconds old.
+
+        Unlike get() this never loads or extends the snapshot; an expired
+        marker is simply read again.
+        """
+        with self._lock:
+            marker, read_at = self._latest
+            if marker is not None and time.monotonic() - read_at <= self.ttl:
+                return marker
+        marker = read_marker()
+        with self._lock:
+            self._latest = (marker, time.monotonic())
+        return marker
+
+    def peek(self):
+        """Return the snapshot as it is (None if none is loaded), without refreshing it."""
+        with self._lock:
+            return self._snapshot
+
+    def invalidate(self):
+        """Drop the snapshot and memoized results; the next get() reloads."""
+        with self._lock:
+            self._snapshot = None
+            self._marker = None
+            self._latest = (None, 0.0)
+            self._results.clear()
+
+    def clear_results(self):
+        """Drop memoized results but keep the snapshot."""
+        with self._lock:
+            self._results.clear()
+
+    def memoize(self, key, compute):
+        """Return compute(snapshot) cached for the current snapshot version."""
+        snapshot, _, version = self._current()
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] == version:
+                self._stats['hits'] += 1
+                return cached[1]
+            self._stats['misses'] += 1
+
+        value = compute(snapshot)
+        with self._lock:
+            if version == self._version:
+                self._results[key] = (version, value)
+        return value
+
+    def stats(self):
+        """Describe the cached snapshot and cache effectiveness."""
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                'loaded': snapshot is not None,
+                'version': self._version,
+                'nodes': snapshot.num_nodes if snapshot else 0,
+                'edges': snapshot.num_edges if snapshot else 0,
+                'ageSeconds': round(time.monotonic() - self._loaded_at, 1) if snapshot else None,
+                'ttl': self.ttl,
+                'maxAge': self.max_age,
+                'marker': self._marker,
+                'memoizedResults': len(self._results),
+                'fullLoads': self._stats['full_loads'],
+                'deltaLoads': self._stats['delta_loads'],
+                'unchangedChecks': self._stats['unchanged'],
+                'hits': self._stats['hits'],
+                'misses': self._stats['misses'],
+            }
+
+    def _full_load(self):
+        marker = read_marker()
+        with get_session() as session:
+            snapshot = load_snapshot(session, marker['maxNodeId'], marker['maxRelId'])
+        self._install(snapshot, marker)
+        self._loaded_at = self._checked_at
+        self._stats['full_loads'] += 1
+
+    def _refresh(self):
+        marker = read_marker()
+        if marker == self._marker:
+            self._checked_at = time.monotonic()
+            self._latest = (marker, self._checked_at)
+            self._stats['unchanged'] += 1
+            return
+
+        nodes, edges = fetch_delta(self._marker, marker)
+
+        # Only pure growth can be applied as a delta; deletions force a reload
+        grew_by_nodes = marker['nodes'] - self._marker['nodes']
+        grew_by_edges = marker['relationships'] - self._marker['relationships']
+        if grew_by_nodes != len(nodes) or grew_by_edges != len(edges):
+            self._full_load()
+            return
+
+        try:
+            snapshot = extend_snapshot(self._snapshot, nodes, edges)
+        except KeyError:
+            # A new relationship points at a node we never saw
+            self._full_load()
+            return
+
+        self._install(snapshot, marker)
+        self._stats['delta_loads'] += 1
+
+    def _install(self, snapshot, marker):
+        self._snapshot = snapshot
+        self._marker = marker
+        self._version += 1
+        self._checked_at = time.monotonic()
+        self._latest = (marker, self._checked_at)
+        self._results.clear()
+
+
+snapshot_cache = SnapshotCache()
@@ -0,0 +1,39 @@
+from app import ExpandDelta, plan_expand
+from benchmarks.code_graph import CodeGraph
+
+
+def neighbourhood():
+    graph = CodeGraph()
+    a, b, c, d = (graph.add_node('SymbolModel', {'name': name}) for name in 'abcd')
+    edges = [graph.add_relationship(a, other, 'CALLS') for other in (b, c, d)]
+    return (a, b, c, d), edges
+
+
+def hop(source, edges):
+    return [{'id': source.element_id, 'r': rel, 'm': rel.end_node} for rel in edges]
+
+
+def test_delta_leaves_out_what_the_client_has():
+    (a, b, c, d), (ab, ac, ad) = neighbourhood()
+    # b is on screen but the a-b relationship is not; a-c is already drawn
+    plan = plan_expand({'ids': [a.element_id], 'known': [b.element_id], 'knownEdges': [ac.element_id]})
+    delta = ExpandDelta(plan)
+    frontier = delta.add_hop(hop(a, [ab, ac, ad]))
+
+    assert frontier == [c.element_id, d.element_id]
+    payload = delta.payload()
+    assert [node['label'] for node in payload['nodes']] == ['c', 'd']
+    assert [edge['id'] for edge in payload['edges']] == [ab.element_id, ad.element_id]
+    assert payload['meta'] == {'hops': 1, 'capped': [], 'truncated': False}
+
+
+def test_fanout_and_node_caps_are_reported():
+    (a, b, c, d), edges = neighbourhood()
+    delta = ExpandDelta(plan_expand({'ids': [a.element_id], 'fanout': 2}))
+    delta.add_hop(hop(a, edges))
+    assert [node['label'] for node in delta.payload()['nodes']] == ['b', 'c']
+    assert delta.payload()['meta']['capped'] == [a.element_id]
+
+    delta = ExpandDelta(plan_expand({'ids': [a.element_id], 'maxNodes': 1}))
+    assert delta.add_hop(hop(a, edges)) == [b.element_id]
+    assert delta.payload()['meta']['truncated']
@@ -0,0 +1,78 @@
+import io
+
+import pytest
+
+import app
+from export import record_frames, write_frames
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def export(rows, fmt, batch_rows=2, schema=None):
+    return b''.join(write_frames(record_frames(rows, batch_rows), fmt, schema))
+
+
+def read_parquet(rows, **kwargs):
+    return pq.read_table(io.BytesIO(export(rows, 'parquet', **kwargs)))
+
+
+def test_null_first_batch_then_ints():
+    table = read_parquet([{'a': 1, 'b': None}, {'a': 2, 'b': None}, {'a': 3, 'b': 7}])
+    assert table.column('b').to_pylist() == [None, None, '7']
+
+
+def test_ints_widen_into_float_column():
+    table = read_parquet([{'a': 1.5}, {'a': None}, {'a': 4}])
+    assert table.schema.field('a').type == pa.float64()
+    assert table.column('a').to_pylist() == [1.5, None, 4.0]
+
+
+def test_float_after_int_column_fails_loudly():
+    with pytest.raises(ValueError, match="'a'"):
+        export([{'a': 1}, {'a': 2}, {'a': 2.5}], 'parquet')
+
+
+def test_late_column_fails_instead_of_being_dropped():
+    rows = [{'n': {'name': 'x'}}, {'n': {'name': 'y'}}, {'n': {'name': 'z', 'size': 3}}]
+    with pytest.raises(ValueError, match='n.size'):
+        export(rows, 'parquet')
+
+
+def test_explicit_schema_keeps_late_columns():
+    rows = [{'n': {'name': 'x'}}, {'n': {'name': 'y'}}, {'n': {'name': 'z', 'size': 3}}]
+    table = read_parquet(rows, schema={'n.name': 'string', 'n.size': 'int'})
+    assert table.column('n.size').to_pylist() == [None, None, 3]
+
+
+def test_csv_keeps_nullable_ints_whole():
+    rows = [{'a': 4, 'b': 'x'}, {'a': None, 'b': 'y'}, {'a': 5, 'b': 'z'}]
+    assert export(rows, 'csv') == b'a,b\n4,x\n,y\n5,z\n'
+
+
+def test_drift_after_the_first_chunk_ends_csv_with_an_error():
+    chunks = write_frames(record_frames([{'a': 1}, {'a': 2}, {'a': 'x'}], 2), 'csv')
+    assert next(chunks) == b'a\n1\n2\n'
+    assert next(chunks).startswith(b"# export failed after row 2: Column 'a'")
+    with pytest.raises(ValueError):
+        next(chunks)
+
+
+def test_drift_mid_stream_aborts_the_response(monkeypatch):
+    rows = [{'a': 1}, {'a': 2}, {'a': 'x'}]
+    monkeypatch.setattr(app, 'export_query', lambda cypher, params, fmt, fetch_size, batch_rows, schema:
+                        write_frames(record_frames(rows, batch_rows), fmt, schema))
+    response = app.app.test_client().post('/export/query', buffered=False,
+                                          json={'query': 'RETURN 1', 'format': 'csv', 'batchRows': 2})
+    assert response.status_code == 200
+    body = iter(response.response)
+    assert next(body) == b'a\n1\n2\n'
+    assert next(body).startswith(b'# export failed')
+    with pytest.raises(ValueError):
+        next(body)
+
+
+@pytest.mark.parametrize('params', [{'damping': [0.85]}, {'maxIterations': {'n': 5}}, {'samples': 'many'}])
+def test_malformed_analysis_export_params_are_rejected(params):
+    response = app.app.test_client().post('/export/analyze/pagerank', json={'format': 'csv', **params})
+    assert response.status_code == 400
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from graph_analytics import (
+    GraphSnapshot, betweenness, degree, extend_snapshot, label_propagation, pagerank, reachable,
+    shortest_paths, top_k
+)
+
+
+def graph(edges, n=None):
+    """Snapshot over nodes 0..n-1 named n0, n1, ... with (source, target[, type]) edges."""
+    n = n if n is not None else max(max(edge[:2]) for edge in edges) + 1
+    type_names = sorted({edge[2] for edge in edges if len(edge) > 2}) or ['R']
+    return GraphSnapshot([f'n{i}' for i in range(n)], ['A'] * n, [edge[0] for edge in edges],
+                         [edge[1] for edge in edges],
+                         [type_names.index(edge[2]) if len(edge) > 2 else 0 for edge in edges], type_names)
+
+
+def ids(layers):
+    return [sorted(layer.tolist()) for layer in layers]
+
+
+def test_degree_counts_both_directions():
+    assert degree(graph([(0, 1), (0, 2), (2, 0)])).tolist() == [3, 1, 2]
+
+
+def test_pagerank_is_uniform_on_a_cycle():
+    assert np.allclose(pagerank(graph([(0, 1), (1, 2), (2, 0)])), 1 / 3)
+
+
+def test_pagerank_spreads_dangling_mass_and_sums_to_one():
+    # 2 has no out-edges; its rank is spread over every node instead of leaking
+    rank = pagerank(graph([(0, 2), (1, 2), (3, 2)]))
+    assert rank.sum() == pytest.approx(1.0)
+    assert top_k(rank, 1).tolist() == [2]
+    assert np.allclose(rank[[0, 1, 3]], rank[0])
+
+
+def test_betweenness_on_a_path_and_a_star():
+    # Undirected: direction of the relationships doesn't matter
+    assert betweenness(graph([(0, 1), (2, 1), (2, 3)])).tolist() == [0, 2, 2, 0]
+    assert betweenness(graph([(0, 1), (0, 2), (0, 3), (0, 4)])).tolist() == [6, 0, 0, 0, 0]
+
+
+def test_betweenness_splits_over_parallel_shortest_paths():
+    # 0 reaches 3 through 1 or 2 equally, so each carries half of that pair
+    assert betweenness(graph([(0, 1), (0, 2), (1, 3), (2, 3)])).tolist() == [0.5, 0.5, 0.5, 0.5]
+
+
+def test_sampling_every_node_is_exact():
+    snapshot = graph([(0, 1), (1, 2), (2, 3), (3, 0), (0, 2), (3, 4)])
+    assert np.allclose(betweenness(snapshot, samples=5), betweenness(snapshot))
+
+
+def test_label_propagation_finds_cliques_largest_first():
+    clique = [(a, b) for a in range(4) for b in range(a + 1, 4)]
+    triangle = [(4, 5), (5, 6), (6, 4)]
+    assert label_propagation(graph(clique + triangle)).tolist() == [0, 0, 0, 0, 1, 1, 1]
+
+
+def test_shortest_paths_returns_every_shortest_path():
+    # Two 2-hop paths 0 -> 3 and a longer detour through 4 and 5
+    snapshot = graph([(0, 1), (0, 2), (1, 3), (2, 3), (0, 4), (4, 5), (5, 3)])
+    layers, (sources, targets, _) = shortest_paths(snapshot, 0, 3)
+    assert ids(layers) == [[0], [1, 2], [3]]
+    assert sorted(zip(sources.tolist(), targets.tolist())) == [(0, 1), (0, 2), (1, 3), (2, 3)]
+
+
+def test_shortest_paths_follows_direction_and_types():
+    snapshot = graph([(0, 1, 'CALLS'), (1, 2, 'CALLS'), (0, 2, 'IMPORTS')])
+    assert ids(shortest_paths(snapshot, 0, 2)[0]) == [[0], [2]]
+    assert ids(shortest_paths(snapshot, 0, 2, types=['CALLS'])[0]) == [[0], [1], [2]]
+    assert shortest_paths(snapshot, 2, 0)[0] == []
+    assert ids(shortest_paths(snapshot, 2, 0, direction='in')[0]) == [[2], [0]]
+    assert ids(shortest_paths(snapshot, 2, 0, direction='both', types=['CALLS'])[0]) == [[2], [1], [0]]
+
+
+def test_shortest_paths_respects_max_depth():
+    chain = graph([(i, i + 1) for i in range(5)])
+    assert shortest_paths(chain, 0, 5, max_depth=4)[0] == []
+    assert len(shortest_paths(chain, 0, 5, max_depth=5)[0]) == 6
+    assert ids(shortest_paths(chain, 2, 2)[0]) == [[2]]
+
+
+def test_reachable_walks_backwards_level_by_level():
+    # 0 -> 1 -> 2 -> 3 and 4 -> 2: what reaches 3?
+    snapshot = graph([(0, 1), (1, 2), (2, 3), (4, 2)])
+    layers, (sources, targets, _), truncated = reachable(snapshot, [3], max_depth=2)
+    assert ids(layers) == [[3], [2], [1, 4]]
+    assert sorted(zip(sources.tolist(), targets.tolist())) == [(1, 2), (2, 3), (4, 2)]
+    assert not truncated
+    # The walk stops after the first level that reaches nothing new
+    assert ids(reachable(snapshot, [0], direction='out', max_depth=5)[0]) == [[0], [1], [2], [3], []]
+
+
+def test_reachable_cuts_the_level_that_passes_max_nodes():
+    star = graph([(i, 0) for i in range(1, 6)])
+    layers, _, truncated = reachable(star, [0], max_nodes=3)
+    assert truncated
+    assert sum(len(layer) for layer in layers) == 3
+
+
+def test_extend_snapshot_keeps_dense_ids():
+    snapshot = graph([(0, 1)])
+    extended = extend_snapshot(snapshot, [('n2', 'B')], [('n1', 'n2', 'NEW')])
+    assert extended.node_ids == ['n0', 'n1', 'n2']
+    assert extended.type_names == ['R', 'NEW']
+    assert extended.induced_edges([0, 1, 2]) == [{'from': 'n0', 'to': 'n1', 'label': 'R'},
+                                                 {'from': 'n1', 'to': 'n2', 'label': 'NEW'}]
@@ -0,0 +1,24 @@
+import numpy as np
+
+import graph_layout
+from graph_layout import _exact_repulsion, _grid_repulsion, request_iterations, wants_layout
+
+
+def test_grid_repulsion_matches_exact_with_outliers():
+    rng = np.random.default_rng(0)
+    pos = rng.random((1500, 2)) * 40
+    # A few nodes far outside the bulk must not collapse the grid onto it
+    pos[:10] = rng.random((10, 2)) * 1e4 + 1e4
+    approx = _grid_repulsion(pos, 1.0)
+    exact = _exact_repulsion(pos, 1.0)
+    error = np.hypot(*(approx - exact).T) / np.hypot(*exact.T)
+    assert np.median(error) < 0.05
+
+
+def test_request_layouts_are_capped():
+    assert not wants_layout(True, graph_layout.LAYOUT_MAX_NODES + 1)
+    assert not wants_layout('auto', graph_layout.LAYOUT_MAX_NODES + 1)
+    assert wants_layout('auto', graph_layout.LAYOUT_AUTO_THRESHOLD)
+    assert request_iterations(10, 50) == 50
+    assert request_iterations(5000, 50) * 5000 <= max(graph_layout.LAYOUT_MAX_WORK,
+                                                      graph_layout.LAYOUT_MIN_ITERATIONS * 5000)
@@ -0,0 +1,20 @@
+import app
+
+
+def unreachable(*args, **kwargs):
+    raise AssertionError('communities summary went to the database')
+
+
+class UnreachableSnapshotCache:
+    get = staticmethod(unreachable)
+    memoize = staticmethod(unreachable)
+
+
+def test_communities_summary_stays_on_the_result(monkeypatch):
+    monkeypatch.setattr(app, 'snapshot_cache', UnreachableSnapshotCache())
+    monkeypatch.setattr(app, 'get_session', unreachable)
+    nodes = [{'id': f'n{i}', 'labels': ['A'], 'label': f'n{i}', 'properties': {}} for i in range(6)]
+    edges = [{'from': 'n0', 'to': 'n1'}, {'from': 'n1', 'to': 'n2'}, {'from': 'n3', 'to': 'n4'},
+             {'from': 'n4', 'to': 'n5'}]
+    summary = app.summarize_graph(nodes, edges, 'communities', 3)
+    assert summary.mode == 'communities'
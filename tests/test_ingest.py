@@ -0,0 +1,29 @@
+from ingest import python_symbols
+
+SOURCE = '''
+class Shape:
+    @property
+    def size(self):
+        return self._size
+
+    @size.setter
+    def size(self, value):
+        self._size = value
+
+
+if HAVE_FAST:
+    def area(shape):
+        return fast(shape)
+else:
+    def area(shape):
+        return slow(shape)
+'''
+
+
+def test_redefined_names_keep_their_own_symbols():
+    symbols = {symbol['id']: symbol for symbol in python_symbols(SOURCE, 'repo/shapes.py')}
+    assert list(symbols) == ['repo/shapes.py:Shape', 'repo/shapes.py:Shape.size', 'repo/shapes.py:Shape.size#2',
+                             'repo/shapes.py:area', 'repo/shapes.py:area#2']
+    assert symbols['repo/shapes.py:Shape.size']['tags'] == ['property']
+    assert symbols['repo/shapes.py:Shape.size#2']['tags'] == ['setter']
+    assert [symbols[f'repo/shapes.py:area{suffix}']['properties']['line'] for suffix in ('', '#2')] == [13, 16]
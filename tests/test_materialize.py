@@ -0,0 +1,86 @@
+import contextlib
+
+import pytest
+
+import app
+import materialize
+from materialize import Materializer
+from query_cache import QueryCache
+
+MARKER = {'nodes': 3, 'maxNodeId': 2, 'relationships': 2, 'maxRelId': 1}
+GROWN = {'nodes': 4, 'maxNodeId': 3, 'relationships': 2, 'maxRelId': 1}
+
+
+class FakeSnapshotCache:
+    def __init__(self):
+        self.graph_marker = MARKER
+
+    def current(self):
+        return type('Snapshot', (), {'num_nodes': 3, 'node_labels': ['A']})(), self.graph_marker
+
+    def marker(self):
+        return self.graph_marker
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = FakeSnapshotCache()
+    monkeypatch.setattr(materialize, 'snapshot_cache', cache)
+    monkeypatch.setattr(materialize, 'get_session', contextlib.nullcontext)
+    monkeypatch.setattr(materialize, 'compute_scores', lambda snapshot, algorithms: {})
+    monkeypatch.setattr(materialize, 'write_scores', lambda *args: None)
+    monkeypatch.setattr(materialize, 'create_indexes', lambda *args: None)
+    return cache
+
+
+def test_scores_are_current_until_the_graph_changes(cache):
+    materializer = Materializer(interval=0)
+    assert not materializer.current('pagerank')
+    summary = materializer.run(('pagerank',))
+    assert summary['marker'] == MARKER
+    assert materializer.current('pagerank')
+    assert not materializer.current('degree')
+    cache.graph_marker = GROWN
+    assert not materializer.current('pagerank')
+
+
+def test_failed_run_leaves_scores_stale(cache, monkeypatch):
+    materializer = Materializer(interval=0)
+    materializer.run(('pagerank',))
+
+    def fail(*args):
+        raise RuntimeError('write failed')
+
+    monkeypatch.setattr(materialize, 'write_scores', fail)
+    with pytest.raises(RuntimeError):
+        materializer.run(('pagerank',))
+    assert not materializer.current('pagerank')
+
+
+@pytest.mark.parametrize('fails', [False, True])
+def test_write_back_invalidates_cached_queries(cache, monkeypatch, fails):
+    query_cache = QueryCache()
+    query_cache.put('MATCH (n) WHERE n.pagerank > 0.01 RETURN n', b'[]', 2)
+    monkeypatch.setattr(materialize, 'query_cache', query_cache)
+
+    def write_scores(*args):
+        if fails:
+            raise RuntimeError('write failed')
+
+    monkeypatch.setattr(materialize, 'write_scores', write_scores)
+    with pytest.raises(RuntimeError) if fails else contextlib.nullcontext():
+        Materializer(interval=0).run(('pagerank',))
+    assert query_cache.get('MATCH (n) WHERE n.pagerank > 0.01 RETURN n') is None
+    assert query_cache.stats()['invalidations'] == 1
+
+
+def test_auto_source_falls_back_to_live_when_stale(cache, monkeypatch):
+    materializer = Materializer(interval=0)
+    monkeypatch.setattr(materializer, 'labels', lambda algorithm: ['A'])
+    monkeypatch.setattr(app, 'materializer', materializer)
+    assert not app.use_materialized('pagerank', {})
+    assert app.use_materialized('pagerank', {'source': 'materialized'})
+    materializer.run(('pagerank',))
+    assert app.use_materialized('pagerank', {})
+    cache.graph_marker = GROWN
+    assert not app.use_materialized('pagerank', {})
@@ -0,0 +1,41 @@
+import time
+
+import profiling
+from profiling import RequestTimer, recorded_stream
+
+
+def test_streamed_request_is_recorded_when_the_body_is_sent(monkeypatch):
+    finished = []
+    monkeypatch.setattr(profiling, 'finish_request', lambda *args: finished.append(args))
+    timer = RequestTimer()
+
+    def body():
+        for chunk in (b'ab', b'cde'):
+            time.sleep(0.01)
+            yield chunk
+
+    stream = recorded_stream(body(), 'query', timer, 200)
+    assert not finished
+    assert b''.join(stream) == b'abcde'
+    (endpoint, recorded_timer, status, size), = finished
+    assert (endpoint, status, size) == ('query', 200, 5)
+    assert recorded_timer.elapsed() >= 0.02
+
+
+def test_abandoned_stream_closes_the_body_and_is_recorded(monkeypatch):
+    finished = []
+    closed = []
+    monkeypatch.setattr(profiling, 'finish_request', lambda *args: finished.append(args))
+
+    def body():
+        try:
+            yield b'first'
+            yield b'second'
+        finally:
+            closed.append(True)
+
+    stream = recorded_stream(body(), 'query', RequestTimer(), 200)
+    assert next(stream) == b'first'
+    stream.close()
+    assert closed == [True]
+    assert finished[0][3] == len(b'first')
@@ -0,0 +1,31 @@
+import pytest
+
+from query_cache import cache_key, normalize_cypher
+
+
+@pytest.mark.parametrize('a, b', [
+    ('MATCH (n:Order) RETURN n', 'MATCH (n:order) RETURN n'),
+    ('MATCH ()-[r:END]->() RETURN r', 'MATCH ()-[r:end]->() RETURN r'),
+    ('MATCH (n) RETURN n.Count', 'MATCH (n) RETURN n.count'),
+    ('MATCH (n) RETURN n.End', 'MATCH (n) RETURN n.end'),
+    ('MATCH (n) WHERE n.x = $Set RETURN n', 'MATCH (n) WHERE n.x = $set RETURN n'),
+    ('RETURN {Case: 1} AS m', 'RETURN {case: 1} AS m'),
+    ('MATCH (n) RETURN count(n) AS Count', 'MATCH (n) RETURN count(n) AS count'),
+    ("RETURN 'a  b'", "RETURN 'a b'"),
+    ('RETURN `a  b`', 'RETURN `a b`'),
+])
+def test_case_and_literals_keep_queries_apart(a, b):
+    assert cache_key(a) != cache_key(b)
+
+
+@pytest.mark.parametrize('a, b', [
+    ('MATCH (n)\n  RETURN n;', 'MATCH (n) RETURN n'),
+    ('MATCH (n) // all nodes\nRETURN n', 'MATCH (n) RETURN n'),
+    ('MATCH (n) /* all\nnodes */ RETURN n', 'MATCH (n) RETURN n'),
+])
+def test_whitespace_and_comments_are_ignored(a, b):
+    assert normalize_cypher(a) == normalize_cypher(b)
+
+
+def test_comment_markers_inside_strings_are_kept():
+    assert normalize_cypher("RETURN 'http://x'  AS url") == "RETURN 'http://x' AS url"
@@ -0,0 +1,20 @@
+from schema_cache import infer_properties, schema_version
+
+
+def schema(kinds, samples, labels=('FileModel', 'SymbolModel')):
+    return {'labels': list(labels), 'relationships': ['CONTAINS'], 'kinds': kinds,
+            'properties': {'SymbolModel': infer_properties(samples)}}
+
+
+def test_version_ignores_order_and_sampled_coverage():
+    a = schema(['class', 'function'], [{'name': 'x', 'line': 1}, {'name': 'y'}])
+    b = schema(['function', 'class'], [{'name': 'x', 'line': 1}, {'name': 'y', 'line': 2}],
+               labels=('SymbolModel', 'FileModel'))
+    assert schema_version(a) == schema_version(b)
+
+
+def test_version_tracks_keys_types_and_kinds():
+    base = schema(['class'], [{'name': 'x'}])
+    assert schema_version(schema(['class'], [{'name': 'x', 'line': 1}])) != schema_version(base)
+    assert schema_version(schema(['class'], [{'name': 1}])) != schema_version(base)
+    assert schema_version(schema(['class', 'method'], [{'name': 'x'}])) != schema_version(base)
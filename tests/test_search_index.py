@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from search_index import SearchIndex, terms
+
+SYMBOLS = [
+    {'id': 's0', 'name': 'HttpServer', 'kind': 'class',
+     'documentation': json.dumps({'summary': 'Serve HTTP requests on a socket.'})},
+    {'id': 's1', 'name': 'parse_http_header', 'kind': 'function',
+     'documentation': json.dumps({'summary': 'Parse one header line.'})},
+    {'id': 's2', 'name': 'render_template', 'kind': 'function',
+     'documentation': json.dumps({'summary': 'Render a template with the request context.'})},
+    {'id': 's3', 'name': 'Template', 'kind': 'class', 'documentation': None},
+    {'id': 's4', 'name': 'server', 'kind': 'function', 'documentation': 'Module-level server instance.'},
+    {'id': 's5', 'name': 'read_line', 'kind': 'function',
+     'documentation': json.dumps({'summary': 'Read a header continuation line.'})},
+]
+
+
+@pytest.fixture(scope='module')
+def index():
+    return SearchIndex(SYMBOLS, popularity={'s3': 10, 's2': 1})
+
+
+def names(index, query, **kwargs):
+    return [result['name'] for result in index.results(query, **kwargs)['results']]
+
+
+def test_identifiers_are_split_into_terms():
+    assert terms('parseHTTPHeader') == ['parse', 'http', 'header', 'parsehttpheader']
+    assert terms('parse_http_header') == ['parse', 'http', 'header']
+
+
+def test_name_matches_outrank_documentation_matches(index):
+    assert names(index, 'header', prefix=False) == ['parse_http_header', 'read_line']
+    assert names(index, 'context', prefix=False) == ['render_template']
+    assert set(names(index, 'http', prefix=False)) == {'HttpServer', 'parse_http_header'}
+
+
+def test_exact_name_goes_first(index):
+    assert names(index, 'server', prefix=False)[0] == 'server'
+    assert names(index, 'template', prefix=False)[0] == 'Template'
+
+
+def test_misspelt_terms_match_fuzzily(index):
+    assert list(index.results('templte', prefix=False)['terms']) == ['template']
+    assert set(names(index, 'templte', prefix=False)) == {'Template', 'render_template'}
+
+
+def test_last_term_matches_as_a_prefix_until_it_is_finished(index):
+    assert set(names(index, 'temp')) == {'Template', 'render_template'}
+    assert names(index, 'temp ') == []
+    assert index.results('temp')['terms'] == {'template': 0.5}
+
+
+def test_kinds_filter_results(index):
+    assert names(index, 'template', kinds=['class']) == ['Template']
+    assert index.results('template', kinds=['module'])['total'] == 0
+
+
+def test_suggest_prefers_whole_name_prefixes_then_popularity(index):
+    assert [s['name'] for s in index.suggest('te')] == ['Template', 'render_template']
+    assert [s['name'] for s in index.suggest('ser')] == ['server', 'HttpServer']
+    assert [s['name'] for s in index.suggest('Head')] == ['parse_http_header']
+    assert [s['name'] for s in index.suggest('line')] == ['read_line']
+    assert index.suggest('  ') == []
@@ -0,0 +1,46 @@
+import pytest
+from neo4j.graph import Graph, Node
+
+import app
+from serializer import COMPACT_PROPERTIES, resolve_projection, serialize_node
+
+
+class UncopyableNode(Node):
+    """Node that fails if its whole property map is copied."""
+
+    def items(self):
+        raise AssertionError('compact projection copied every property')
+
+
+def node(properties, labels=('SymbolModel',)):
+    return UncopyableNode(Graph(), '4:t:0', 0, list(labels), properties)
+
+
+def test_compact_projection_reads_only_its_keys():
+    serialized = serialize_node(node({'title': 't', 'kind': 'class', 'body': 'x' * 100}),
+                                COMPACT_PROPERTIES)
+    assert serialized['label'] == 't'
+    assert serialized['properties'] == {'title': 't', 'kind': 'class'}
+
+
+def test_full_projection_keeps_every_property():
+    properties = {'name': 'f', 'body': 'x'}
+    serialized = serialize_node(Node(Graph(), '4:t:0', 0, ['SymbolModel'], properties))
+    assert serialized['label'] == 'f'
+    assert serialized['properties'] == properties
+
+
+def test_caption_falls_back_to_the_first_label():
+    assert serialize_node(node({'kind': 'file'}, ['FileModel']), ('name',))['label'] == 'FileModel'
+
+
+@pytest.mark.parametrize('projection', [['name', 1], [['name']], [{'key': 'name'}], {'keys': ['name']}, 5, 'tiny'])
+def test_malformed_projections_are_rejected(projection):
+    with pytest.raises(ValueError):
+        resolve_projection(projection)
+
+
+@pytest.mark.parametrize('route', ['/analyze/degree', '/expand', '/search', '/impact'])
+def test_routes_answer_malformed_projections_with_400(route):
+    body = {'projection': ['name', {'x': 1}], 'ids': ['4:t:0'], 'q': 'x'}
+    assert app.app.test_client().post(route, json=body).status_code == 400
@@ -0,0 +1,123 @@
+import contextlib
+
+import pytest
+
+import snapshot_cache
+from graph_analytics import GraphSnapshot
+from snapshot_cache import SnapshotCache
+
+
+class FakeGraph:
+    """Nodes and relationships with internal ids, answering the cache's reads."""
+
+    def __init__(self):
+        self.nodes = {}
+        self.relationships = {}
+        self.next_node = 0
+        self.next_rel = 0
+
+    def add_node(self, label='A'):
+        element_id = f'n{self.next_node}'
+        self.nodes[self.next_node] = (element_id, label)
+        self.next_node += 1
+        return element_id
+
+    def add_relationship(self, source, target, rel_type='R'):
+        self.relationships[self.next_rel] = (source, target, rel_type)
+        self.next_rel += 1
+
+    def delete_node(self, element_id):
+        self.nodes = {i: node for i, node in self.nodes.items() if node[0] != element_id}
+        self.relationships = {i: rel for i, rel in self.relationships.items() if element_id not in rel[:2]}
+
+    def read_marker(self, executor=None):
+        return {'nodes': len(self.nodes), 'maxNodeId': max(self.nodes, default=None),
+                'relationships': len(self.relationships), 'maxRelId': max(self.relationships, default=None)}
+
+    def load_snapshot(self, session, max_node_id, max_rel_id):
+        nodes = [node for i, node in sorted(self.nodes.items()) if i <= max_node_id]
+        index = {element_id: i for i, (element_id, _) in enumerate(nodes)}
+        edges = [rel for i, rel in sorted(self.relationships.items()) if i <= max_rel_id]
+        types = sorted({rel_type for _, _, rel_type in edges})
+        return GraphSnapshot(list(index), [label for _, label in nodes], [index[s] for s, _, _ in edges],
+                             [index[t] for _, t, _ in edges], [types.index(t) for _, _, t in edges], types)
+
+    def fetch_delta(self, old, new, executor=None):
+        after_node = -1 if old['maxNodeId'] is None else old['maxNodeId']
+        after_rel = -1 if old['maxRelId'] is None else old['maxRelId']
+        nodes = [node for i, node in sorted(self.nodes.items()) if after_node < i <= new['maxNodeId']]
+        edges = [rel for i, rel in sorted(self.relationships.items()) if after_rel < i <= new['maxRelId']]
+        return nodes, edges
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    graph = FakeGraph()
+    a, b = graph.add_node(), graph.add_node()
+    graph.add_relationship(a, b)
+    monkeypatch.setattr(snapshot_cache, 'read_marker', graph.read_marker)
+    monkeypatch.setattr(snapshot_cache, 'load_snapshot', graph.load_snapshot)
+    monkeypatch.setattr(snapshot_cache, 'fetch_delta', graph.fetch_delta)
+    monkeypatch.setattr(snapshot_cache, 'get_session', contextlib.nullcontext)
+    return graph
+
+
+def test_result_is_kept_under_the_version_it_was_computed_from(graph):
+    races = [True]
+
+    class RacingCache(SnapshotCache):
+        # A refresh lands right after the first memoize() has taken its snapshot
+        def _current(self):
+            current = super()._current()
+            if races and races.pop():
+                graph.add_node()
+                self._refresh()
+            return current
+
+    cache = RacingCache(ttl=0)
+    count = lambda snapshot: snapshot.num_nodes
+    assert cache.memoize('count', count) == 2
+    assert cache.memoize('count', count) == 3
+
+
+def test_unchanged_graph_keeps_the_snapshot(graph):
+    cache = SnapshotCache(ttl=0)
+    snapshot = cache.get()
+    assert cache.get() is snapshot
+    assert cache.stats()['unchangedChecks'] == 1
+
+
+def test_growth_is_appended_as_a_delta(graph):
+    cache = SnapshotCache(ttl=0)
+    first = cache.get()
+    assert cache.memoize('nodes', lambda snapshot: snapshot.num_nodes) == 2
+    c = graph.add_node('B')
+    graph.add_relationship('n1', c, 'NEW')
+
+    snapshot = cache.get()
+    assert snapshot is not first
+    assert snapshot.node_ids == ['n0', 'n1', 'n2']
+    assert snapshot.induced_edges([0, 1, 2])[-1] == {'from': 'n1', 'to': 'n2', 'label': 'NEW'}
+    assert cache.stats()['deltaLoads'] == 1 and cache.stats()['fullLoads'] == 1
+    assert cache.memoize('nodes', lambda snapshot: snapshot.num_nodes) == 3
+
+
+def test_deletion_forces_a_full_reload(graph):
+    cache = SnapshotCache(ttl=0)
+    cache.get()
+    graph.delete_node('n0')
+    graph.add_node()
+
+    snapshot = cache.get()
+    assert snapshot.node_ids == ['n1', 'n2']
+    assert snapshot.num_edges == 0
+    assert cache.stats()['fullLoads'] == 2 and cache.stats()['deltaLoads'] == 0
+
+
+def test_snapshot_is_kept_within_the_ttl(graph):
+    cache = SnapshotCache(ttl=3600)
+    snapshot = cache.get()
+    graph.add_node()
+    assert cache.get() is snapshot
+    cache.invalidate()
+    assert cache.get().num_nodes == 3